@@ -1,33 +1,168 @@
 import os
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 from flask_cors import CORS
-from pymongo import MongoClient
-from bson import ObjectId
-from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from brand_index import BrandIndex, staged_sources
+from changefeed import ChangeFeed, stream_events
+from compression import init_compression
+from config import Config
+from dbpool import PoolMonitor
+from hardwaredb import HardwareDB
+from jsonprovider import OrjsonProvider
+from leaderboard import Leaderboard
+from metrics import CommandTimer, init_metrics
+from project import Project, ProjectValidationError
+from projectcache import ProjectCache
+from projectdb import ProjectDB
+from requestargs import (
+    MAX_PAGE_SIZE, TooManyItems, bulk_changes, bulk_request, list_args, list_etag, search_filters,
+)
+from resilience import CircuitBreaker, ResilientProjectDB, is_outage, ping, served_stale
+from spend_rollups import RollupFileReader, RollupMongoStore, SpendRollups
 
 # ----------------------------------------
 # Setup
 # ----------------------------------------
-load_dotenv()
+# .env is loaded by config; pyarrow (spend_analytics) is imported on the
+# first /api/spend call and indexes are built by migrate.py, so importing
+# this module and create_app() stay cheap and open no connection
+
 
-def create_app():
+def create_app(config=Config, project_db=None):
+    """
+    Build the Flask app. All routes go through one ProjectDB per process;
+    pass `project_db` to run against a stand-in (e.g. mongomock) instead.
+    """
     app = Flask(__name__, static_folder="static", template_folder="templates")
+    app.config.from_object(config)
+    # Same bytes as Flask's encoder, produced by orjson
+    app.json = OrjsonProvider(app)
     CORS(app)
 
     # ----------------------------------------
     # MongoDB Connection
     # ----------------------------------------
-    mongo_uri = os.getenv("MONGO_URI")
-    mongo_dbname = os.getenv("MONGO_DB", "haasappprojectsdb")
-    client = MongoClient(mongo_uri)
-    db = client[mongo_dbname]
+    # Read-through cache for single-project lookups (size 0 disables it)
+    cache = ProjectCache(maxsize=config.PROJECT_CACHE_SIZE, ttl=config.PROJECT_CACHE_TTL)
+    pool_monitor = PoolMonitor(max_pool_size=config.MONGO_MAX_POOL_SIZE)
+    command_timer = CommandTimer(slow_ms=config.SLOW_QUERY_MS)
+    if project_db is None:
+        project_db = ProjectDB.from_config(
+            config, cache=cache, monitor=pool_monitor, listeners=[command_timer]
+        )
+    write_behind = None
+    if config.WRITE_BEHIND:
+        # Creates wait a few ms for company and go out as one insert_many
+        write_behind = project_db.enable_write_behind(
+            max_batch=config.WRITE_BEHIND_MAX_BATCH,
+            max_delay=config.WRITE_BEHIND_MAX_DELAY_MS / 1000,
+            max_pending=config.WRITE_BEHIND_MAX_PENDING,
+            timeout=config.MONGO_WRITE_TIMEOUT_MS / 1000,
+        )
+    if config.MONGO_RESILIENCE:
+        # Deadlines, fail-fast and stale reads instead of piling up on a slow Atlas
+        project_db = ResilientProjectDB(
+            project_db,
+            breaker=CircuitBreaker(
+                failure_rate=config.BREAKER_FAILURE_RATE,
+                min_calls=config.BREAKER_MIN_CALLS,
+                window=config.BREAKER_WINDOW_SECONDS,
+                reset_timeout=config.BREAKER_RESET_SECONDS,
+            ),
+            read_timeout=config.MONGO_READ_TIMEOUT_MS / 1000,
+            write_timeout=config.MONGO_WRITE_TIMEOUT_MS / 1000,
+            max_stale=config.STALE_MAX_AGE_SECONDS,
+        )
+    cache = project_db.cache
+    app.extensions["project_db"] = project_db
+
+    @app.before_request
+    def reset_stale_flag():
+        served_stale.set(None)
+
+    @app.after_request
+    def label_stale(resp):
+        age = served_stale.get()
+        if age is not None:
+            resp.headers["Warning"] = '110 - "Response is Stale"'
+            resp.headers["Age"] = str(int(age))
+        return resp
+
+    @app.errorhandler(PyMongoError)
+    def mongo_error(e):
+        if not is_outage(e):
+            print("❌ Database error:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        resp = jsonify({"success": False, "message": "Database temporarily unavailable"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(max(1, int(getattr(e, "retry_after", 1))))
+        return resp
+
+    # Per-route latency/status histograms and /metrics
+    init_metrics(app, pool_monitor=pool_monitor, cache=cache)
+
+    # gzip/brotli for large buffered responses
+    init_compression(app, min_size=config.COMPRESS_MIN_SIZE)
+
+    # One change stream per worker, shared by /projects/events and cache eviction
+    change_feed = ChangeFeed(
+        lambda: project_db.collection,
+        dumps=lambda obj: app.json.dumps(obj, separators=(",", ":")),
+        buffer_size=config.CHANGE_FEED_BUFFER,
+    )
+    app.extensions["change_feed"] = change_feed
+
+    if config.PROJECT_CACHE_WATCH and cache is not None:
+        change_feed.add_listener(cache.apply_change)
+
+        @app.before_request
+        def start_change_feed():
+            # No-op once this worker's stream is running
+            change_feed.start()
+
+    # The client connects on the first request (per worker), not here
+    print(f"✅ Using MongoDB database: {config.MONGO_DB}")
+
+    # Hardware-set capacity and checkouts live next to the projects
+    hardware_db = HardwareDB(db_factory=lambda: project_db.db)
+    app.extensions["hardware_db"] = hardware_db
+
+    # Brand spend leaderboards, loaded on the first /api/top10companies call
+    leaderboard = Leaderboard(
+        config.SPEND_DATA_DIR, k=config.LEADERBOARD_SIZE, refresh_interval=config.LEADERBOARD_REFRESH_SECONDS
+    )
+    app.extensions["leaderboard"] = leaderboard
 
-    print(f"✅ Connected to MongoDB Atlas database: {mongo_dbname}")
+    def spend_store():
+        # Arrow store behind /api/spend; keeps pyarrow out of boot
+        if "spend" not in app.extensions:
+            from spend_analytics import SpendAnalytics
 
-    # Helper to serialize MongoDB docs
-    def serialize_doc(doc):
-        doc["_id"] = str(doc["_id"])
-        return doc
+            app.extensions.setdefault(
+                "spend", SpendAnalytics(config.SPEND_STORE_DIR, max_rows=config.SPEND_MAX_ROWS)
+            )
+        return app.extensions["spend"]
+
+    # Built from whichever is newer: the staged extract or the sample CSV
+    brands = BrandIndex(
+        config.BRAND_INDEX_PATH,
+        source=staged_sources(config.SPEND_STORE_DIR) + [config.BRAND_SOURCE_CSV],
+        check_interval=config.LEADERBOARD_REFRESH_SECONDS,
+    )
+    if config.ROLLUP_STORE == "mongo":
+        rollups = SpendRollups(RollupMongoStore(db_factory=lambda: project_db.db))
+    else:
+        # Only the published rollups; the facts stay with the writer (spend_rollups.py)
+        rollups = SpendRollups(RollupFileReader(config.ROLLUP_DIR))
+
+    # One-time index builds, run per deploy instead of per worker start
+    @app.cli.command("init-indexes")
+    def init_indexes():
+        from migrate import ensure_indexes
+
+        for area, names in ensure_indexes(project_db, config).items():
+            print(f"✅ {config.MONGO_DB} {area}: {', '.join(names)}")
 
     # ----------------------------------------
     # ROUTES
@@ -38,45 +173,477 @@ def create_app():
     def index():
         return render_template("index.html")
 
-    # Health check (JSON)
+    # Health check (JSON): pings Mongo under the read deadline
     @app.route("/health")
     def health():
-        return jsonify({"status": "ok", "message": "MongoDB connection active"})
+        body = {}
+        if isinstance(project_db, ResilientProjectDB):
+            body["resilience"] = project_db.stats()
+        try:
+            latency = ping(project_db.client, config.MONGO_READ_TIMEOUT_MS / 1000)
+        except PyMongoError as e:
+            body.update(status="down", message=f"MongoDB unreachable: {e}")
+            return jsonify(body), 503
+        body["mongo_latency_ms"] = round(latency, 2)
+        breaker_state = body.get("resilience", {}).get("breaker", {}).get("state", "closed")
+        if latency >= config.HEALTH_SLOW_MS or breaker_state != "closed":
+            body.update(status="degraded", message="MongoDB responding slowly or recovering")
+        else:
+            body.update(status="ok", message="MongoDB connection active")
+        return jsonify(body)
+
+    def conditional(etag):
+        """
+        304 response when the client already holds `etag`, else None.
+        """
+        if request.if_none_match.contains_weak(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag, weak=True)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return None
+
+    def with_etag(resp, etag):
+        resp.set_etag(etag, weak=True)
+        # Clients may store the body but must revalidate before reuse
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    def stream_projects(projects, mode):
+        """
+        Encode one document at a time so the full list is never held in memory.
+        mode is "json" (a {"success", "projects"} object) or "ndjson".
+        """
+        def dumps(doc):
+            return app.json.dumps(doc, separators=(",", ":"))
 
-    # Get all projects
+        if mode == "ndjson":
+            for doc in projects:
+                yield dumps(doc) + "\n"
+            return
+
+        yield '{"projects":['
+        first = True
+        for doc in projects:
+            yield ("" if first else ",") + dumps(doc)
+            first = False
+        yield '],"success":true}'
+
+    # Get all projects (optionally paginated, projected and/or streamed)
     @app.route("/projects", methods=["GET"])
     def get_projects():
-        projects = [serialize_doc(p) for p in db.projects.find()]
-        return jsonify({"success": True, "projects": projects})
+        try:
+            after, limit, fields = list_args(request.args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        # Collection state + query string; checked before running the list query
+        etag = list_etag(project_db.list_etag(), request.query_string)
+        not_modified = conditional(etag)
+        if not_modified is not None:
+            return not_modified
+
+        mode = request.args.get("stream")
+        if mode in ("json", "ndjson"):
+            projects = project_db.iter_projects(limit=limit, after=after, fields=fields)
+            mimetype = "application/x-ndjson" if mode == "ndjson" else "application/json"
+            return with_etag(Response(stream_projects(projects, mode), mimetype=mimetype), etag)
+
+        projects = project_db.list_projects(limit=limit, after=after, fields=fields)
+        body = {"success": True, "projects": projects}
+        if limit is not None:
+            # Cursor for the next page; None once the collection is exhausted
+            body["next_after"] = projects[-1]["project_id"] if len(projects) == limit else None
+        return with_etag(jsonify(body), etag)
 
     # Create a new project
     @app.route("/projects", methods=["POST"])
     def create_project():
         try:
-            data = request.get_json()
-            if not data or "project_id" not in data or "project_name" not in data:
-                return jsonify({"success": False, "message": "Missing required fields"}), 400
+            data = request.get_json(silent=True)
+            try:
+                model = Project.from_request(data)
+            except ProjectValidationError as e:
+                return jsonify({"success": False, "message": str(e), "errors": e.errors}), 400
 
-            db.projects.insert_one(data)
-            data["_id"] = str(data.get("_id", ""))
-            return jsonify({"success": True, "project": data}), 201
+            project = project_db.create_project(model.to_dict())
+            return jsonify({"success": True, "project": project}), 201
+        except DuplicateKeyError:
+            return jsonify({"success": False, "message": "Project ID already exists"}), 409
         except Exception as e:
+            if is_outage(e):
+                raise
             print("❌ Error creating project:", e)
             return jsonify({"success": False, "message": str(e)}), 500
 
+    # Create / update / delete many projects in one request
+    @app.route("/projects/bulk", methods=["POST"])
+    def bulk_projects():
+        try:
+            projects, delete_ids, insert_only = bulk_request(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 413 if isinstance(e, TooManyItems) else 400
+
+        try:
+            results = project_db.bulk_upsert(projects, insert_only=insert_only)
+            deleted = project_db.bulk_delete(delete_ids)
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error in bulk request:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+        ok = all(r["status"] in ("created", "updated") for r in results)
+        body = {"success": ok, "results": results, "deleted": deleted}
+        # 207: some items failed, see the per-item status
+        return jsonify(body), 200 if ok else 207
+
+    # Add / remove members or hardware sets of one project: {"add": [...], "remove": [...]}
+    @app.route("/projects/<project_id>/members", methods=["PATCH"], defaults={"key": "members"})
+    @app.route("/projects/<project_id>/hardware_sets", methods=["PATCH"], defaults={"key": "hardware_sets"})
+    def change_project_arrays(project_id, key):
+        try:
+            changes = Project.clean_changes({"project_id": project_id, key: request.get_json(silent=True)})
+        except ProjectValidationError as e:
+            return jsonify({"success": False, "message": str(e), "errors": e.errors}), 400
+
+        try:
+            project = project_db.change_arrays(changes.pop("project_id"), changes)
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error updating project:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        if project is None:
+            return jsonify({"success": False, "message": "Project not found"}), 404
+        return jsonify({"success": True, "project": project})
+
+    # Add / remove across many projects: {"changes": [{"project_id", "members", "hardware_sets"}]}
+    @app.route("/projects/bulk", methods=["PATCH"])
+    def bulk_change_arrays():
+        try:
+            changes = bulk_changes(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 413 if isinstance(e, TooManyItems) else 400
+
+        try:
+            results = project_db.bulk_change_arrays(changes)
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error in bulk request:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+        ok = all(r["status"] == "updated" for r in results)
+        return jsonify({"success": ok, "results": results}), 200 if ok else 207
+
+    # Filter projects by member / hardware set / hardware count / text
+    @app.route("/projects/search", methods=["GET"])
+    def search_projects():
+        try:
+            _, limit, _ = list_args(request.args)
+            filters = search_filters(request.args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        etag = list_etag(project_db.list_etag(), request.query_string)
+        not_modified = conditional(etag)
+        if not_modified is not None:
+            return not_modified
+
+        limit = limit or MAX_PAGE_SIZE
+        try:
+            projects = project_db.search_projects(limit=limit, **filters)
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error searching projects:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        body = {"success": True, "projects": projects}
+        if not filters["q"]:
+            body["next_after"] = projects[-1]["project_id"] if len(projects) == limit else None
+        return with_etag(jsonify(body), etag)
+
+    # Server-sent events: insert/update/delete deltas (?project_id= to filter).
+    # Holds a worker thread per subscriber here; serve large audiences from asgi_app.
+    @app.route("/projects/events", methods=["GET"])
+    def project_events():
+        change_feed.start()
+        # Standalone servers fail the first watch(); answer 503 rather than an empty stream
+        if change_feed.wait_started(config.EVENTS_START_WAIT_SECONDS):
+            return jsonify({"success": False, "message": "Change stream unavailable (needs a replica set)"}), 503
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        events = stream_events(
+            change_feed,
+            last_event_id=last_event_id,
+            project_ids=[p for p in request.args.getlist("project_id") if p],
+            heartbeat=config.EVENTS_HEARTBEAT_SECONDS,
+            max_seconds=config.EVENTS_STREAM_SECONDS,
+        )
+        resp = Response(events, mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        # nginx: pass events through instead of buffering the response
+        resp.headers["X-Accel-Buffering"] = "no"
+        return resp
+
     # Get project by ID
     @app.route("/projects/<project_id>", methods=["GET"])
     def get_project_by_id(project_id):
-        proj = db.projects.find_one({"project_id": project_id})
+        proj = project_db.get_project(project_id)
         if proj:
-            return jsonify({"success": True, "project": serialize_doc(proj)})
+            etag = project_db.project_etag(proj)
+            return conditional(etag) or with_etag(jsonify({"success": True, "project": proj}), etag)
         return jsonify({"success": False, "message": "Project not found"}), 404
 
+    # ----------------------------------------
+    # Hardware sets
+    # ----------------------------------------
+    # HTTP status per HardwareDB outcome
+    hardware_status = {"ok": 200, "not_found": 404, "insufficient": 409, "not_checked_out": 409, "conflict": 409}
+
+    def hardware_response(outcome):
+        status = outcome["status"]
+        body = {"success": status == "ok", "status": status, "hardware_set": outcome["hardware_set"]}
+        if status == "not_found":
+            body["message"] = "Hardware set not found"
+        return jsonify(body), hardware_status[status]
+
+    @app.route("/hardware", methods=["GET"])
+    def list_hardware():
+        return jsonify({"success": True, "hardware_sets": hardware_db.list_sets()})
+
+    # Create a hardware set: {"hw_id", "capacity", "name"}
+    @app.route("/hardware", methods=["POST"])
+    def create_hardware():
+        data = request.get_json(silent=True) or {}
+        hw_id = data.get("hw_id")
+        if not isinstance(hw_id, str) or not hw_id.strip():
+            return jsonify({"success": False, "message": "hw_id is required"}), 400
+        try:
+            hw = hardware_db.create_set(hw_id.strip(), data.get("capacity"), name=str(data.get("name") or ""))
+            return jsonify({"success": True, "hardware_set": hw}), 201
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except DuplicateKeyError:
+            return jsonify({"success": False, "message": "Hardware set already exists"}), 409
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error creating hardware set:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    @app.route("/hardware/<hw_id>", methods=["GET"])
+    def get_hardware(hw_id):
+        hw = hardware_db.get_set(hw_id)
+        if hw:
+            return jsonify({"success": True, "hardware_set": hw})
+        return jsonify({"success": False, "message": "Hardware set not found"}), 404
+
+    # Resize: {"capacity"}; refused while projects hold more than the new capacity
+    @app.route("/hardware/<hw_id>", methods=["PATCH"])
+    def resize_hardware(hw_id):
+        data = request.get_json(silent=True) or {}
+        try:
+            return hardware_response(hardware_db.set_capacity(hw_id, data.get("capacity")))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error resizing hardware set:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    # Check units out to / back in from a project: {"project_id", "qty"}
+    @app.route("/hardware/<hw_id>/checkout", methods=["POST"], defaults={"action": "checkout"})
+    @app.route("/hardware/<hw_id>/checkin", methods=["POST"], defaults={"action": "checkin"})
+    def move_hardware(hw_id, action):
+        data = request.get_json(silent=True) or {}
+        project_id = data.get("project_id")
+        if not isinstance(project_id, str) or not project_id.strip():
+            return jsonify({"success": False, "message": "project_id is required"}), 400
+        project_id = project_id.strip()
+        try:
+            if action == "checkout" and project_db.get_project(project_id) is None:
+                return jsonify({"success": False, "message": "Project not found"}), 404
+            move = hardware_db.checkout if action == "checkout" else hardware_db.checkin
+            return hardware_response(move(hw_id, project_id, data.get("qty")))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print(f"❌ Error in hardware {action}:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    # Ledger for one set, oldest first; ?after=<seq>&limit=
+    @app.route("/hardware/<hw_id>/ledger", methods=["GET"])
+    def hardware_ledger(hw_id):
+        after = request.args.get("after", type=int)
+        limit = max(1, min(request.args.get("limit", default=100, type=int), MAX_PAGE_SIZE))
+        entries = hardware_db.ledger_entries(hw_id=hw_id, after=after, limit=limit)
+        return jsonify({"success": True, "ledger": entries})
+
+    @app.route("/hardware/<hw_id>/audit", methods=["GET"])
+    def hardware_audit(hw_id):
+        report = hardware_db.audit(hw_id)
+        if report is None:
+            return jsonify({"success": False, "message": "Hardware set not found"}), 404
+        return jsonify({"success": True, "audit": report})
+
+    # Hardware units a project currently holds
+    @app.route("/projects/<project_id>/hardware", methods=["GET"])
+    def project_hardware(project_id):
+        return jsonify({"success": True, "checkouts": hardware_db.project_checkouts(project_id)})
+
+    # Cache counters, for sizing PROJECT_CACHE_SIZE / PROJECT_CACHE_TTL
+    @app.route("/stats/cache")
+    def cache_stats():
+        stats = cache.stats() if cache is not None else None
+        return jsonify({"success": True, "cache": stats})
+
+    # Write-behind batching of POST /projects (null when WRITE_BEHIND is off)
+    @app.route("/stats/writes")
+    def write_stats():
+        stats = write_behind.stats() if write_behind is not None else None
+        return jsonify({"success": True, "pid": os.getpid(), "write_behind": stats})
+
+    # Change feed behind /projects/events for this worker
+    @app.route("/stats/events")
+    def events_stats():
+        return jsonify({"success": True, "pid": os.getpid(), "events": change_feed.stats()})
+
+    # Connection pool utilization and checkout waits for this worker
+    @app.route("/stats/pool")
+    def pool_stats():
+        return jsonify({"success": True, "pid": os.getpid(), "pool": pool_monitor.stats()})
+
+    # Rows and heap bytes of this worker's /api/spend snapshot (null until the first query)
+    @app.route("/stats/spend")
+    def spend_stats():
+        stats = app.extensions["spend"].stats() if "spend" in app.extensions else None
+        return jsonify({"success": True, "pid": os.getpid(), "spend": stats})
+
     # Render the Top 10 Companies (Frontend)
     @app.route("/top10companies")
     def top10companies_page():
         return render_template("top10companies.html")
 
+    # Top brands by spend; ?state=CA&subindustry=Fast%20Fashion&period=2018-01&limit=5
+    @app.route("/api/top10companies", methods=["GET"])
+    def top10companies():
+        try:
+            leaderboard.refresh()
+            limit = request.args.get("limit", default=leaderboard.k, type=int)
+            data = leaderboard.top(
+                state=request.args.get("state"),
+                subindustry=request.args.get("subindustry"),
+                period=request.args.get("period"),
+                limit=max(0, min(limit, leaderboard.k)),
+            )
+            return jsonify({"success": True, "data": data, "error_message": None})
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error building leaderboard:", e)
+            return jsonify({"success": False, "data": [], "error_message": str(e)}), 500
+
+    # Spend / TRANS_COUNT totals, e.g.
+    # /api/spend?group_by=state,period&bucket=month&industry=Retail&from=2018-01-01&to=2018-12-31
+    @app.route("/api/spend", methods=["GET"])
+    def spend_totals():
+        args = request.args
+
+        def csv_arg(name):
+            value = args.get(name)
+            return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+        try:
+            brand_ids = [int(b) for b in csv_arg("brand_id") or []]
+        except ValueError:
+            return jsonify({"success": False, "message": "brand_id must be integers"}), 400
+        limit = args.get("limit")
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                return jsonify({"success": False, "message": "limit must be an integer"}), 400
+        from spend_analytics import SpendQueryError
+
+        try:
+            result = spend_store().query(
+                group_by=csv_arg("group_by") or [],
+                bucket=args.get("bucket", "day"),
+                brand_ids=brand_ids or None,
+                states=csv_arg("state"),
+                industries=csv_arg("industry"),
+                date_from=args.get("from"),
+                date_to=args.get("to"),
+                limit=limit,
+            )
+        except SpendQueryError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error in spend query:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        return jsonify({"success": True, **result})
+
+    # Brand autocomplete: /api/brands?q=sau&limit=10
+    @app.route("/api/brands", methods=["GET"])
+    def search_brands():
+        try:
+            brands.refresh()
+            limit = max(1, min(request.args.get("limit", default=20, type=int), 100))
+            found = brands.search(request.args.get("q", ""), limit=limit)
+            return jsonify({"success": True, "brands": found})
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error searching brands:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    @app.route("/api/brands/<int:brand_id>", methods=["GET"])
+    def get_brand(brand_id):
+        try:
+            brands.refresh()
+            brand = brands.get(brand_id)
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error reading brand:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        if brand is None:
+            return jsonify({"success": False, "message": "Brand not found"}), 404
+        return jsonify({"success": True, "brand": brand})
+
+    # Precomputed totals per brand/state: /api/rollups?grain=week&brand_id=13625&from=2018-01-01
+    @app.route("/api/rollups", methods=["GET"])
+    def spend_rollups():
+        args = request.args
+        try:
+            brand_ids = [int(b) for b in args.get("brand_id", "").split(",") if b.strip()]
+        except ValueError:
+            return jsonify({"success": False, "message": "brand_id must be integers"}), 400
+        states = [s.strip() for s in args.get("state", "").split(",") if s.strip()]
+        try:
+            data = rollups.query(
+                grain=args.get("grain", "day"),
+                brand_ids=brand_ids or None,
+                states=states or None,
+                date_from=args.get("from"),
+                date_to=args.get("to"),
+                limit=max(1, min(args.get("limit", default=1000, type=int), 10000)),
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            if is_outage(e):
+                raise
+            print("❌ Error reading rollups:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        return jsonify({"success": True, "data": data})
+
     return app
 
 
@@ -0,0 +1,313 @@
+"""
+ASGI variant of the projects service.
+
+The project routes of app.py with the same JSON shapes, served by Quart on
+top of AsyncProjectDB, so an in-flight Mongo call no longer holds a whole
+worker: GET/POST /projects (paging, fields, streaming, ETag/304), bulk
+POST/PATCH, member/hardware-set PATCH, /projects/search, /projects/events,
+GET /projects/<id>, /health (pings Mongo), /stats/cache|events|pool and
+the top-10 leaderboard. Query parsing and limits come from requestargs.
+
+Only in app.py (serve them from the Flask workers): the /hardware
+checkout routes, /api/spend, /api/brands, /api/rollups, /stats/writes,
+/metrics and response compression; the circuit breaker / stale reads
+and write-behind batching are sync-only as well.
+
+Run with:
+    uvicorn --factory asgi_app:create_asgi_app --host 0.0.0.0 --port 2000 --workers 4
+"""
+import asyncio
+import os
+import time
+
+import pymongo
+from quart import Quart, Response, jsonify, render_template, request
+from quart_cors import cors
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from async_projectdb import AsyncProjectDB
+from changefeed import ChangeFeed, stream_events_async
+from config import Config
+from dbpool import PoolMonitor
+from leaderboard import Leaderboard
+from project import Project, ProjectValidationError
+from projectcache import ProjectCache
+from requestargs import (
+    MAX_PAGE_SIZE, TooManyItems, bulk_changes, bulk_request, list_args, list_etag, search_filters,
+)
+
+
+def create_asgi_app(config=Config, project_db=None):
+    app = Quart(__name__, static_folder="static", template_folder="templates")
+    app.config.from_object(config)
+    app = cors(app)
+
+    # ----------------------------------------
+    # MongoDB Connection
+    # ----------------------------------------
+    cache = ProjectCache(maxsize=config.PROJECT_CACHE_SIZE, ttl=config.PROJECT_CACHE_TTL)
+    pool_monitor = PoolMonitor(max_pool_size=config.MONGO_MAX_POOL_SIZE)
+    if project_db is None:
+        project_db = AsyncProjectDB.from_config(config, cache=cache, monitor=pool_monitor)
+    cache = project_db.cache
+    app.extensions["project_db"] = project_db
+
+    leaderboard = Leaderboard(
+        config.SPEND_DATA_DIR, k=config.LEADERBOARD_SIZE, refresh_interval=config.LEADERBOARD_REFRESH_SECONDS
+    )
+    app.extensions["leaderboard"] = leaderboard
+
+    # One change stream per worker; subscribers only park a coroutine each
+    change_feed = ChangeFeed(
+        lambda: project_db.collection,
+        dumps=lambda obj: app.json.dumps(obj, separators=(",", ":")),
+        buffer_size=config.CHANGE_FEED_BUFFER,
+    )
+    if config.PROJECT_CACHE_WATCH and cache is not None:
+        change_feed.add_listener(cache.apply_change)
+    app.extensions["change_feed"] = change_feed
+    tasks = []
+
+    @app.before_serving
+    async def startup():
+        # Indexes come from migrate.py; the client connects on first use
+        tasks.append(asyncio.get_running_loop().create_task(change_feed.run()))
+        print(f"✅ Using MongoDB database: {config.MONGO_DB}")
+
+    @app.after_serving
+    async def shutdown():
+        for task in tasks:
+            task.cancel()
+        await project_db.close()
+
+    # ----------------------------------------
+    # ROUTES
+    # ----------------------------------------
+
+    @app.route("/")
+    async def index():
+        return await render_template("index.html")
+
+    @app.route("/health")
+    async def health():
+        started = time.perf_counter()
+        try:
+            with pymongo.timeout(config.MONGO_READ_TIMEOUT_MS / 1000):
+                await project_db.client.admin.command("ping")
+        except PyMongoError as e:
+            return jsonify({"status": "down", "message": f"MongoDB unreachable: {e}"}), 503
+        latency = (time.perf_counter() - started) * 1000
+        body = {"mongo_latency_ms": round(latency, 2)}
+        if latency >= config.HEALTH_SLOW_MS:
+            body.update(status="degraded", message="MongoDB responding slowly")
+        else:
+            body.update(status="ok", message="MongoDB connection active")
+        return jsonify(body)
+
+    def conditional(etag):
+        if request.if_none_match.contains_weak(etag):
+            resp = Response("", status=304)
+            resp.set_etag(etag, weak=True)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return None
+
+    def with_etag(resp, etag):
+        resp.set_etag(etag, weak=True)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    async def stream_projects(projects, mode):
+        def dumps(doc):
+            return app.json.dumps(doc, separators=(",", ":"))
+
+        if mode == "ndjson":
+            async for doc in projects:
+                yield dumps(doc) + "\n"
+            return
+
+        yield '{"projects":['
+        first = True
+        async for doc in projects:
+            yield ("" if first else ",") + dumps(doc)
+            first = False
+        yield '],"success":true}'
+
+    @app.route("/projects", methods=["GET"])
+    async def get_projects():
+        try:
+            after, limit, fields = list_args(request.args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        etag = list_etag(await project_db.list_etag(), request.query_string)
+        not_modified = conditional(etag)
+        if not_modified is not None:
+            return not_modified
+
+        mode = request.args.get("stream")
+        if mode in ("json", "ndjson"):
+            projects = project_db.iter_projects(limit=limit, after=after, fields=fields)
+            mimetype = "application/x-ndjson" if mode == "ndjson" else "application/json"
+            return with_etag(Response(stream_projects(projects, mode), mimetype=mimetype), etag)
+
+        projects = await project_db.list_projects(limit=limit, after=after, fields=fields)
+        body = {"success": True, "projects": projects}
+        if limit is not None:
+            body["next_after"] = projects[-1]["project_id"] if len(projects) == limit else None
+        return with_etag(jsonify(body), etag)
+
+    @app.route("/projects", methods=["POST"])
+    async def create_project():
+        try:
+            data = await request.get_json(silent=True)
+            try:
+                model = Project.from_request(data)
+            except ProjectValidationError as e:
+                return jsonify({"success": False, "message": str(e), "errors": e.errors}), 400
+
+            project = await project_db.create_project(model.to_dict())
+            return jsonify({"success": True, "project": project}), 201
+        except DuplicateKeyError:
+            return jsonify({"success": False, "message": "Project ID already exists"}), 409
+        except Exception as e:
+            print("❌ Error creating project:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    @app.route("/projects/bulk", methods=["POST"])
+    async def bulk_projects():
+        try:
+            projects, delete_ids, insert_only = bulk_request(await request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 413 if isinstance(e, TooManyItems) else 400
+
+        try:
+            results = await project_db.bulk_upsert(projects, insert_only=insert_only)
+            deleted = await project_db.bulk_delete(delete_ids)
+        except Exception as e:
+            print("❌ Error in bulk request:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+        ok = all(r["status"] in ("created", "updated") for r in results)
+        body = {"success": ok, "results": results, "deleted": deleted}
+        return jsonify(body), 200 if ok else 207
+
+    @app.route("/projects/<project_id>/members", methods=["PATCH"], defaults={"key": "members"})
+    @app.route("/projects/<project_id>/hardware_sets", methods=["PATCH"], defaults={"key": "hardware_sets"})
+    async def change_project_arrays(project_id, key):
+        try:
+            changes = Project.clean_changes({"project_id": project_id, key: await request.get_json(silent=True)})
+        except ProjectValidationError as e:
+            return jsonify({"success": False, "message": str(e), "errors": e.errors}), 400
+
+        try:
+            project = await project_db.change_arrays(changes.pop("project_id"), changes)
+        except Exception as e:
+            print("❌ Error updating project:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        if project is None:
+            return jsonify({"success": False, "message": "Project not found"}), 404
+        return jsonify({"success": True, "project": project})
+
+    @app.route("/projects/bulk", methods=["PATCH"])
+    async def bulk_change_arrays():
+        try:
+            changes = bulk_changes(await request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 413 if isinstance(e, TooManyItems) else 400
+
+        try:
+            results = await project_db.bulk_change_arrays(changes)
+        except Exception as e:
+            print("❌ Error in bulk request:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+
+        ok = all(r["status"] == "updated" for r in results)
+        return jsonify({"success": ok, "results": results}), 200 if ok else 207
+
+    @app.route("/projects/search", methods=["GET"])
+    async def search_projects():
+        try:
+            _, limit, _ = list_args(request.args)
+            filters = search_filters(request.args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        etag = list_etag(await project_db.list_etag(), request.query_string)
+        not_modified = conditional(etag)
+        if not_modified is not None:
+            return not_modified
+
+        limit = limit or MAX_PAGE_SIZE
+        try:
+            projects = await project_db.search_projects(limit=limit, **filters)
+        except Exception as e:
+            print("❌ Error searching projects:", e)
+            return jsonify({"success": False, "message": str(e)}), 500
+        body = {"success": True, "projects": projects}
+        if not filters["q"]:
+            body["next_after"] = projects[-1]["project_id"] if len(projects) == limit else None
+        return with_etag(jsonify(body), etag)
+
+    @app.route("/projects/events", methods=["GET"])
+    async def project_events():
+        if change_feed.error:
+            return jsonify({"success": False, "message": "Change stream unavailable (needs a replica set)"}), 503
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        events = stream_events_async(
+            change_feed,
+            last_event_id=last_event_id,
+            project_ids=[p for p in request.args.getlist("project_id") if p],
+            heartbeat=config.EVENTS_HEARTBEAT_SECONDS,
+            max_seconds=config.EVENTS_STREAM_SECONDS,
+        )
+        resp = Response(events, mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
+        # The stream ends itself after EVENTS_STREAM_SECONDS, not RESPONSE_TIMEOUT
+        resp.timeout = None
+        return resp
+
+    @app.route("/projects/<project_id>", methods=["GET"])
+    async def get_project_by_id(project_id):
+        proj = await project_db.get_project(project_id)
+        if proj:
+            etag = project_db.project_etag(proj)
+            return conditional(etag) or with_etag(jsonify({"success": True, "project": proj}), etag)
+        return jsonify({"success": False, "message": "Project not found"}), 404
+
+    @app.route("/stats/cache")
+    async def cache_stats():
+        stats = cache.stats() if cache is not None else None
+        return jsonify({"success": True, "cache": stats})
+
+    @app.route("/stats/events")
+    async def events_stats():
+        return jsonify({"success": True, "pid": os.getpid(), "events": change_feed.stats()})
+
+    @app.route("/stats/pool")
+    async def pool_stats():
+        return jsonify({"success": True, "pid": os.getpid(), "pool": pool_monitor.stats()})
+
+    @app.route("/top10companies")
+    async def top10companies_page():
+        return await render_template("top10companies.html")
+
+    @app.route("/api/top10companies", methods=["GET"])
+    async def top10companies():
+        try:
+            # Only file reads when the extracts changed; cheap enough inline
+            leaderboard.refresh()
+            limit = request.args.get("limit", default=leaderboard.k, type=int)
+            data = leaderboard.top(
+                state=request.args.get("state"),
+                subindustry=request.args.get("subindustry"),
+                period=request.args.get("period"),
+                limit=max(0, min(limit, leaderboard.k)),
+            )
+            return jsonify({"success": True, "data": data, "error_message": None})
+        except Exception as e:
+            print("❌ Error building leaderboard:", e)
+            return jsonify({"success": False, "data": [], "error_message": str(e)}), 500
+
+    return app
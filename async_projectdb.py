@@ -0,0 +1,379 @@
+# async_projectdb.py – asyncio counterpart of ProjectDB (pymongo AsyncMongoClient)
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+from bson.objectid import ObjectId
+
+from dbpool import PoolMonitor, client_options
+from projectcache import ProjectCache
+from projectdb import BULK_BATCH_SIZE, SEARCH_INDEXES, ProjectDB
+
+
+class AsyncProjectDB:
+    """
+    Same API and document shapes as ProjectDB, with every method awaitable.
+    The client is created on first use inside the running event loop and
+    again after a fork, so one instance can be built at import time.
+    """
+
+    # Document shaping is shared with the sync wrapper
+    _normalize = staticmethod(ProjectDB._normalize)
+    _projection = staticmethod(ProjectDB._projection)
+    _search_query = staticmethod(ProjectDB._search_query)
+    _shaped_pipeline = staticmethod(ProjectDB._shaped_pipeline)
+    _bulk_upsert_ops = ProjectDB._bulk_upsert_ops
+    _array_pipeline = staticmethod(ProjectDB._array_pipeline)
+    _array_change_ops = ProjectDB._array_change_ops
+    _array_rounds = staticmethod(ProjectDB._array_rounds)
+    _array_round_errors = staticmethod(ProjectDB._array_round_errors)
+    _bulk_upsert_outcome = ProjectDB._bulk_upsert_outcome
+    _upsert_update = staticmethod(ProjectDB._upsert_update)
+    _stamp_new = staticmethod(ProjectDB._stamp_new)
+    _versioned = staticmethod(ProjectDB._versioned)
+    project_etag = staticmethod(ProjectDB.project_etag)
+
+    def __init__(
+        self,
+        client_factory: Callable[[], AsyncMongoClient],
+        dbname: str = "projects_db",
+        cache: Optional[ProjectCache] = None,
+        shape_in_db: bool = True,
+    ):
+        """
+        shape_in_db as for ProjectDB: reads are normalized by an $addFields
+        stage on the server unless it is off (stand-ins without $type).
+        """
+        self._client_factory = client_factory
+        self.dbname = dbname
+        self.cache = cache
+        self.shape_in_db = shape_in_db
+        self._client: Optional[AsyncMongoClient] = None
+        self._pid: Optional[int] = None
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Any,
+        cache: Optional[ProjectCache] = None,
+        monitor: Optional[PoolMonitor] = None,
+        listeners: Iterable[Any] = (),
+    ) -> "AsyncProjectDB":
+        options = client_options(config)
+
+        def factory() -> AsyncMongoClient:
+            kwargs = dict(options)
+            event_listeners = list(listeners)
+            if monitor is not None:
+                monitor.reset()
+                event_listeners.append(monitor)
+            if event_listeners:
+                kwargs["event_listeners"] = event_listeners
+            if config.MONGO_URI:
+                return AsyncMongoClient(config.MONGO_URI, **kwargs)
+            return AsyncMongoClient(**kwargs)
+
+        return cls(factory, dbname=config.MONGO_DB, cache=cache)
+
+    # ---------- Connection ----------
+
+    @property
+    def client(self) -> AsyncMongoClient:
+        if self._client is None or self._pid != os.getpid():
+            self._client = self._client_factory()
+            self._pid = os.getpid()
+        return self._client
+
+    @property
+    def collection(self):
+        return self.client[self.dbname]["projects"]
+
+    async def ensure_indexes(self) -> List[str]:
+        """
+        ProjectDB.ensure_indexes; a failure is raised, not swallowed.
+        """
+        try:
+            names = [
+                await self.collection.create_index(
+                    [("project_id", ASCENDING)], unique=True, name="idx_project_id_unique"
+                ),
+                await self.collection.create_index([("updated_at", DESCENDING)], name="idx_updated_at"),
+            ]
+            for keys, name in SEARCH_INDEXES:
+                names.append(await self.collection.create_index(keys, name=name))
+        except PyMongoError as e:
+            print("[AsyncProjectDB] ensure_indexes error:", e)
+            raise
+        return names
+
+    async def _find_normalized(
+        self,
+        query: Dict[str, Any],
+        sort: Any = False,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        ProjectDB._find_normalized: the same $addFields shaping, or
+        _normalize in Python when shape_in_db is off.
+        """
+        if sort is True:
+            sort = [("project_id", ASCENDING)]
+        if not self.shape_in_db:
+            cursor = self.collection.find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            async for doc in cursor:
+                yield self._normalize(doc)
+            return
+        async for doc in await self.collection.aggregate(self._shaped_pipeline(query, sort, limit)):
+            yield doc
+
+    async def list_etag(self) -> str:
+        try:
+            count = await self.collection.estimated_document_count()
+            newest = await self.collection.find_one(
+                {}, {"updated_at": 1, "_id": 0}, sort=[("updated_at", DESCENDING)]
+            )
+        except PyMongoError as e:
+            print("[AsyncProjectDB] list_etag error:", e)
+            raise
+        stamp = newest.get("updated_at") if newest else None
+        return f"{count}-{stamp.timestamp() if isinstance(stamp, datetime) else 0}"
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    # ---------- CRUD ----------
+
+    async def create_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            project.setdefault("members_list", [])
+            project.setdefault("hardware_set_id", [])
+            project.setdefault("num_of_hardware_sets", len(project["hardware_set_id"]))
+            self._stamp_new(project)
+
+            res = await self.collection.insert_one(project)
+            inserted = self._normalize(await self.collection.find_one({"_id": res.inserted_id}))
+            if self.cache is not None and inserted:
+                self.cache.put(inserted["project_id"], inserted)
+            return inserted
+        except PyMongoError as e:
+            print("[AsyncProjectDB] create_project error:", e)
+            raise
+
+    async def iter_projects(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        query: Dict[str, Any] = {}
+        if after is not None:
+            query["project_id"] = {"$gt": after}
+        projection = self._projection(fields)
+        try:
+            if projection is None:
+                async for doc in self._find_normalized(query, sort=True, limit=limit):
+                    yield doc
+                return
+            cursor = self.collection.find(query, projection).sort("project_id", ASCENDING)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            async for doc in cursor:
+                if isinstance(doc.get("_id"), ObjectId):
+                    doc["_id"] = str(doc["_id"])
+                yield doc
+        except PyMongoError as e:
+            print("[AsyncProjectDB] iter_projects error:", e)
+            raise
+
+    async def list_projects(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        if after is None and fields is None:
+            try:
+                # A page must be in project_id order: next_after keys off its last item
+                return [doc async for doc in self._find_normalized({}, sort=limit is not None, limit=limit)]
+            except PyMongoError as e:
+                print("[AsyncProjectDB] list_projects error:", e)
+                raise
+        return [doc async for doc in self.iter_projects(limit=limit, after=after, fields=fields)]
+
+    async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        if self.cache is not None:
+            cached = self.cache.get(project_id)
+            if cached is not None:
+                return cached
+            since = self.cache.read_token()
+        try:
+            found = self._find_normalized({"project_id": project_id}, limit=1)
+            doc = await anext(found, None)
+            await found.aclose()
+            if not doc:
+                return None
+            if self.cache is not None:
+                # Skipped if a write landed while we were reading
+                self.cache.put(project_id, doc, since=since)
+            return doc
+        except PyMongoError as e:
+            print("[AsyncProjectDB] get_project error:", e)
+            raise
+
+    async def update_project(self, project_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            if "hardware_set_id" in updates and "num_of_hardware_sets" not in updates:
+                hw = updates["hardware_set_id"]
+                if isinstance(hw, list):
+                    updates["num_of_hardware_sets"] = len(hw)
+
+            updated = await self.collection.find_one_and_update(
+                {"project_id": project_id},
+                self._versioned({"$set": dict(updates)}),
+                return_document=ReturnDocument.AFTER,
+            )
+            if self.cache is not None:
+                self.cache.invalidate(project_id)
+            if not updated:
+                return None
+            updated = self._normalize(updated)
+            if self.cache is not None:
+                self.cache.put(updated["project_id"], updated)
+            return updated
+        except PyMongoError as e:
+            print("[AsyncProjectDB] update_project error:", e)
+            raise
+
+    async def delete_project(self, project_id: str) -> bool:
+        try:
+            res = await self.collection.delete_one({"project_id": project_id})
+            if self.cache is not None:
+                self.cache.invalidate(project_id)
+            return res.deleted_count > 0
+        except PyMongoError as e:
+            print("[AsyncProjectDB] delete_project error:", e)
+            raise
+
+    # ---------- Array changes ----------
+
+    async def change_arrays(self, project_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            updated = await self.collection.find_one_and_update(
+                {"project_id": project_id},
+                self._array_pipeline(changes),
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            print("[AsyncProjectDB] change_arrays error:", e)
+            raise
+        if self.cache is not None:
+            self.cache.invalidate(project_id)
+        if not updated:
+            return None
+        updated = self._normalize(updated)
+        if self.cache is not None:
+            self.cache.put(project_id, updated)
+        return updated
+
+    async def bulk_change_arrays(
+        self, items: List[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(items), batch_size):
+            batch_results, ops = self._array_change_ops(items[start:start + batch_size], start)
+            results.extend(batch_results)
+            if not ops:
+                continue
+            try:
+                cursor = self.collection.find({"project_id": {"$in": list(ops)}}, {"project_id": 1, "_id": 0})
+                existing = {doc["project_id"] async for doc in cursor}
+                for entries in self._array_rounds(batch_results, ops, existing):
+                    try:
+                        await self.collection.bulk_write([op for _, op in entries], ordered=False)
+                    except BulkWriteError as e:
+                        self._array_round_errors(batch_results, entries, e.details.get("writeErrors", []))
+            except PyMongoError as e:
+                print("[AsyncProjectDB] bulk_change_arrays error:", e)
+                raise
+            if self.cache is not None:
+                for project_id in existing:
+                    self.cache.invalidate(project_id)
+        return results
+
+    # ---------- Search ----------
+
+    async def search_projects(self, limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+        query, sort = self._search_query(**filters)
+        try:
+            return [doc async for doc in self._find_normalized(query, sort=sort, limit=limit)]
+        except PyMongoError as e:
+            print("[AsyncProjectDB] search_projects error:", e)
+            raise
+
+    # ---------- Bulk ----------
+
+    async def bulk_upsert(
+        self,
+        projects: List[Dict[str, Any]],
+        insert_only: bool = False,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(projects), batch_size):
+            batch = projects[start:start + batch_size]
+            batch_results, ops, op_to_result = self._bulk_upsert_ops(batch, start, insert_only)
+            results.extend(batch_results)
+            if not ops:
+                continue
+            try:
+                res = await self.collection.bulk_write(ops, ordered=False)
+                self._bulk_upsert_outcome(batch_results, op_to_result, res.upserted_ids or {}, [])
+            except BulkWriteError as e:
+                upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+                self._bulk_upsert_outcome(
+                    batch_results, op_to_result, upserted, e.details.get("writeErrors", [])
+                )
+            except PyMongoError as e:
+                print("[AsyncProjectDB] bulk_upsert error:", e)
+                raise
+        return results
+
+    async def bulk_delete(self, project_ids: List[str], concurrency: int = 16) -> List[Dict[str, Any]]:
+        """
+        ProjectDB.bulk_delete, with up to `concurrency` delete_one calls in
+        flight (kept well under the pool size so other requests still get
+        connections).
+        """
+        results: List[Dict[str, Any]] = []
+        first: Dict[str, int] = {}
+        for i, pid in enumerate(project_ids):
+            results.append({"index": i, "project_id": pid})
+            if pid in first:
+                results[i].update(status="duplicate", message="Repeated in this request")
+            else:
+                first[pid] = i
+
+        async def delete(pid: str) -> None:
+            res = await self.collection.delete_one({"project_id": pid})
+            results[first[pid]]["status"] = "deleted" if res.deleted_count else "not_found"
+            if self.cache is not None:
+                self.cache.invalidate(pid)
+
+        ids = list(first)
+        for start in range(0, len(ids), concurrency):
+            try:
+                await asyncio.gather(*(delete(pid) for pid in ids[start:start + concurrency]))
+            except PyMongoError as e:
+                print("[AsyncProjectDB] bulk_delete error:", e)
+                raise
+        return results
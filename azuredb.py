@@ -1,56 +1,75 @@
-import pandas as pd
-# import pymssql
-# # run in terminal : nc -vz msitmproject.database.windows.net 1433
-# conn = pymssql.connect(
-#   server='msitmproject.database.windows.net',
-#   user='CloudSAffa4d29c',
-#   password='Msitm1234%',
-#   database='MSITM_Project_Datbase',
-#   port=1433
-# )
-
-import pandas as pd
-from sqlalchemy import create_engine
-
-server = "msitmproject.database.windows.net"
-database = "MSITM_Project_Datbase"
-user = "CloudSAffa4d29c"
-password = "Msitm1234%"
-
-engine = create_engine(f"mssql+pymssql://{user}:{password}@{server}:1433/{database}")
-
-query = "SELECT TOP 10 * FROM ingest.stg_daily_spend"
-df = pd.read_sql(query, engine)
-
-print(df.head())
-df.head(10).to_csv("stg_daily_spend_top10.csv", index=False)
-
-
-query2 = "SELECT TOP 10 * FROM ingest.stg_brand_detail"
-df2 = pd.read_sql(query2, engine)
-
-print(df2.head())
-df2.head(10).to_csv("stg_brand_detail.csv", index=False)
-
-# query1 = "SELECT * FROM ingest.stg_daily_spend"
-# df = pd.read_sql(query1, conn)
-
-# # print first 5 rows for display
-# print(df.head())
-
-# # save only the first 10 rows to CSV
-# df.head(10).to_csv("stg_daily_spend_top10.csv", index=False)
-
-# print("CSV created: stg_daily_spend_top10.csv")
-
-
-# query2 = "SELECT * FROM ingest.stg_brand_detail"
-# df = pd.read_sql(query2, conn)
-
-# # print first 5 rows for display
-# print(df.head())
-
-# # save only the first 10 rows to CSV
-# df.head(10).to_csv("brands.csv", index=False)
-
-# print("CSV created: brands.csv")
\ No newline at end of file
+# azuredb.py – pull the staged spend/brand tables out of Azure SQL
+#
+# Credentials come from AZURE_SQL_SERVER / AZURE_SQL_DATABASE /
+# AZURE_SQL_USERNAME / AZURE_SQL_PASSWORD in .env.
+#
+#   python azuredb.py                      # incremental columnar extract (spend_ingest)
+#   python azuredb.py --full --readers 4   # parallel snapshot of all tables (extract_runner)
+#   python azuredb.py --sample 10          # small CSV samples into data/
+#
+# run in terminal to check reachability: nc -vz <AZURE_SQL_SERVER> 1433
+
+import argparse
+import csv
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+import spend_ingest
+
+
+def write_sample(engine, table: str, path: str, rows: int) -> int:
+    """
+    First `rows` rows of `table` as CSV, streamed rather than held in a DataFrame.
+    """
+    written = 0
+    with engine.connect() as conn, open(path, "w", newline="", encoding="utf-8") as f:
+        result = conn.execution_options(stream_results=True).execute(text(f"SELECT TOP {int(rows)} * FROM {table}"))
+        writer = csv.writer(f)
+        writer.writerow(result.keys())
+        for partition in result.partitions(1000):
+            writer.writerows(partition)
+            written += len(partition)
+    return written
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Extract ingest.stg_daily_spend / stg_brand_detail")
+    parser.add_argument("--out", default="data/spend")
+    parser.add_argument("--chunk-rows", type=int, default=spend_ingest.DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--format", choices=("arrow", "parquet"), default="arrow")
+    parser.add_argument("--sample", type=int, help="only write the first N rows of each table as CSV into data/")
+    parser.add_argument("--full", action="store_true", help="parallel snapshot of every table instead of an increment")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.full:
+        import extract_runner
+
+        return extract_runner.main([
+            "--out", args.out, "--readers", str(args.readers), "--workers", str(args.workers),
+            "--chunk-rows", str(args.chunk_rows),
+        ])
+    engine = spend_ingest.make_engine(spend_ingest.azure_url_from_env())
+
+    if args.sample:
+        for table, name in (
+            (spend_ingest.SPEND_TABLE, "stg_daily_spend_top10.csv"),
+            (spend_ingest.BRAND_TABLE, "stg_brand_detail.csv"),
+        ):
+            path = os.path.join("data", name)
+            print(f"CSV created: {path} ({write_sample(engine, table, path, args.sample)} rows)")
+        return 0
+
+    stats = spend_ingest.extract_spend(engine, args.out, chunk_rows=args.chunk_rows, fmt=args.format)
+    stats["brands"] = spend_ingest.extract_brands(engine, args.out, fmt=args.format)
+    print(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
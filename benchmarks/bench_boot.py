@@ -0,0 +1,171 @@
+"""
+Cold start: how long a fresh worker takes from exec to its first response,
+and where that time goes.
+
+Each run is a new interpreter that imports app, calls create_app() and
+serves one request through the test client; the parent times the whole
+thing from spawn (interpreter start included) and the child reports each
+phase. --gunicorn also times `gunicorn app:create_app()` from spawn to the
+first 200 on --path. A `python -X importtime` pass lists the imports that
+dominate `import app` and which heavy modules are loaded by then.
+Medians over --runs go to a JSON file that can be diffed against a run
+from another commit.
+
+    python -m benchmarks.bench_boot --runs 10
+    python -m benchmarks.bench_boot --gunicorn --path /projects?limit=1
+    python -m benchmarks.bench_boot --compare bench_boot_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.bench_api import git_commit
+from benchmarks.loadgen import wait_until_up
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Should only be imported by the endpoints that need them
+HEAVY_MODULES = ("pandas", "sqlalchemy", "pyarrow", "numpy")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+status = flask_app.test_client().get(sys.argv[1]).status_code
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "status": status,
+    "modules": len(sys.modules),
+    "heavy": sorted({m.split(".")[0] for m in sys.modules} & set(sys.argv[2].split(","))),
+}))
+"""
+
+# "import time:   self [us] | cumulative | imported package"
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def probe(path: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, path, ",".join(HEAVY_MODULES)],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    # Interpreter start-up and exit included
+    result["spawn_to_response_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def gunicorn_boot(path: str, port: int) -> float:
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}", "app:create_app()"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}", path=path)
+        return (time.perf_counter() - started) * 1000
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def import_profile(top: int) -> List[Dict[str, Any]]:
+    """
+    Direct imports of app by cumulative time, from one -X importtime run.
+    """
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        m = IMPORTTIME.match(line)
+        # Two spaces of indent: imported by app itself
+        if m and len(m.group(3)) == 3:
+            rows.append({"module": m.group(4), "cumulative_ms": round(int(m.group(2)) / 1000, 1),
+                         "self_ms": round(int(m.group(1)) / 1000, 1)})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def compare(current: Dict[str, Any], previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous_path} ({previous.get('commit')})")
+    for metric, new in current["results"].items():
+        old = previous.get("results", {}).get(metric)
+        if old is None:
+            continue
+        change = ((new - old) / old * 100) if old else 0.0
+        print(f"  {metric:<24} {old:>9} -> {new:>9}  ({change:+.1f}%)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/", help="first request")
+    parser.add_argument("--gunicorn", action="store_true", help="also time a gunicorn worker to its first 200")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--top", type=int, default=10, help="imports listed in the profile")
+    parser.add_argument("--out", default="bench_boot.json")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    # Warm-up run writes the bytecode caches a built image would already have
+    probe(args.path)
+    runs = [probe(args.path) for _ in range(args.runs)]
+    results = {
+        metric: round(statistics.median(r[metric] for r in runs), 1)
+        for metric in ("import_ms", "create_app_ms", "first_request_ms", "spawn_to_response_ms")
+    }
+    if args.gunicorn:
+        results["gunicorn_to_first_200_ms"] = round(
+            statistics.median(gunicorn_boot(args.path, args.port) for _ in range(args.runs)), 1
+        )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "path": args.path,
+        "status": runs[-1]["status"],
+        "modules": runs[-1]["modules"],
+        "heavy_modules_loaded": runs[-1]["heavy"],
+        "results": results,
+        "import_profile": import_profile(args.top),
+    }
+
+    print(f"median of {args.runs} cold starts, first request GET {args.path} -> {report['status']}")
+    for metric, value in results.items():
+        print(f"  {metric:<24} {value:>9} ms")
+    print(f"  {report['modules']} modules loaded; heavy: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    print("import app, slowest direct imports:")
+    for row in report["import_profile"]:
+        print(f"  {row['module']:<24} {row['cumulative_ms']:>8} ms  (self {row['self_ms']} ms)")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Calls per second through projects_client: one requests.get/post per call
+(the old helpers: a new connection each time) against ProjectsClient's
+pooled session, plus paging and batched creates.
+
+Runs against an in-process stand-in that speaks the same JSON as app.py
+(GET /projects with ?limit=/?after=, GET /projects/<id>, POST /projects,
+POST /projects/bulk) from an in-memory dict, so the numbers measure client
+overhead rather than Mongo. --fail-rate makes the stand-in answer a share
+of requests with 503 to exercise the retry path. Pass --url to run the
+pooled measurements against a real server instead.
+
+    python -m benchmarks.bench_client --calls 2000 --threads 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+
+from projects_client import AsyncProjectsClient, ProjectsClient, httpx
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    In-memory stand-in for the projects service; keep-alive enabled.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # connections stall on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    projects = {}
+    lock = threading.Lock()
+    fail_rate = 0.0
+    requests_seen = 0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _flaky(self) -> bool:
+        with self.lock:
+            type(self).requests_seen += 1
+        if self.fail_rate and random.random() < self.fail_rate:
+            self._send(503, {"success": False, "message": "injected"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._flaky():
+            return
+        url = urlsplit(self.path)
+        if url.path == "/projects":
+            args = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with self.lock:
+                ids = sorted(self.projects)
+            after = args.get("after")
+            if after:
+                ids = [i for i in ids if i > after]
+            limit = int(args["limit"]) if "limit" in args else None
+            page = ids[:limit] if limit else ids
+            body = {"success": True, "projects": [self.projects[i] for i in page]}
+            if limit:
+                body["next_after"] = page[-1] if len(page) == limit else None
+            return self._send(200, body)
+        project = self.projects.get(unquote(url.path[len("/projects/"):]))
+        if project is None:
+            return self._send(404, {"success": False, "message": "Project not found"})
+        self._send(200, {"success": True, "project": project})
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self._flaky():
+            return
+        if self.path == "/projects":
+            with self.lock:
+                if data["project_id"] in self.projects:
+                    return self._send(409, {"success": False, "message": "Project ID already exists"})
+                self.projects[data["project_id"]] = data
+            return self._send(201, {"success": True, "project": data})
+        results = []
+        with self.lock:
+            for i, item in enumerate(data.get("projects", [])):
+                exists = item["project_id"] in self.projects
+                if exists and data.get("mode", "insert") == "insert":
+                    results.append({"index": i, "project_id": item["project_id"], "status": "duplicate"})
+                    continue
+                self.projects[item["project_id"]] = item
+                results.append({"index": i, "project_id": item["project_id"], "status": "updated" if exists else "created"})
+            deleted = [
+                {"index": i, "project_id": pid, "status": "deleted" if self.projects.pop(pid, None) else "not_found"}
+                for i, pid in enumerate(data.get("delete", []))
+            ]
+        ok = all(r["status"] in ("created", "updated") for r in results)
+        self._send(200 if ok else 207, {"success": ok, "results": results, "deleted": deleted})
+
+
+def start_standin(fail_rate: float):
+    StandIn.fail_rate = fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def rate(label: str, calls: int, fn, threads: int) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(fn, range(calls)))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:40s} {calls / elapsed:10.1f} calls/s")
+    return calls / elapsed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="real service base URL (default: in-process stand-in)")
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="stand-in only: share of requests answered 503")
+    args = parser.parse_args(argv)
+
+    server = None
+    base = args.url
+    if base is None:
+        server, base = start_standin(0.0)
+    prefix = f"bench-client-{int(time.time())}"
+    seed = [{"project_id": f"{prefix}-{i:07d}", "project_name": f"P{i}", "project_desc": "client bench"}
+            for i in range(args.projects)]
+    ids = [p["project_id"] for p in seed]
+
+    with ProjectsClient(base, pool_maxsize=args.threads, backoff_factor=0.01, backoff_jitter=0.01) as client:
+        started = time.perf_counter()
+        created = client.create_projects(seed, batch_size=1000)
+        print(f"batched create: {len(created)} projects in {time.perf_counter() - started:.2f}s "
+              f"({sum(r['status'] == 'created' for r in created)} created)")
+
+        print(f"get_project x{args.calls}, {args.threads} threads:")
+        if server is not None:
+            rate("requests.get per call (old helpers)", args.calls,
+                 lambda i: requests.get(f"{base}/projects/{ids[i % len(ids)]}", timeout=5).json(), args.threads)
+        rate("ProjectsClient (pooled session)", args.calls,
+             lambda i: client.get_project(ids[i % len(ids)]), args.threads)
+
+        started = time.perf_counter()
+        count = sum(1 for _ in client.iter_projects(page_size=1000))
+        print(f"iter_projects: {count} projects in {time.perf_counter() - started:.2f}s (pages of 1000)")
+
+        singles = seed[:min(500, len(seed))]
+        if server is not None:
+            with StandIn.lock:
+                for p in singles:
+                    StandIn.projects.pop(p["project_id"], None)
+            rate("create_project one by one", len(singles), lambda i: client.create_project(singles[i]), args.threads)
+
+        if server is not None and args.fail_rate:
+            StandIn.fail_rate = args.fail_rate
+            seen = StandIn.requests_seen
+            failed = []
+
+            def flaky_get(i):
+                try:
+                    client.get_project(ids[i % len(ids)])
+                except requests.HTTPError:
+                    # Every attempt drew a 503: fail_rate ** (retries + 1) of calls
+                    failed.append(i)
+
+            rate(f"ProjectsClient with {args.fail_rate:.0%} 503s", args.calls, flaky_get, args.threads)
+            print(f"    {StandIn.requests_seen - seen} requests sent for {args.calls} calls, "
+                  f"{len(failed)} still failed after retries")
+            StandIn.fail_rate = 0.0
+
+        if httpx is not None:
+            async def run_async():
+                async with AsyncProjectsClient(base, pool_maxsize=args.threads) as aclient:
+                    sem = asyncio.Semaphore(args.threads)
+
+                    async def one(i):
+                        async with sem:
+                            return await aclient.get_project(ids[i % len(ids)])
+
+                    started = time.perf_counter()
+                    await asyncio.gather(*(one(i) for i in range(args.calls)))
+                    return args.calls / (time.perf_counter() - started)
+
+            print(f"  {'AsyncProjectsClient (httpx)':40s} {asyncio.run(run_async()):10.1f} calls/s")
+
+        if server is not None:
+            print(f"stand-in accepted {StandIn.connections} connections in total")
+        client.delete_projects(ids)
+
+    if server is not None:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+/projects/events fan-out: how long a change takes to reach every idle SSE
+subscriber, and what each subscriber costs.
+
+Subscribers are stream_events_async generators (what asgi_app serves) in
+one event loop, all fed by a single ChangeFeed. By default the change
+stream is an in-process stand-in that emits --rate inserts per second; with
+--mongo the feed watches a scratch collection on the replica set configured
+in .env while a writer thread inserts at --rate. Reported: delivery latency
+from write to each subscriber, threads in use, and resident memory per
+subscriber; plus the /projects polling rate the same clients would cause.
+
+    python -m benchmarks.bench_events --subscribers 1000,5000 --rate 20 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import queue
+import resource
+import sys
+import threading
+import time
+
+from bson import ObjectId
+
+from benchmarks.loadgen import percentile
+from changefeed import ChangeFeed, stream_events_async
+from config import Config
+
+
+class StandInStream:
+    def __init__(self, changes: "queue.Queue"):
+        self.changes = changes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __iter__(self):
+        while True:
+            yield self.changes.get()
+
+
+class StandInCollection:
+    """
+    Enough of a pymongo Collection for ChangeFeed: watch() yields whatever
+    insert() queued, shaped like real change events.
+    """
+
+    def __init__(self):
+        self.changes = queue.Queue()
+        self.seq = 0
+
+    def watch(self, **kwargs):
+        return StandInStream(self.changes)
+
+    def insert_one(self, doc):
+        self.seq += 1
+        doc["_id"] = ObjectId()
+        self.changes.put({
+            "_id": {"_data": f"{self.seq:016x}"},
+            "operationType": "insert",
+            "documentKey": {"_id": doc["_id"]},
+            "fullDocument": doc,
+        })
+
+
+def rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def writer(collection, rate: float, seconds: float, written: dict, stop: threading.Event) -> None:
+    interval = 1.0 / rate
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while not stop.is_set() and time.perf_counter() < deadline:
+        project_id = f"evt-{n:07d}"
+        written[project_id] = time.perf_counter()
+        collection.insert_one({"project_id": project_id, "project_name": project_id})
+        n += 1
+        time.sleep(interval)
+
+
+async def run_level(feed: ChangeFeed, collection, subscribers: int, rate: float, seconds: float):
+    written = {}
+    arrivals = []
+    ready = asyncio.Event()
+    connected = [0]
+
+    async def subscriber() -> None:
+        async for chunk in stream_events_async(feed, heartbeat=5.0, max_seconds=seconds + 2):
+            now = time.perf_counter()
+            if chunk.startswith("retry:"):
+                connected[0] += 1
+                if connected[0] == subscribers:
+                    ready.set()
+                continue
+            for frame in chunk.split("\n\n"):
+                if frame.startswith("id: "):
+                    # Cheaper than json.loads per subscriber; keeps the client side out of the numbers
+                    start = frame.index('"project_id":"') + 14
+                    arrivals.append(now - written[frame[start:frame.index('"', start)]])
+
+    before = rss_mb()
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await ready.wait()
+    connected_mb = rss_mb()
+
+    stop = threading.Event()
+    thread = threading.Thread(target=writer, args=(collection, rate, seconds, written, stop), daemon=True)
+    thread.start()
+    await asyncio.gather(*tasks)
+    stop.set()
+
+    arrivals.sort()
+    return {
+        "events": len(written),
+        "deliveries": len(arrivals),
+        "expected": len(written) * subscribers,
+        "p50_ms": round(percentile(arrivals, 50) * 1000, 2),
+        "p99_ms": round(percentile(arrivals, 99) * 1000, 2),
+        "max_ms": round(arrivals[-1] * 1000, 2) if arrivals else 0.0,
+        "threads": threading.active_count(),
+        "kb_per_subscriber": round((connected_mb - before) * 1024 / subscribers, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", default="1000,5000", help="comma separated subscriber counts")
+    parser.add_argument("--rate", type=float, default=20.0, help="writes per second")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="for the polling comparison")
+    parser.add_argument("--mongo", action="store_true", help="watch a real replica set instead of the stand-in")
+    parser.add_argument("--db", default="projects_bench_events")
+    args = parser.parse_args(argv)
+
+    client = collection = None
+    if args.mongo:
+        from pymongo import MongoClient
+
+        from dbpool import client_options
+
+        options = client_options(Config)
+        client = MongoClient(Config.MONGO_URI, **options) if Config.MONGO_URI else MongoClient(**options)
+        collection = client[args.db]["projects"]
+        collection.drop()
+
+    try:
+        for subscribers in [int(s) for s in args.subscribers.split(",") if s.strip()]:
+            if not args.mongo:
+                # Fresh queue: the previous level's feed thread still reads the old one
+                collection = StandInCollection()
+            feed = ChangeFeed(lambda c=collection: c, dumps=lambda obj: json.dumps(obj, default=str, separators=(",", ":")))
+            feed.start()
+            # Let the stream open before the first write
+            time.sleep(0.5)
+            result = asyncio.run(run_level(feed, collection, subscribers, args.rate, args.seconds))
+            print(
+                f"subscribers={subscribers:6d}  {result['events']} events -> {result['deliveries']}/{result['expected']} "
+                f"deliveries  p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  max {result['max_ms']} ms  "
+                f"threads {result['threads']}  ~{result['kb_per_subscriber']} KiB/subscriber"
+            )
+            print(f"    polling instead: {subscribers / args.poll_interval:.0f} GET /projects per second "
+                  f"(every {args.poll_interval:g}s); feed: 1 change stream per worker")
+    finally:
+        if client is not None:
+            client.drop_database(args.db)
+            client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Hardware checkout under contention: hundreds of concurrent clients checking
+units in and out of a few small hardware sets through HardwareDB.
+
+Runs against a scratch database on the Mongo configured in .env. For each
+--clients level it reports throughput per second (and how much it varies),
+latency percentiles and outcome counts, then checks that nothing was
+oversold: available never went below zero, every set's counters match the
+units the clients believe they hold, and HardwareDB.audit() agrees with the
+ledger. Exits non-zero if any check fails.
+
+    python -m benchmarks.bench_hardware_contention --clients 50,200,400 --seconds 10
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from pymongo import MongoClient
+
+from benchmarks.loadgen import percentile
+from config import Config
+from dbpool import client_options
+from hardwaredb import HardwareDB
+
+
+def run_level(hw: HardwareDB, sets, projects: int, clients: int, seconds: float, max_qty: int):
+    """
+    One closed-loop run: each client thread owns a few projects, checks
+    random quantities out and returns what its projects hold.
+    """
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = []
+    outcomes = Counter()
+    per_second = Counter()
+    holdings = defaultdict(int)  # (hw_id, project_id) -> units, as seen by the clients
+    min_available = {hw_id: float("inf") for hw_id in sets}
+    errors = []
+    started = time.perf_counter()
+
+    def client(n: int) -> None:
+        rng = random.Random(n)
+        mine = defaultdict(int)
+        owned = [f"proj-{p:04d}" for p in range(n % projects, projects, clients)] or [f"proj-{n % projects:04d}"]
+        local_lat, local_out = [], Counter()
+        while not stop.is_set():
+            hw_id = rng.choice(sets)
+            project_id = rng.choice(owned)
+            held = mine[(hw_id, project_id)]
+            t0 = time.perf_counter()
+            try:
+                if held and rng.random() < 0.5:
+                    qty = rng.randint(1, held)
+                    outcome = hw.checkin(hw_id, project_id, qty)
+                    if outcome["status"] == "ok":
+                        mine[(hw_id, project_id)] -= qty
+                else:
+                    qty = rng.randint(1, max_qty)
+                    outcome = hw.checkout(hw_id, project_id, qty)
+                    if outcome["status"] == "ok":
+                        mine[(hw_id, project_id)] += qty
+            except Exception as e:
+                errors.append(e)
+                continue
+            t1 = time.perf_counter()
+            local_lat.append(t1 - t0)
+            local_out[outcome["status"]] += 1
+            doc = outcome["hardware_set"]
+            with lock:
+                per_second[int(t1 - started)] += 1
+                if doc is not None and doc["available"] < min_available[hw_id]:
+                    min_available[hw_id] = doc["available"]
+        with lock:
+            latencies.extend(local_lat)
+            outcomes.update(local_out)
+            for key, units in mine.items():
+                holdings[key] += units
+
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    # Full seconds only: the first and last are ramp-up / drain
+    steady = [per_second[s] for s in range(1, int(elapsed) - 1)] or list(per_second.values())
+    latencies.sort()
+    return {
+        "clients": clients,
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "steady_min": min(steady),
+        "steady_max": max(steady),
+        "steady_cv": round(statistics.pstdev(steady) / statistics.mean(steady), 3) if steady else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "outcomes": dict(outcomes),
+        "errors": len(errors),
+        "holdings": holdings,
+        "min_available": min_available,
+    }
+
+
+def verify(hw: HardwareDB, sets, result) -> list:
+    problems = []
+    held_by_set = defaultdict(int)
+    for (hw_id, _), units in result["holdings"].items():
+        held_by_set[hw_id] += units
+    for hw_id in sets:
+        report = hw.audit(hw_id)
+        if result["min_available"][hw_id] < 0:
+            problems.append(f"{hw_id}: available reached {result['min_available'][hw_id]}")
+        if not report["consistent"]:
+            problems.append(f"{hw_id}: audit failed {report}")
+        if report["held"] != held_by_set[hw_id]:
+            problems.append(f"{hw_id}: counters say {report['held']} held, clients hold {held_by_set[hw_id]}")
+        if report["held"] > report["capacity"]:
+            problems.append(f"{hw_id}: oversold ({report['held']} > {report['capacity']})")
+    if result["errors"]:
+        problems.append(f"{result['errors']} operations raised")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="projects_bench_hardware")
+    parser.add_argument("--clients", default="50,200,400", help="comma separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--sets", type=int, default=4)
+    parser.add_argument("--capacity", type=int, default=100)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--max-qty", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.clients.split(",") if c.strip()]
+    options = client_options(Config)
+    # Every client thread may hold a connection at once
+    options["maxPoolSize"] = max(levels) + 10
+    client = MongoClient(Config.MONGO_URI, **options) if Config.MONGO_URI else MongoClient(**options)
+
+    failed = False
+    try:
+        for clients in levels:
+            client.drop_database(args.db)
+            hw = HardwareDB(client[args.db])
+            hw.ensure_indexes()
+            sets = [f"hw-{i:02d}" for i in range(args.sets)]
+            for hw_id in sets:
+                hw.create_set(hw_id, args.capacity)
+
+            result = run_level(hw, sets, args.projects, clients, args.seconds, args.max_qty)
+            problems = verify(hw, sets, result)
+            failed = failed or bool(problems)
+            print(
+                f"clients={clients:4d}  {result['ops_per_sec']:8.1f} ops/s  "
+                f"(steady {result['steady_min']}-{result['steady_max']}/s, cv {result['steady_cv']})  "
+                f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+                f"{result['outcomes']}  {'OK' if not problems else 'FAILED'}"
+            )
+            for problem in problems:
+                print("   ", problem)
+    finally:
+        client.drop_database(args.db)
+        client.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Project model benchmark: memory per 100k projects and conversion throughput.
+
+Memory is measured with tracemalloc for plain dicts, a dataclass without
+slots (the previous Project) and the slotted Project; lists are built
+inside each measurement so the totals cover the whole object graph.
+Throughput covers from_dict, to_dict and the validating from_request used
+on POST /projects.
+
+    python -m benchmarks.bench_project_model --count 100000
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List
+
+from project import Project
+
+
+@dataclass
+class DictBackedProject:
+    """
+    The previous Project layout (no __slots__), kept here for comparison.
+    """
+
+    project_id: str
+    project_name: str
+    project_desc: str = ""
+    members_list: List[str] = field(default_factory=list)
+    num_of_hardware_sets: int = 0
+    hardware_set_id: List[str] = field(default_factory=list)
+
+
+def documents(count: int):
+    return [
+        {
+            "project_id": f"proj-{i:07d}",
+            "project_name": f"Project {i}",
+            "project_desc": "Hardware checkout for lab " + str(i % 40),
+            "members_list": [f"user{i % 97}", f"user{i % 89}"],
+            "num_of_hardware_sets": 2,
+            "hardware_set_id": [f"HW{i % 7}", f"HW{i % 5}"],
+        }
+        for i in range(count)
+    ]
+
+
+def measure_memory(build, count: int) -> int:
+    """
+    Bytes still allocated after build(count) returns, whole graph included.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return after - before
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="optional JSON report path")
+    args = parser.parse_args(argv)
+    n = args.count
+
+    memory = {
+        "dict": measure_memory(documents, n),
+        "dataclass": measure_memory(lambda c: [DictBackedProject(**d) for d in documents(c)], n),
+        "slots": measure_memory(lambda c: [Project(**d) for d in documents(c)], n),
+    }
+    # Only the wrapper objects, with field values shared across all three
+    docs = documents(n)
+    wrappers = {
+        "dict": measure_memory(lambda c: [dict(d) for d in docs], n),
+        "dataclass": measure_memory(lambda c: [DictBackedProject(**d) for d in docs], n),
+        "slots": measure_memory(lambda c: [Project(**d) for d in docs], n),
+    }
+
+    projects = [Project(**d) for d in docs]
+
+    timings = {
+        "from_dict_loop": best_of(lambda: [Project.from_dict(d) for d in docs], args.repeat),
+        "to_dict_loop": best_of(lambda: [p.to_dict() for p in projects], args.repeat),
+        "from_request": best_of(lambda: [Project.from_request(d) for d in docs], args.repeat),
+    }
+
+    per_100k = 100000 / n
+    results = {
+        "count": n,
+        "memory_per_100k_bytes": {k: int(v * per_100k) for k, v in memory.items()},
+        "wrapper_per_100k_bytes": {k: int(v * per_100k) for k, v in wrappers.items()},
+        "ops_per_sec": {k: n / v for k, v in timings.items()},
+    }
+
+    print(f"{n} projects")
+    print("  memory per 100k (whole graph / wrapper only):")
+    for key in memory:
+        print(
+            f"    {key:10s} {results['memory_per_100k_bytes'][key] / 1e6:8.2f} MB"
+            f"  {results['wrapper_per_100k_bytes'][key] / 1e6:8.2f} MB"
+        )
+    print("  conversions per second:")
+    for key, rate in results["ops_per_sec"].items():
+        print(f"    {key:14s} {rate:12,.0f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Degradation test: the Flask app with and without resilience.py while Mongo
+turns slow and recovers.
+
+A local TCP proxy stands in for Atlas. It forwards to a plain mongod
+(--target, default MONGO_HOST:MONGO_PORT; SRV/TLS URIs are not supported)
+and adds --slow-ms to every server reply during the middle phase. Closed-loop
+client threads read GET /projects/<id> and GET /projects?limit=50 through
+the Flask test client. Reported per phase: requests/s, latency percentiles,
+status codes, and how many answers were stale.
+
+    python -m benchmarks.bench_resilience --threads 32 --phase-seconds 10 --slow-ms 3000
+"""
+import argparse
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from pymongo import MongoClient
+
+from benchmarks.loadgen import percentile
+from config import Config
+from dbpool import client_options
+from projectcache import ProjectCache
+from projectdb import ProjectDB
+
+
+class LatencyProxy:
+    """
+    TCP proxy adding `delay` seconds before each chunk sent back to the client.
+    """
+
+    def __init__(self, target_host: str, target_port: int):
+        self.target = (target_host, target_port)
+        self.delay = 0.0
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(256)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            client, _ = self.sock.accept()
+            upstream = socket.create_connection(self.target)
+            for s in (client, upstream):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._pump, args=(client, upstream, False), daemon=True).start()
+            threading.Thread(target=self._pump, args=(upstream, client, True), daemon=True).start()
+
+    def _pump(self, src: socket.socket, dst: socket.socket, slow: bool) -> None:
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                if slow and self.delay:
+                    time.sleep(self.delay)
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            for s in (src, dst):
+                try:
+                    s.close()
+                except OSError:
+                    pass
+
+
+def build_app(proxy: LatencyProxy, dbname: str, resilient: bool):
+    from app import create_app
+
+    class BenchConfig(Config):
+        MONGO_DB = dbname
+        MONGO_RESILIENCE = resilient
+        # Small cache so most reads reach Mongo
+        PROJECT_CACHE_SIZE = 16
+        PROJECT_CACHE_TTL = 1.0
+
+    options = client_options(BenchConfig)
+    options.update(host="127.0.0.1", port=proxy.port, directConnection=True)
+    client = MongoClient(**options)
+    project_db = ProjectDB(client=client, dbname=dbname, cache=ProjectCache(maxsize=16, ttl=1.0))
+    return create_app(BenchConfig, project_db=project_db)
+
+
+def run_phase(app, ids, threads: int, seconds: float):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, statuses, stale = [], Counter(), [0]
+
+    def worker(n: int) -> None:
+        rng = random.Random(n)
+        client = app.test_client()
+        local_lat, local_status, local_stale = [], Counter(), 0
+        while not stop.is_set():
+            path = f"/projects/{rng.choice(ids)}" if rng.random() < 0.8 else "/projects?limit=50"
+            t0 = time.perf_counter()
+            resp = client.get(path)
+            local_lat.append(time.perf_counter() - t0)
+            local_status[resp.status_code] += 1
+            local_stale += "Warning" in resp.headers
+        with lock:
+            latencies.extend(local_lat)
+            statuses.update(local_status)
+            stale[0] += local_stale
+
+    pool = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "stale": stale[0],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=f"{Config.MONGO_HOST}:{Config.MONGO_PORT}")
+    parser.add_argument("--db", default="projects_bench_resilience")
+    parser.add_argument("--projects", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--phase-seconds", type=float, default=10.0)
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    args = parser.parse_args(argv)
+
+    host, port = args.target.rsplit(":", 1)
+    proxy = LatencyProxy(host, int(port))
+    ids = [f"res-{i:06d}" for i in range(args.projects)]
+
+    seeder = ProjectDB(client=MongoClient(**dict(client_options(Config), host=host, port=int(port))), dbname=args.db)
+    seeder.ensure_indexes()
+    seeder.bulk_upsert([{"project_id": pid, "project_name": pid} for pid in ids])
+
+    try:
+        for resilient in (False, True):
+            proxy.delay = 0.0
+            app = build_app(proxy, args.db, resilient)
+            print(f"resilience {'on' if resilient else 'off'}:")
+            for phase, delay in (("normal", 0.0), ("slow", args.slow_ms / 1000), ("recovered", 0.0)):
+                proxy.delay = delay
+                result = run_phase(app, ids, args.threads, args.phase_seconds)
+                print(f"  {phase:10s} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+                      f"p99 {result['p99_ms']:8.1f} ms  max {result['max_ms']:8.1f} ms  "
+                      f"stale {result['stale']:6d}  {result['statuses']}")
+            proxy.delay = 0.0
+            health = app.test_client().get("/health").get_json()
+            print(f"  /health after recovery: {health['status']} ({health.get('mongo_latency_ms')} ms)")
+    finally:
+        proxy.delay = 0.0
+        seeder.client.drop_database(args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
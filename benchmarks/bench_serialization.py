@@ -0,0 +1,112 @@
+"""
+Serialization benchmark for list responses.
+
+Compares the old path (ProjectDB._normalize copy per document, then Flask's
+stdlib encoder) with the new one (documents already shaped by the $addFields
+stage, then OrjsonProvider), and checks both produce identical bytes.
+
+    python -m benchmarks.bench_serialization --docs 10000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from jsonprovider import OrjsonProvider
+from projectdb import ProjectDB
+
+
+def raw_documents(count: int):
+    """
+    Documents as pymongo returns them; every third one lacks some core fields.
+    """
+    now = datetime(2025, 11, 12, 17, 47, 36, tzinfo=timezone.utc)
+    docs = []
+    for i in range(count):
+        doc = {
+            "_id": ObjectId(),
+            "project_id": f"proj-{i:07d}",
+            "project_name": f"Project {i}",
+            "version": i % 5 + 1,
+            "updated_at": now,
+        }
+        if i % 3:
+            doc.update(
+                project_desc="Hardware checkout for lab " + str(i % 40),
+                members_list=[f"user{i % 97}", f"user{i % 89}", f"user{i % 13}"],
+                hardware_set_id=[f"HW{i % 7}", f"HW{i % 5}"],
+                num_of_hardware_sets=2,
+            )
+        docs.append(doc)
+    return docs
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="optional JSON report path")
+    args = parser.parse_args(argv)
+
+    raw = raw_documents(args.docs)
+    # What the $addFields stage hands back: normalized dicts, no Python copy
+    shaped = [ProjectDB._normalize(doc) for doc in raw]
+
+    stdlib_app = Flask("stdlib")
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    orjson_app = Flask("orjson")
+    orjson_app.json = OrjsonProvider(orjson_app)
+
+    def old_path():
+        projects = [ProjectDB._normalize(doc) for doc in raw]
+        return stdlib_app.json.response({"success": True, "projects": projects}).get_data()
+
+    def normalize_only_orjson():
+        projects = [ProjectDB._normalize(doc) for doc in raw]
+        return orjson_app.json.response({"success": True, "projects": projects}).get_data()
+
+    def new_path():
+        return orjson_app.json.response({"success": True, "projects": shaped}).get_data()
+
+    with stdlib_app.app_context(), orjson_app.app_context():
+        expected = old_path()
+        for name, fn in (("normalize+orjson", normalize_only_orjson), ("shaped+orjson", new_path)):
+            if fn() != expected:
+                print(f"{name}: output differs from the stdlib path", file=sys.stderr)
+                return 1
+
+        results = {
+            "docs": args.docs,
+            "bytes": len(expected),
+            "old_ms": best_of(old_path, args.repeat) * 1000,
+            "normalize_orjson_ms": best_of(normalize_only_orjson, args.repeat) * 1000,
+            "new_ms": best_of(new_path, args.repeat) * 1000,
+        }
+    results["speedup"] = results["old_ms"] / results["new_ms"]
+
+    print(f"{args.docs} docs, {results['bytes']} bytes, identical output")
+    print(f"  _normalize + stdlib json : {results['old_ms']:8.2f} ms")
+    print(f"  _normalize + orjson      : {results['normalize_orjson_ms']:8.2f} ms")
+    print(f"  $addFields + orjson      : {results['new_ms']:8.2f} ms  ({results['speedup']:.1f}x)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+/api/spend query benchmark: SpendAnalytics (Arrow kernels over the
+memory-mapped store) against a naive pandas baseline that loads the files,
+merges brand detail and groups on every request.
+
+A synthetic store in the spend_ingest layout is generated first (reused if
+--store already holds one).
+
+    python -m benchmarks.bench_spend_analytics --rows 5000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+import spend_ingest
+from spend_analytics import SpendAnalytics
+
+STATES = ["AL", "AZ", "CA", "CO", "FL", "GA", "ID", "IL", "KS", "LA", "MA", "MN", "NY", "OH", "TX", "UT", "VA", "WA"]
+INDUSTRIES = ["Apparel", "Restaurants", "Software", "Travel", "Grocery", "Fuel", "Media", "Health"]
+
+QUERIES = {
+    "top_brands": dict(group_by=["brand"], limit=10),
+    "state_by_month": dict(group_by=["state", "period"], bucket="month"),
+    "industry_2019_ca_tx": dict(group_by=["industry"], states=["CA", "TX"], date_from="2019-01-01", date_to="2019-12-31"),
+    "brand_weekly": dict(group_by=["brand", "period"], bucket="week", brand_ids=[10001, 10002, 10003]),
+}
+
+
+def build_store(path: str, rows: int, brands: int, days: int, chunk_rows: int = 1_000_000) -> None:
+    rng = np.random.default_rng(7)
+    brand_ids = np.arange(10001, 10001 + brands)
+    brand_names = np.array([f"BRAND {i}" for i in brand_ids], dtype=object)
+    start = np.datetime64("2018-01-01")
+    for n, offset in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - offset)
+        pick = rng.integers(0, brands, size)
+        dates = (start + rng.integers(0, days, size).astype("timedelta64[D]")).astype(str)
+        table = pa.table(
+            {
+                "BRAND_ID": pa.array(brand_ids[pick]),
+                "BRAND_NAME": pa.array(brand_names[pick], pa.string()).dictionary_encode(),
+                "SPEND_AMOUNT": pa.array(np.round(rng.gamma(2.0, 150.0, size), 2)),
+                "STATE_ABBR": pa.array(np.array(STATES, dtype=object)[rng.integers(0, len(STATES), size)], pa.string()).dictionary_encode(),
+                "TRANS_COUNT": pa.array(np.round(rng.gamma(1.5, 3.0, size), 2)),
+                "TRANS_DATE": pa.array(dates, pa.string()),
+                "VERSION": pa.array(np.full(size, np.datetime64("2025-10-06"))).cast(pa.date32()),
+                "load_batch_id": pa.array(np.full(size, f"batch-{n}", dtype=object), pa.string()),
+                "ingested_at_utc": pa.array(np.full(size, np.datetime64("2025-11-12T18:43:36", "us"))),
+            },
+            schema=spend_ingest.SPEND_SCHEMA,
+        )
+        spend_ingest.write_chunk(table, path, f"bench{n:04d}")
+
+    detail = pa.table(
+        {
+            "BRAND_NAME": pa.array(brand_names, pa.string()),
+            "BRAND_ID": pa.array(brand_ids.astype(str), pa.string()),
+            "INDUSTRY_NAME": pa.array([INDUSTRIES[i % len(INDUSTRIES)] for i in range(brands)], pa.string()),
+        }
+    )
+    feather.write_feather(detail, os.path.join(path, f"{spend_ingest.BRAND_FILE}.arrow"), compression="uncompressed")
+    spend_ingest.write_watermark(path, ("2025-11-12 18:43:36", f"batch-{n}"), rows)
+
+
+def pandas_query(store: str, group_by, bucket="day", brand_ids=None, states=None, date_from=None, date_to=None, limit=None):
+    """
+    The straightforward version: load everything into pandas per request.
+    """
+    spend = ds.dataset(os.path.join(store, spend_ingest.SPEND_DIR), format="ipc", partitioning="hive").to_table().to_pandas()
+    brands = feather.read_table(os.path.join(store, f"{spend_ingest.BRAND_FILE}.arrow")).to_pandas()
+    brands["BRAND_ID"] = brands["BRAND_ID"].astype("int64")
+    df = spend.merge(brands[["BRAND_ID", "INDUSTRY_NAME"]], on="BRAND_ID", how="left")
+    if brand_ids:
+        df = df[df["BRAND_ID"].isin(brand_ids)]
+    if states:
+        df = df[df["STATE_ABBR"].astype(str).isin(states)]
+    if date_from:
+        df = df[df["TRANS_DATE"] >= date_from]
+    if date_to:
+        df = df[df["TRANS_DATE"] <= date_to]
+    keys = []
+    for g in group_by:
+        if g == "period":
+            dates = pd.to_datetime(df["TRANS_DATE"])
+            df = df.assign(PERIOD={"day": dates.dt.strftime("%Y-%m-%d"), "month": dates.dt.strftime("%Y-%m"),
+                                   "year": dates.dt.strftime("%Y"),
+                                   "week": (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")}[bucket])
+        keys.append({"brand": "BRAND_ID", "state": "STATE_ABBR", "industry": "INDUSTRY_NAME", "period": "PERIOD"}[g])
+    out = df.groupby(keys, observed=True)[["SPEND_AMOUNT", "TRANS_COUNT"]].sum().sort_values("SPEND_AMOUNT", ascending=False)
+    return out.head(limit) if limit else out
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default="/tmp/spend_bench_store")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--brands", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="optional JSON report path")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.store, spend_ingest.WATERMARK_FILE)):
+        started = time.perf_counter()
+        build_store(args.store, args.rows, args.brands, args.days)
+        print(f"built {args.rows} rows in {time.perf_counter() - started:.1f}s at {args.store}")
+
+    analytics = SpendAnalytics(args.store, max_rows=100000)
+    started = time.perf_counter()
+    snap = analytics.snapshot()
+    load_s = time.perf_counter() - started
+    print(f"store: {snap.table.num_rows} rows, first load {load_s * 1000:.0f} ms")
+
+    results = {"rows": snap.table.num_rows, "load_ms": load_s * 1000, "queries": {}}
+    for name, params in QUERIES.items():
+        # First call builds the period column for the bucket; report warm calls
+        analytics.query(**params)
+        arrow_s = timed(lambda: analytics.query(**params), args.repeat)
+        pandas_s = timed(lambda: pandas_query(args.store, **params), 1)
+        results["queries"][name] = {"arrow_ms": arrow_s * 1000, "pandas_ms": pandas_s * 1000}
+        print(f"  {name:22s} arrow {arrow_s * 1000:8.1f} ms   pandas {pandas_s * 1000:8.1f} ms   ({pandas_s / arrow_s:.0f}x)")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
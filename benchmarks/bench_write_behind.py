@@ -0,0 +1,162 @@
+"""
+POST /projects under burst load: ProjectDB.create_project as it is
+(insert_one + find_one read-back per call) against the write-behind mode
+(WRITE_BEHIND: concurrent creates coalesced into one insert_many, no
+read-back).
+
+Closed-loop threads create projects for --seconds at each --threads level
+against a scratch database on the Mongo configured in .env. --rtt-ms puts
+the latency proxy from bench_resilience in between to stand in for the
+round trip to Atlas. --dup-rate makes that share of calls reuse a
+pre-seeded project_id; every caller's outcome is checked (created vs
+DuplicateKeyError) and the run fails if any caller got the wrong one.
+Reported: creates/s, latency percentiles, Mongo commands per create and
+the batch sizes the queue reached.
+
+    python -m benchmarks.bench_write_behind --threads 8,64,256 --seconds 10 --rtt-ms 20
+"""
+import argparse
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import DuplicateKeyError
+
+from benchmarks.bench_resilience import LatencyProxy
+from benchmarks.loadgen import percentile
+from config import Config
+from dbpool import client_options
+from projectdb import ProjectDB
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.counts = Counter()
+
+    def started(self, event):
+        self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def make_db(args, dbname: str, counter: CommandCounter, threads: int) -> ProjectDB:
+    options = client_options(Config)
+    options["event_listeners"] = [counter]
+    options["maxPoolSize"] = threads + 10
+    if args.proxy is not None:
+        options.update(host="127.0.0.1", port=args.proxy.port, directConnection=True)
+        client = MongoClient(**options)
+    else:
+        client = MongoClient(Config.MONGO_URI, **options) if Config.MONGO_URI else MongoClient(**options)
+    project_db = ProjectDB(client=client, dbname=dbname)
+    # Duplicate detection rests on the unique project_id index
+    project_db.ensure_indexes()
+    return project_db
+
+
+def run_level(project_db: ProjectDB, threads: int, seconds: float, dup_rate: float, seeded, prefix: str):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, outcomes, wrong = [], Counter(), []
+    ids = itertools.count()
+
+    def caller(n: int) -> None:
+        rng = random.Random(n)
+        local_lat, local_out = [], Counter()
+        while not stop.is_set():
+            duplicate = rng.random() < dup_rate
+            project_id = rng.choice(seeded) if duplicate else f"{prefix}-{next(ids):08d}"
+            t0 = time.perf_counter()
+            try:
+                project = project_db.create_project({"project_id": project_id, "project_name": project_id})
+                outcome = "created"
+                if project["project_id"] != project_id:
+                    wrong.append((project_id, project["project_id"]))
+            except DuplicateKeyError:
+                outcome = "duplicate"
+            except Exception as e:
+                outcome = type(e).__name__
+            local_lat.append(time.perf_counter() - t0)
+            local_out[outcome] += 1
+            if (outcome == "duplicate") != duplicate:
+                wrong.append((project_id, outcome))
+        with lock:
+            latencies.extend(local_lat)
+            outcomes.update(local_out)
+
+    pool = [threading.Thread(target=caller, args=(n,), daemon=True) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "rate": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "outcomes": dict(outcomes),
+        "wrong": wrong,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="projects_bench_write_behind")
+    parser.add_argument("--threads", default="8,64,256", help="comma separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    parser.add_argument("--max-batch", type=int, default=Config.WRITE_BEHIND_MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=Config.WRITE_BEHIND_MAX_DELAY_MS)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="added per reply via a local proxy (host/port mode)")
+    args = parser.parse_args(argv)
+
+    args.proxy = None
+    if args.rtt_ms:
+        args.proxy = LatencyProxy(Config.MONGO_HOST, Config.MONGO_PORT)
+        args.proxy.delay = args.rtt_ms / 1000
+
+    failed = False
+    seeded = [f"seed-{i:05d}" for i in range(1000)]
+    for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+        for mode in ("insert_one + find_one", "write-behind"):
+            counter = CommandCounter()
+            project_db = make_db(args, args.db, counter, threads)
+            project_db.collection.delete_many({})
+            project_db.bulk_upsert([{"project_id": pid, "project_name": pid} for pid in seeded])
+            queue = None
+            if mode == "write-behind":
+                queue = project_db.enable_write_behind(max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000)
+            counter.counts.clear()
+
+            result = run_level(project_db, threads, args.seconds, args.dup_rate, seeded, f"wb-{threads}")
+            commands = sum(counter.counts[name] for name in ("insert", "find"))
+            batches = f"  batches avg {queue.stats()['avg_batch']} max {queue.stats()['largest_batch']}" if queue else ""
+            print(
+                f"threads={threads:4d}  {mode:22s} {result['rate']:9.1f} creates/s  "
+                f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                f"{commands / max(result['calls'], 1):.3f} cmds/create  {result['outcomes']}{batches}"
+            )
+            if result["wrong"]:
+                failed = True
+                print(f"    {len(result['wrong'])} callers got the wrong outcome, e.g. {result['wrong'][:3]}")
+            project_db.client.drop_database(args.db)
+            project_db.client.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Requests per second at a fixed latency target: Flask/gunicorn vs Quart/uvicorn.
+
+Starts each server as a subprocess against the Mongo configured in .env,
+seeds projects through POST /projects/bulk, then raises concurrency until
+p95 latency crosses --target-p95-ms. The best throughput seen under the
+target is the number to compare.
+
+    python -m benchmarks.compare_sync_async --workers 4 --target-p95-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.loadgen import run_load, wait_until_up
+
+SERVERS = {
+    "sync": ["gunicorn", "-w", "{workers}", "-b", "127.0.0.1:{port}", "app:create_app()"],
+    "async": [
+        "uvicorn", "--factory", "asgi_app:create_asgi_app",
+        "--workers", "{workers}", "--host", "127.0.0.1", "--port", "{port}", "--log-level", "warning",
+    ],
+}
+
+
+def seed(base_url: str, count: int, prefix: str) -> None:
+    projects = [
+        {"project_id": f"{prefix}-{i:07d}", "project_name": f"Bench {i}", "project_desc": "seeded"}
+        for i in range(count)
+    ]
+    for start in range(0, count, 1000):
+        body = json.dumps({"mode": "upsert", "projects": projects[start:start + 1000]}).encode()
+        req = urllib.request.Request(
+            f"{base_url}/projects/bulk", data=body, headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(req, timeout=60).read()
+
+
+def cleanup(base_url: str, ids) -> None:
+    for start in range(0, len(ids), 1000):
+        body = json.dumps({"projects": [], "delete": ids[start:start + 1000]}).encode()
+        req = urllib.request.Request(
+            f"{base_url}/projects/bulk", data=body, headers={"Content-Type": "application/json"}
+        )
+        urllib.request.urlopen(req, timeout=60).read()
+
+
+def sweep(base_url: str, ids, target_p95_ms: float, duration: float, max_concurrency: int):
+    def next_request(rng):
+        return "GET", f"/projects/{rng.choice(ids)}", None
+
+    steps = []
+    concurrency = 1
+    while concurrency <= max_concurrency:
+        result = run_load(base_url, next_request, concurrency=concurrency, duration=duration)
+        result["concurrency"] = concurrency
+        steps.append(result)
+        print(f"  c={concurrency:<4} rps={result['rps']:<8} p95={result['p95_ms']}ms")
+        if result["p95_ms"] > target_p95_ms:
+            break
+        concurrency *= 2
+
+    within = [s for s in steps if s["p95_ms"] <= target_p95_ms]
+    best = max(within, key=lambda s: s["rps"]) if within else None
+    return {"steps": steps, "best_under_target": best}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=2000, help="projects to seed")
+    parser.add_argument("--target-p95-ms", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per concurrency step")
+    parser.add_argument("--max-concurrency", type=int, default=256)
+    parser.add_argument("--cache", action="store_true", help="keep the project cache enabled")
+    parser.add_argument("--out", default="bench_sync_async.json")
+    args = parser.parse_args(argv)
+
+    prefix = f"bench-{int(time.time())}"
+    ids = [f"{prefix}-{i:07d}" for i in range(args.seed)]
+    report = {"target_p95_ms": args.target_p95_ms, "workers": args.workers, "servers": {}}
+
+    for name, template in SERVERS.items():
+        cmd = [part.format(workers=args.workers, port=args.port) for part in template]
+        print(f"[{name}] {' '.join(cmd)}")
+        env = dict(os.environ)
+        if not args.cache:
+            # Measure Mongo round trips, not cache hits
+            env["PROJECT_CACHE_SIZE"] = "0"
+        proc = subprocess.Popen(cmd, env=env)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_up(base_url)
+            if name == "sync":
+                seed(base_url, args.seed, prefix)
+            report["servers"][name] = sweep(
+                base_url, ids, args.target_p95_ms, args.duration, args.max_concurrency
+            )
+            if name == "async":
+                cleanup(base_url, ids)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    for name, result in report["servers"].items():
+        best = result["best_under_target"]
+        print(f"{name:>5}: " + (f"{best['rps']} rps at c={best['concurrency']}" if best else "target never met"))
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
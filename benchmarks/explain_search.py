@@ -0,0 +1,100 @@
+"""
+Checks that every /projects/search query shape is answered from an index.
+
+Seeds a scratch database on the Mongo configured in .env, lets ProjectDB
+create its indexes, then runs explain() on each shape and prints the winning
+plan. Exits non-zero if any plan contains a COLLSCAN.
+
+    python -m benchmarks.explain_search --projects 20000
+"""
+import argparse
+import random
+import sys
+import time
+
+from config import Config
+from projectdb import ProjectDB
+
+# Every filter alone, the useful pairs, and a text search with and without filters
+SHAPES = {
+    "member": dict(members=["user-0007"]),
+    "members_all": dict(members=["user-0007", "user-0011"]),
+    "hardware_set": dict(hardware_sets=["hw-03"]),
+    "hw_range": dict(min_hw=2, max_hw=3),
+    "hw_min_after": dict(min_hw=4, after="p-0010000"),
+    "member_hw_range": dict(members=["user-0007"], min_hw=1, max_hw=2),
+    "member_hardware_set": dict(members=["user-0007"], hardware_sets=["hw-03"]),
+    "text": dict(q="telemetry"),
+    "text_member": dict(q="telemetry", members=["user-0007"]),
+}
+
+WORDS = ["telemetry", "robotics", "capstone", "sensor", "drone", "solar", "lab", "prototype", "survey", "vision"]
+
+
+def seed(db: ProjectDB, count: int, members: int, hardware_sets: int) -> None:
+    rng = random.Random(17)
+    batch = []
+    for i in range(count):
+        hw = sorted(rng.sample(range(hardware_sets), rng.randint(0, 5)))
+        batch.append({
+            "project_id": f"p-{i:07d}",
+            "project_name": " ".join(rng.sample(WORDS, 2)).title(),
+            "project_desc": " ".join(rng.choices(WORDS, k=8)),
+            "members_list": [f"user-{m:04d}" for m in rng.sample(range(members), rng.randint(1, 4))],
+            "hardware_set_id": [f"hw-{h:02d}" for h in hw],
+        })
+        if len(batch) == 1000:
+            db.bulk_upsert(batch)
+            batch = []
+    if batch:
+        db.bulk_upsert(batch)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="projects_explain_search")
+    parser.add_argument("--projects", type=int, default=20000)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--hardware-sets", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="leave the scratch database in place")
+    args = parser.parse_args(argv)
+
+    class ScratchConfig(Config):
+        MONGO_DB = args.db
+
+    db = ProjectDB.from_config(ScratchConfig)
+    db.ensure_indexes()
+    if db.collection.estimated_document_count() < args.projects:
+        started = time.perf_counter()
+        seed(db, args.projects, args.members, args.hardware_sets)
+        print(f"seeded {args.projects} projects in {time.perf_counter() - started:.1f}s")
+
+    failed = []
+    try:
+        for name, filters in SHAPES.items():
+            plan = db.search_plan(limit=args.limit, **filters)
+            started = time.perf_counter()
+            found = len(db.search_projects(limit=args.limit, **filters))
+            ms = (time.perf_counter() - started) * 1000
+            status = "COLLSCAN" if plan["collscan"] else "ok"
+            print(
+                f"  {name:20s} {status:8s} {' <- '.join(plan['stages']):40s} "
+                f"index={','.join(plan['indexes']) or '-':28s} keys={plan['keys_examined']} "
+                f"docs={plan['docs_examined']} returned={found} {ms:.1f} ms"
+            )
+            if plan["collscan"]:
+                failed.append(name)
+    finally:
+        if not args.keep:
+            db.client.drop_database(args.db)
+
+    if failed:
+        print(f"collection scans: {', '.join(failed)}")
+        return 1
+    print("all search shapes use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
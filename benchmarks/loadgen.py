@@ -0,0 +1,116 @@
+# benchmarks/loadgen.py – closed-loop HTTP load generator (stdlib only)
+
+import http.client
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# (method, path, json body or None)
+RequestSpec = Tuple[str, str, Optional[Any]]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100.0))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], errors: int, elapsed: float) -> Dict[str, Any]:
+    """
+    Latencies are in seconds; the summary reports milliseconds.
+    """
+    latencies = sorted(latencies)
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def run_load(
+    base_url: str,
+    next_request: Callable[[random.Random], RequestSpec],
+    concurrency: int = 8,
+    duration: float = 10.0,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Drive `concurrency` keep-alive clients against base_url for `duration`
+    seconds. Each client asks next_request() for its next call and only
+    sends it after the previous response arrived.
+    """
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip("/")
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = [0]
+    deadline = time.perf_counter() + duration
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        local_lat: List[float] = []
+        local_status: Dict[int, int] = {}
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            method, path, body = next_request(rng)
+            payload = json.dumps(body) if body is not None else None
+            headers = {"Content-Type": "application/json"} if payload is not None else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, prefix + path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+                continue
+            local_lat.append(time.perf_counter() - start)
+            local_status[resp.status] = local_status.get(resp.status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            errors[0] += local_errors
+            for status, count in local_status.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, statuses, errors[0], time.perf_counter() - started)
+
+
+def wait_until_up(base_url: str, path: str = "/health", timeout: float = 30.0) -> float:
+    """
+    Poll `path` until it answers 200. Returns seconds waited.
+    """
+    parts = urlsplit(base_url)
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=1)
+            conn.request("GET", parts.path.rstrip("/") + path)
+            if conn.getresponse().status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{base_url}{path} did not come up within {timeout}s")
@@ -0,0 +1,370 @@
+# brand_index.py – memory-mapped brand dimension (BRAND_ID lookup + name prefix search)
+
+"""
+stg_brand_detail compiled into one read-only file that every worker maps:
+
+    header | records | id hash table | name order | string heap
+
+  records     fixed-size rows: BRAND_ID + (offset, length) of each text field
+  hash table  open addressing on BRAND_ID -> record number, O(1) lookups
+  name order  record numbers sorted by case-folded BRAND_NAME, for
+              binary-search prefix matching
+  heap        UTF-8 text referenced by the records
+
+The file is written to a temp name and os.replace()d into place, so readers
+switch to a new build on their next refresh and never see a partial one.
+A rebuild only happens when the set of load_batch_id values in the source
+changes. The source is the brand_detail file staged by spend_ingest /
+extract_runner (Arrow or Parquet) or the CSV from `azuredb.py --sample`,
+whichever was written last.
+
+    python brand_index.py data/stg_brand_detail.csv data/brand_index.bin
+    python brand_index.py data/spend/brand_detail.arrow data/brand_index.bin
+"""
+
+import bisect
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import fcntl  # POSIX only; builds are then not serialized across processes
+except ImportError:
+    fcntl = None
+
+MAGIC = b"BRANDIX1"
+FIELDS = (
+    "BRAND_NAME",
+    "SUBINDUSTRY_ID",
+    "SUBINDUSTRY_NAME",
+    "INDUSTRY_NAME",
+    "BRAND_URL_ADDR",
+    "BRAND_TYPE",
+    "load_batch_id",
+)
+_FOLDED = len(FIELDS)  # extra text slot: case-folded name used by the name order
+
+# magic, record count, hash slots, records/hash/names/heap offsets, batch fingerprint
+_HEADER = struct.Struct("<8sIIQQQQ20s")
+_RECORD = struct.Struct("<q" + "II" * (len(FIELDS) + 1))
+_SLOT = struct.Struct("<qI")
+_EMPTY = 0xFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+
+# spend_ingest.BRAND_FILE; not imported, so the API does not load pyarrow at boot
+STAGED_NAME = "brand_detail"
+
+
+def _slot_of(brand_id: int, bits: int) -> int:
+    return ((brand_id * _GOLDEN) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+
+def fingerprint(batch_ids: Iterable[str]) -> bytes:
+    digest = hashlib.sha1()
+    for batch in sorted(set(batch_ids)):
+        digest.update(batch.encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+def staged_sources(store_dir: str) -> List[str]:
+    """
+    Paths where spend_ingest / extract_runner stage the brand table.
+    """
+    return [os.path.join(store_dir, f"{STAGED_NAME}.{ext}") for ext in ("arrow", "parquet")]
+
+
+def _read_columnar(path: str, columns: Optional[List[str]] = None):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=columns)
+    import pyarrow.feather as feather
+
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def read_source(path: str) -> List[Dict[str, str]]:
+    """
+    Brand rows from a CSV extract or a staged Arrow / Parquet file.
+    """
+    if not path.endswith(".csv"):
+        return [{k: "" if v is None else str(v) for k, v in row.items()} for row in _read_columnar(path).to_pylist()]
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def source_fingerprint(path: str) -> bytes:
+    if not path.endswith(".csv"):
+        table = _read_columnar(path)
+        if "load_batch_id" not in table.column_names:
+            return fingerprint([])
+        return fingerprint(v or "" for v in table.column("load_batch_id").to_pylist())
+    with open(path, newline="", encoding="utf-8") as f:
+        return fingerprint(row.get("load_batch_id") or "" for row in csv.DictReader(f))
+
+
+# ---------- Build ----------
+
+def build_index(rows: List[Dict[str, str]], path: str) -> int:
+    """
+    Write the index for `rows` to `path` atomically. Rows without a numeric
+    BRAND_ID are skipped; a repeated BRAND_ID keeps its last row.
+    Returns the number of records.
+    """
+    by_id: Dict[int, Dict[str, str]] = {}
+    for row in rows:
+        try:
+            by_id[int(row.get("BRAND_ID") or "")] = row
+        except ValueError:
+            continue
+    ids = sorted(by_id)
+    n = len(ids)
+
+    heap = bytearray()
+    strings: Dict[str, Tuple[int, int]] = {}
+
+    def intern(text: str) -> Tuple[int, int]:
+        ref = strings.get(text)
+        if ref is None:
+            data = text.encode("utf-8")
+            ref = strings[text] = (len(heap), len(data))
+            heap.extend(data)
+        return ref
+
+    records = bytearray()
+    folded_names = []
+    for i, brand_id in enumerate(ids):
+        row = by_id[brand_id]
+        refs: List[int] = []
+        for name in FIELDS:
+            refs.extend(intern(row.get(name) or ""))
+        folded = (row.get("BRAND_NAME") or "").casefold()
+        refs.extend(intern(folded))
+        folded_names.append((folded, brand_id, i))
+        records += _RECORD.pack(brand_id, *refs)
+
+    bits = max(3, (2 * n - 1).bit_length())
+    slots = 1 << bits
+    table = [(0, _EMPTY)] * slots
+    for i, brand_id in enumerate(ids):
+        s = _slot_of(brand_id, bits)
+        while table[s][1] != _EMPTY:
+            s = (s + 1) & (slots - 1)
+        table[s] = (brand_id, i)
+    hash_bytes = b"".join(_SLOT.pack(k, v) for k, v in table)
+
+    folded_names.sort()
+    names = struct.pack(f"<{n}I", *(i for _, _, i in folded_names))
+
+    records_off = _HEADER.size
+    hash_off = records_off + len(records)
+    names_off = hash_off + len(hash_bytes)
+    heap_off = names_off + len(names)
+    header = _HEADER.pack(
+        MAGIC, n, slots, records_off, hash_off, names_off, heap_off,
+        fingerprint(row.get("load_batch_id") or "" for row in rows),
+    )
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(records)
+        f.write(hash_bytes)
+        f.write(names)
+        f.write(heap)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return n
+
+
+# ---------- Read ----------
+
+class _Mapped:
+    """
+    One open generation of the index file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        (magic, self.count, self.slots, self.records_off, self.hash_off,
+         self.names_off, self.heap_off, self.fingerprint) = _HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a brand index")
+        self.bits = self.slots.bit_length() - 1
+
+    def text(self, off: int, length: int) -> str:
+        start = self.heap_off + off
+        return self.mm[start:start + length].decode("utf-8")
+
+    def record(self, i: int) -> Tuple[Any, ...]:
+        return _RECORD.unpack_from(self.mm, self.records_off + i * _RECORD.size)
+
+    def find(self, brand_id: int) -> Optional[int]:
+        s = _slot_of(brand_id, self.bits)
+        mask = self.slots - 1
+        while True:
+            key, i = _SLOT.unpack_from(self.mm, self.hash_off + s * _SLOT.size)
+            if i == _EMPTY:
+                return None
+            if key == brand_id:
+                return i
+            s = (s + 1) & mask
+
+    def name_at(self, rank: int) -> str:
+        (i,) = struct.unpack_from("<I", self.mm, self.names_off + rank * 4)
+        rec = self.record(i)
+        return self.text(rec[1 + 2 * _FOLDED], rec[2 + 2 * _FOLDED])
+
+    def as_dict(self, i: int) -> Dict[str, Any]:
+        rec = self.record(i)
+        out: Dict[str, Any] = {"BRAND_ID": rec[0]}
+        for f, name in enumerate(FIELDS):
+            out[name] = self.text(rec[1 + 2 * f], rec[2 + 2 * f])
+        return out
+
+
+class _NameView:
+    """
+    Sequence over case-folded names in sorted order, for bisect.
+    """
+
+    def __init__(self, mapped: _Mapped):
+        self.mapped = mapped
+
+    def __len__(self) -> int:
+        return self.mapped.count
+
+    def __getitem__(self, rank: int) -> str:
+        return self.mapped.name_at(rank)
+
+
+class BrandIndex:
+    """
+    Reader for the brand index file, optionally rebuilding it from a source.
+    `source` is one path or several candidates (e.g. the staged extract and
+    the CSV); the most recently modified one that exists is used.
+    refresh() (called at most every `check_interval` seconds) rebuilds when
+    the source's load_batch_id set changed and remaps after the file was
+    replaced; in-flight lookups keep using the mapping they started with.
+    """
+
+    def __init__(
+        self, path: str, source: Optional[Union[str, Sequence[str]]] = None, check_interval: float = 30.0
+    ):
+        self.path = path
+        self.sources = [source] if isinstance(source, str) else list(source or [])
+        self.check_interval = check_interval
+        self._mapped: Optional[_Mapped] = None
+        self._source_stamp: Optional[Tuple[str, int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- Maintenance ----------
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and self._checked_at and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            source = self.source()
+            if source is not None:
+                self._rebuild_if_changed(source)
+            if os.path.exists(self.path):
+                st = os.stat(self.path)
+                if self._mapped is None or self._mapped.stamp != (st.st_ino, st.st_mtime_ns, st.st_size):
+                    self._mapped = _Mapped(self.path)
+
+    def source(self) -> Optional[str]:
+        """
+        The newest existing source path, or None.
+        """
+        found = [(os.stat(p).st_mtime_ns, p) for p in self.sources if os.path.exists(p)]
+        return max(found)[1] if found else None
+
+    def _rebuild_if_changed(self, source: str) -> None:
+        st = os.stat(source)
+        stamp = (source, st.st_mtime_ns, st.st_size)
+        if stamp == self._source_stamp and os.path.exists(self.path):
+            return
+        current = self._mapped or (_Mapped(self.path) if os.path.exists(self.path) else None)
+        wanted = source_fingerprint(source)
+        if current is None or current.fingerprint != wanted:
+            self._build_locked(source, wanted)
+        self._source_stamp = stamp
+
+    def _build_locked(self, source: str, wanted: bytes) -> None:
+        """
+        One builder across workers. While an index file exists the others
+        keep serving it; before the first build they wait for the builder.
+        """
+        lock_path = self.path + ".lock"
+        with open(lock_path, "w") as lock:
+            if fcntl is not None:
+                first = not os.path.exists(self.path)
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX if first else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return
+                # Another worker may have built it while we waited
+                if first and os.path.exists(self.path) and _Mapped(self.path).fingerprint == wanted:
+                    return
+            count = build_index(read_source(source), self.path)
+            print(f"[BrandIndex] rebuilt {self.path}: {count} brands")
+
+    def _current(self) -> _Mapped:
+        if self._mapped is None:
+            self.refresh(force=True)
+        if self._mapped is None:
+            raise FileNotFoundError(f"brand index {self.path} has not been built")
+        return self._mapped
+
+    # ---------- Lookups ----------
+
+    def get(self, brand_id: int) -> Optional[Dict[str, Any]]:
+        mapped = self._current()
+        i = mapped.find(int(brand_id))
+        return None if i is None else mapped.as_dict(i)
+
+    def search(self, prefix: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Brands whose name starts with `prefix` (case-insensitive), by name.
+        """
+        mapped = self._current()
+        names = _NameView(mapped)
+        folded = prefix.casefold()
+        rank = bisect.bisect_left(names, folded)
+        out: List[Dict[str, Any]] = []
+        while rank < mapped.count and len(out) < limit:
+            if not names[rank].startswith(folded):
+                break
+            (i,) = struct.unpack_from("<I", mapped.mm, mapped.names_off + rank * 4)
+            out.append(mapped.as_dict(i))
+            rank += 1
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        mapped = self._mapped
+        return {
+            "path": self.path,
+            "brands": mapped.count if mapped else 0,
+            "fingerprint": mapped.fingerprint.hex() if mapped else None,
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python brand_index.py <stg_brand_detail.csv | brand_detail.arrow> <index file>")
+        sys.exit(2)
+    print(f"{build_index(read_source(sys.argv[1]), sys.argv[2])} brands written to {sys.argv[2]}")
@@ -0,0 +1,399 @@
+# changefeed.py – one shared change stream per process, fanned out to SSE clients
+
+"""
+ChangeFeed watches the projects collection once per process and keeps the
+last `buffer_size` changes in a ring, each already rendered as a
+server-sent-event frame:
+
+    id: <resume token>
+    event: change
+    data: {"op": "update", "_id": "...", "project_id": "...", "project": {...},
+           "changed": {...}, "removed": [...]}
+
+Subscribers only hold a sequence number into the ring, so an idle client
+costs one parked generator, not a thread: sync code waits on a Condition,
+asyncio code on one shared future per event loop. A client reconnecting
+with Last-Event-ID gets everything after that token while it is still in
+the ring; otherwise (and after a collection drop or lost oplog history) it
+gets a `resync` event and should reload /projects. If the feed gives up
+(no replica set), open streams get an `error` event and end.
+
+start() runs the stream on a daemon thread (pymongo Collection); run() is
+the coroutine for an AsyncCollection. Change streams need a replica set;
+on a standalone server the feed logs a warning and stays empty.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from projectdb import ProjectDB
+
+# Events after which the stream is closed by the server
+INVALIDATING_OPS = ("drop", "rename", "dropDatabase", "invalidate")
+# ChangeStreamFatalError, ChangeStreamHistoryLost: the token cannot be resumed
+HISTORY_LOST_CODES = (280, 286)
+# $changeStream on a standalone server / unsupported storage engine
+NOT_SUPPORTED_CODES = (40573, 40324)
+
+RESYNC = "resync"
+# EventSource reconnect delay sent to clients
+RETRY_MS = 3000
+
+
+class ChangeFeed:
+    """
+    Per-process change stream on the projects collection with a ring
+    buffer of rendered SSE frames.
+    """
+
+    def __init__(
+        self,
+        collection_factory: Callable[[], Any],
+        dumps: Callable[[Any], str],
+        buffer_size: int = 10000,
+        retry_delay: float = 1.0,
+    ):
+        # Looked up per (re)connect so a forked worker uses its own client
+        self.collection_factory = collection_factory
+        self.dumps = dumps
+        self.buffer_size = buffer_size
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        # seq % buffer_size -> (seq, token, project_id, resync, frame)
+        self._ring: List[Optional[Tuple[int, Optional[str], Optional[str], bool, str]]] = [None] * buffer_size
+        self._seq = 0
+        self._by_token: Dict[str, int] = {}
+        self._latest_token: Optional[str] = None
+        self._resume: Optional[Dict[str, Any]] = None
+        # Deletes only carry _id; remember which project each _id was
+        self._project_ids: "OrderedDict[str, str]" = OrderedDict()
+        # event loop -> future resolved on the next publish
+        self._waiters: Dict[asyncio.AbstractEventLoop, asyncio.Future] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._pid: Optional[int] = None
+        # Set once the first watch() has opened or failed
+        self._attempted = threading.Event()
+
+        self.error: Optional[str] = None
+        self.published = 0
+        self.resyncs = 0
+
+    def add_listener(self, fn: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call fn(change) with every raw change document (e.g. cache eviction).
+        """
+        self._listeners.append(fn)
+
+    # ---------- Stream ----------
+
+    def start(self) -> None:
+        """
+        Start the watcher thread once per process; safe to call per request.
+        """
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name="project-change-feed", daemon=True).start()
+
+    def wait_started(self, timeout: float) -> Optional[str]:
+        """
+        Wait up to `timeout` seconds for the first watch attempt; returns
+        self.error (None while the stream is up or still connecting).
+        """
+        self._attempted.wait(timeout)
+        return self.error
+
+    def _watch_options(self) -> Dict[str, Any]:
+        return {"full_document": "updateLookup", "resume_after": self._resume}
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with self.collection_factory().watch(**self._watch_options()) as stream:
+                    self._attempted.set()
+                    for change in stream:
+                        if not self._handle(change):
+                            break
+            except PyMongoError as e:
+                recovering = self._recover(e)
+                self._attempted.set()
+                if not recovering:
+                    return
+                time.sleep(self.retry_delay)
+
+    async def run(self) -> None:
+        """
+        Same loop on an AsyncCollection; run it as a background task.
+        """
+        self._pid = os.getpid()
+        while True:
+            try:
+                async with await self.collection_factory().watch(**self._watch_options()) as stream:
+                    self._attempted.set()
+                    async for change in stream:
+                        if not self._handle(change):
+                            break
+            except PyMongoError as e:
+                recovering = self._recover(e)
+                self._attempted.set()
+                if not recovering:
+                    return
+                await asyncio.sleep(self.retry_delay)
+
+    def _handle(self, change: Dict[str, Any]) -> bool:
+        """
+        Publish one change; False when the server closes the stream after it.
+        """
+        for fn in self._listeners:
+            try:
+                fn(change)
+            except Exception as e:
+                print("[ChangeFeed] listener error:", e)
+        self._resume = change["_id"]
+        op = change.get("operationType")
+        if op in INVALIDATING_OPS:
+            # Collection dropped or renamed: clients must reload, watch from now
+            self._resume = None
+            self._publish_resync()
+            return False
+        if op in ("insert", "update", "replace", "delete"):
+            self._publish(self._delta(change), change["_id"].get("_data"))
+        return True
+
+    def _recover(self, e: PyMongoError) -> bool:
+        """
+        Decide whether to reopen the stream after an error.
+        """
+        code = e.code if isinstance(e, OperationFailure) else None
+        if code in NOT_SUPPORTED_CODES:
+            self.error = str(e)
+            print("[ChangeFeed] Warning: change stream unavailable:", e)
+            self._wake_all()
+            return False
+        if code in HISTORY_LOST_CODES:
+            # Our own resume point fell off the oplog; clients may have missed events
+            self._resume = None
+            self._publish_resync()
+        else:
+            print("[ChangeFeed] stream error, resuming:", e)
+        return True
+
+    def _delta(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        op = change["operationType"]
+        oid = change["documentKey"]["_id"]
+        key = str(oid) if isinstance(oid, ObjectId) else oid
+        event: Dict[str, Any] = {"op": op, "_id": key}
+        doc = change.get("fullDocument")
+        if doc:
+            project = ProjectDB._normalize(doc)
+            event["project_id"] = project.get("project_id")
+            event["project"] = project
+            self._remember_project(key, project.get("project_id"))
+        elif op == "delete":
+            event["project_id"] = self._project_ids.pop(key, None)
+        else:
+            # Update of a document deleted before the lookup ran
+            event["project_id"] = self._project_ids.get(key)
+        if op == "update":
+            desc = change.get("updateDescription") or {}
+            event["changed"] = desc.get("updatedFields", {})
+            event["removed"] = desc.get("removedFields", [])
+        return event
+
+    def _remember_project(self, key: Any, project_id: Optional[str]) -> None:
+        if project_id is None:
+            return
+        self._project_ids[key] = project_id
+        self._project_ids.move_to_end(key)
+        while len(self._project_ids) > self.buffer_size * 10:
+            self._project_ids.popitem(last=False)
+
+    # ---------- Ring buffer ----------
+
+    def _publish(self, event: Dict[str, Any], token: Optional[str], resync: bool = False) -> None:
+        name = RESYNC if resync else "change"
+        frame = (f"id: {token}\n" if token else "") + f"event: {name}\ndata: {self.dumps(event)}\n\n"
+        with self._cond:
+            self._seq += 1
+            slot = self._seq % self.buffer_size
+            old = self._ring[slot]
+            if old is not None and old[1] is not None and self._by_token.get(old[1]) == old[0]:
+                del self._by_token[old[1]]
+            self._ring[slot] = (self._seq, token, event.get("project_id"), resync, frame)
+            if token and not resync:
+                # A resync reuses the last token; resuming from it must still see the resync
+                self._by_token[token] = self._seq
+                self._latest_token = token
+            self.published += 1
+        self._wake_all()
+
+    def _wake_all(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, {}
+        for loop, fut in waiters.items():
+            try:
+                loop.call_soon_threadsafe(_wake, fut)
+            except RuntimeError:
+                # Loop already closed
+                pass
+
+    def _publish_resync(self) -> None:
+        self.resyncs += 1
+        self._publish({"op": RESYNC}, self._latest_token, resync=True)
+
+    def cursor(self, last_event_id: Optional[str] = None) -> Tuple[int, bool]:
+        """
+        Sequence number to read after for a (re)connecting client, and
+        whether it must resync because its token is no longer buffered.
+        """
+        with self._cond:
+            if not last_event_id:
+                return self._seq, False
+            seq = self._by_token.get(last_event_id)
+            if seq is None:
+                return self._seq, True
+            return seq, False
+
+    def read(self, after: int, project_ids: Optional[Iterable[str]] = None) -> Tuple[int, List[str], bool]:
+        """
+        Frames published after `after` (optionally only for some projects):
+        (new cursor, frames, fell_behind). fell_behind means older frames
+        were already overwritten and the client must resync.
+        """
+        wanted = set(project_ids) if project_ids else None
+        with self._cond:
+            latest = self._seq
+            if latest - after > self.buffer_size:
+                return latest, [], True
+            entries = [self._ring[seq % self.buffer_size] for seq in range(after + 1, latest + 1)]
+        frames = [
+            frame for _, _, project_id, resync, frame in entries
+            if resync or wanted is None or project_id in wanted
+        ]
+        return latest, frames, False
+
+    def resync_frame(self) -> str:
+        token = self._latest_token
+        return (f"id: {token}\n" if token else "") + f"event: {RESYNC}\ndata: {self.dumps({'op': RESYNC})}\n\n"
+
+    def error_frame(self) -> str:
+        return f"event: error\ndata: {self.dumps({'op': 'error', 'message': self.error})}\n\n"
+
+    # ---------- Waiting ----------
+
+    def wait(self, after: int, timeout: float) -> bool:
+        """
+        Block until something is published after `after` or the feed
+        fails; False on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > after or self.error is not None, timeout)
+
+    async def wait_async(self, after: int, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._seq > after or self.error is not None:
+                return True
+            fut = self._waiters.get(loop)
+            if fut is None or fut.done():
+                fut = self._waiters[loop] = loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # ---------- Stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            buffered = min(self._seq, self.buffer_size)
+            waiting_loops = len(self._waiters)
+        return {
+            "watching": self._pid == os.getpid() and self.error is None,
+            "error": self.error,
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "buffered": buffered,
+            "buffer_size": self.buffer_size,
+            "waiting_loops": waiting_loops,
+        }
+
+
+# ---------- SSE responses ----------
+
+def stream_events(
+    feed: ChangeFeed,
+    last_event_id: Optional[str] = None,
+    project_ids: Optional[Iterable[str]] = None,
+    heartbeat: float = 15.0,
+    max_seconds: float = 300.0,
+) -> Iterator[str]:
+    """
+    SSE body for one subscriber. Ends after max_seconds; EventSource then
+    reconnects with Last-Event-ID and picks up where it left off.
+    """
+    cursor, resync = feed.cursor(last_event_id)
+    yield f"retry: {RETRY_MS}\n\n"
+    if resync:
+        yield feed.resync_frame()
+    deadline = time.monotonic() + max_seconds
+    while True:
+        if feed.error is not None:
+            yield feed.error_frame()
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not feed.wait(cursor, min(heartbeat, remaining)):
+            # Comment line: keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            continue
+        cursor, frames, behind = feed.read(cursor, project_ids)
+        if behind:
+            yield feed.resync_frame()
+        elif frames:
+            yield "".join(frames)
+
+
+async def stream_events_async(
+    feed: ChangeFeed,
+    last_event_id: Optional[str] = None,
+    project_ids: Optional[Iterable[str]] = None,
+    heartbeat: float = 15.0,
+    max_seconds: float = 300.0,
+) -> AsyncIterator[str]:
+    cursor, resync = feed.cursor(last_event_id)
+    yield f"retry: {RETRY_MS}\n\n"
+    if resync:
+        yield feed.resync_frame()
+    deadline = time.monotonic() + max_seconds
+    while True:
+        if feed.error is not None:
+            yield feed.error_frame()
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not await feed.wait_async(cursor, min(heartbeat, remaining)):
+            yield ": keep-alive\n\n"
+            continue
+        cursor, frames, behind = feed.read(cursor, project_ids)
+        if behind:
+            yield feed.resync_frame()
+        elif frames:
+            yield "".join(frames)
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,61 @@
+# compression.py – gzip/brotli response compression for JSON and HTML
+
+import gzip
+
+from flask import Flask, request
+
+try:
+    import brotli  # in requirements.txt; without it clients get gzip
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/html", "text/css", "text/javascript")
+
+
+def _choose_encoding(accept) -> str:
+    if brotli is not None and accept["br"]:
+        return "br"
+    if accept["gzip"]:
+        return "gzip"
+    return ""
+
+
+def init_compression(app: Flask, min_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4) -> None:
+    """
+    Compress buffered responses of at least `min_size` bytes when the client
+    accepts it. Streamed responses are left alone so they keep flushing
+    document by document.
+    """
+
+    @app.after_request
+    def compress(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = _choose_encoding(request.accept_encodings)
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if encoding == "br":
+            data = brotli.compress(data, quality=brotli_quality)
+        else:
+            data = gzip.compress(data, compresslevel=gzip_level)
+
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        # Body bytes differ per encoding, so only a weak validator still holds
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
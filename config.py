@@ -2,6 +2,12 @@
 
 import os
 
+from dotenv import load_dotenv
+
+# Settings are read at import time, so .env has to be loaded first
+load_dotenv()
+
+
 class Config:
     # Prefer a full Mongo connection string
     MONGO_URI = os.getenv("MONGO_URI")
@@ -9,7 +15,71 @@ class Config:
     # Fallback host/port mode
     MONGO_HOST = os.getenv("MONGO_HOST", "localhost")
     MONGO_PORT = int(os.getenv("MONGO_PORT", "27017"))
-    MONGO_DB = os.getenv("MONGO_DB", "projects_db")
+    MONGO_DB = os.getenv("MONGO_DB", "haasappprojectsdb")
     MONGO_INITDB_ROOT_USERNAME = os.getenv("MONGO_INITDB_ROOT_USERNAME")
     MONGO_INITDB_ROOT_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
     MONGO_AUTHSOURCE = os.getenv("MONGO_AUTHSOURCE", "admin")
+
+    # Connection pool (per gunicorn worker)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Comma separated; zstd/snappy need the zstandard/python-snappy packages
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+
+    # Per-call deadlines and circuit breaker around ProjectDB (resilience.py)
+    MONGO_RESILIENCE = os.getenv("MONGO_RESILIENCE", "true").lower() in ("1", "true", "yes")
+    MONGO_READ_TIMEOUT_MS = int(os.getenv("MONGO_READ_TIMEOUT_MS", "1000"))
+    MONGO_WRITE_TIMEOUT_MS = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "3000"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "10"))
+    BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "5"))
+    # Last good list/project responses served while Mongo is failing, up to this old
+    STALE_MAX_AGE_SECONDS = float(os.getenv("STALE_MAX_AGE_SECONDS", "300"))
+    # /health reports "degraded" when a ping takes at least this long
+    HEALTH_SLOW_MS = float(os.getenv("HEALTH_SLOW_MS", "250"))
+
+    # Read-through cache for GET /projects/<project_id> (size 0 disables it)
+    PROJECT_CACHE_SIZE = int(os.getenv("PROJECT_CACHE_SIZE", "1024"))
+    PROJECT_CACHE_TTL = float(os.getenv("PROJECT_CACHE_TTL", "30"))
+    PROJECT_CACHE_WATCH = os.getenv("PROJECT_CACHE_WATCH", "").lower() in ("1", "true", "yes")
+
+    # POST /projects: coalesce concurrent creates into insert_many batches
+    WRITE_BEHIND = os.getenv("WRITE_BEHIND", "").lower() in ("1", "true", "yes")
+    WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "100"))
+    WRITE_BEHIND_MAX_DELAY_MS = float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "5"))
+    WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+
+    # /projects/events: changes kept per process for Last-Event-ID resumes
+    CHANGE_FEED_BUFFER = int(os.getenv("CHANGE_FEED_BUFFER", "10000"))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Streams end after this long and the client reconnects (rebalances workers)
+    EVENTS_STREAM_SECONDS = float(os.getenv("EVENTS_STREAM_SECONDS", "300"))
+    # First /projects/events request per worker waits this long for the stream to open
+    EVENTS_START_WAIT_SECONDS = float(os.getenv("EVENTS_START_WAIT_SECONDS", "2"))
+
+    # Mongo commands at or above this many milliseconds go to the slow-query log
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+    # Responses smaller than this are sent uncompressed
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+
+    # CSV extracts behind /api/top10companies, and how often to look for new rows
+    SPEND_DATA_DIR = os.getenv("SPEND_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "10"))
+    LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "30"))
+    # Arrow/Parquet store written by spend_ingest.py, queried by /api/spend
+    SPEND_STORE_DIR = os.getenv("SPEND_STORE_DIR", os.path.join(SPEND_DATA_DIR, "spend"))
+    SPEND_MAX_ROWS = int(os.getenv("SPEND_MAX_ROWS", "1000"))
+
+    # Memory-mapped brand dimension behind /api/brands, rebuilt on new load_batch_ids from the
+    # newer of SPEND_STORE_DIR/brand_detail.{arrow,parquet} and this CSV
+    BRAND_INDEX_PATH = os.getenv("BRAND_INDEX_PATH", os.path.join(SPEND_DATA_DIR, "brand_index.bin"))
+    BRAND_SOURCE_CSV = os.getenv("BRAND_SOURCE_CSV", os.path.join(SPEND_DATA_DIR, "stg_brand_detail.csv"))
+
+    # Precomputed spend rollups behind /api/rollups: "file" (ROLLUP_DIR) or "mongo"
+    ROLLUP_STORE = os.getenv("ROLLUP_STORE", "file")
+    ROLLUP_DIR = os.getenv("ROLLUP_DIR", os.path.join(SPEND_DATA_DIR, "rollups"))
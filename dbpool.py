@@ -0,0 +1,131 @@
+# dbpool.py – Mongo client options and connection-pool monitoring
+
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+
+def client_options(config: Any) -> Dict[str, Any]:
+    """
+    Keyword arguments for MongoClient built from a Config-like object.
+    connect=False defers the first connection until the first operation, so
+    a client created in a gunicorn --preload master never opens sockets.
+    """
+    options: Dict[str, Any] = {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connect": False,
+    }
+    if config.MONGO_COMPRESSORS:
+        options["compressors"] = config.MONGO_COMPRESSORS
+    if not config.MONGO_URI:
+        options.update({"host": config.MONGO_HOST, "port": config.MONGO_PORT})
+        if config.MONGO_INITDB_ROOT_USERNAME and config.MONGO_INITDB_ROOT_PASSWORD:
+            options.update(
+                {
+                    "username": config.MONGO_INITDB_ROOT_USERNAME,
+                    "password": config.MONGO_INITDB_ROOT_PASSWORD,
+                    "authSource": config.MONGO_AUTHSOURCE,
+                }
+            )
+    return options
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Counts pool activity for one process: open and checked-out connections,
+    checkout failures and how long requests waited for a connection.
+    """
+
+    def __init__(self, max_pool_size: int = 100, window: int = 1024):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._waits: deque = deque(maxlen=window)
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self._waits.clear()
+
+    # ---------- Listener hooks ----------
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def _record_wait(self, duration: Optional[float]) -> None:
+        # Caller holds the lock; duration is in seconds (pymongo >= 4.7)
+        if duration is None:
+            return
+        self.wait_total += duration
+        self.wait_max = max(self.wait_max, duration)
+        self._waits.append(duration)
+
+    # ---------- Stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            timed = self.checkouts + self.checkout_failures
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open_connections": self.open,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "utilization": round(self.checked_out / self.max_pool_size, 4) if self.max_pool_size else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_ms_avg": round(self.wait_total / timed * 1000, 3) if timed else 0.0,
+                "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
@@ -0,0 +1,360 @@
+# extract_runner.py – parallel multi-table extract: threaded reads, process-pool encoding
+
+"""
+Pulls several staging tables at once. The large spend table is split into
+TRANS_DATE month ranges; every other table is one partition.
+
+    reader threads (one pooled connection each, streaming chunk_rows at a time)
+        -> bounded chunk queue            (backpressure: readers block when full)
+        -> process pool (to Arrow + write, at most max_pending chunks in flight)
+
+Peak memory is roughly (queue_size + max_pending) * chunk_rows rows, however
+big the tables are. Spend chunks land in the spend_ingest layout
+(daily_spend/TRANS_DATE=.../part-*.arrow); other tables are written as
+<out>/<table>.arrow, and stg_brand_detail as brand_detail.arrow so the API
+modules read it directly.
+
+A run is a full snapshot: everything is written under <out>/.staging and
+only swapped in (renames, the watermark last) once every partition
+succeeded, so old parts never mix with the new ones and a failed run
+leaves the store as it was. daily_spend is a symlink to a versioned
+.daily_spend.<ns> directory, replaced in one os.replace(); the first run
+over a plain daily_spend directory (as spend_ingest creates it) moves that
+aside first, and readers retry a load that raced it.
+
+If any partition or encoder fails (a worker process dying included), the
+readers are told to stop and the queue is drained, so the run raises
+instead of waiting on readers blocked on a full queue.
+
+    python extract_runner.py --source sqlite:////tmp/standin.db --out /tmp/spend
+    python extract_runner.py --tables stg_daily_spend,stg_brand_detail --readers 4 --workers 4
+"""
+
+import argparse
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.feather as feather
+from sqlalchemy import text
+
+import spend_ingest
+
+DEFAULT_TABLES = ("stg_daily_spend", "stg_brand_detail")
+SPEND = "stg_daily_spend"
+
+
+@dataclass
+class Partition:
+    name: str
+    table: str
+    where: str = ""
+    params: Dict[str, Any] = field(default_factory=dict)
+    rows: int = 0
+    chunks: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        seconds = max(self.finished - self.started, 1e-9)
+        return {"partition": self.name, "rows": self.rows, "chunks": self.chunks,
+                "seconds": round(seconds, 3), "rows_per_sec": round(self.rows / seconds, 1)}
+
+
+# ---------- Planning ----------
+
+def _months(first: str, last: str) -> List[str]:
+    year, month = int(first[:4]), int(first[5:7])
+    out = []
+    while f"{year:04d}-{month:02d}" <= last[:7]:
+        out.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return out
+
+
+def plan(engine, tables: Sequence[str], schema: str = "ingest") -> Tuple[List[Partition], Optional[Tuple[str, str]]]:
+    """
+    One partition per small table; the spend table gets one per TRANS_DATE
+    month, all bounded by the newest (ingested_at_utc, load_batch_id) at plan
+    time. That bound is returned so it can become the spend_ingest watermark
+    and incremental runs pick up exactly where this snapshot ends.
+    """
+    parts: List[Partition] = []
+    mark = None
+    for table in tables:
+        qualified = f"{schema}.{table}"
+        if table != SPEND:
+            parts.append(Partition(table, qualified))
+            continue
+        with engine.connect() as conn:
+            lo, hi, ts = conn.execute(
+                text(f"SELECT MIN(TRANS_DATE), MAX(TRANS_DATE), MAX(ingested_at_utc) FROM {qualified}")
+            ).one()
+            if lo is None:
+                continue
+            batch = conn.execute(
+                text(f"SELECT MAX(load_batch_id) FROM {qualified} WHERE ingested_at_utc = :ts"), {"ts": ts}
+            ).scalar()
+        mark = spend_ingest.row_watermark((None,) * 7 + (batch, ts))
+        bound = " AND (ingested_at_utc < :ts OR (ingested_at_utc = :ts AND load_batch_id <= :batch))"
+        for month in _months(str(lo)[:10], str(hi)[:10]):
+            nxt = _months(month + "-01", "9999-12")[1]
+            parts.append(Partition(
+                f"{table}[{month}]", qualified,
+                where="TRANS_DATE >= :lo AND TRANS_DATE < :hi" + bound,
+                params={"lo": f"{month}-01", "hi": f"{nxt}-01", "ts": ts, "batch": batch},
+            ))
+    return parts, mark
+
+
+# ---------- Process-pool side ----------
+
+def encode_chunk(out_dir: str, table: str, part_name: str, seq: int, columns: List[str], rows: List[tuple]) -> int:
+    """
+    Runs in a worker process: rows -> Arrow -> file. Returns rows written.
+    """
+    if table.endswith(SPEND):
+        chunk_id = part_name.replace("[", "-").rstrip("]") + f"-{seq:05d}"
+        spend_ingest.write_chunk(spend_ingest.to_table(rows), out_dir, chunk_id)
+    else:
+        cols = list(zip(*rows)) or [()] * len(columns)
+        arrays = [pa.array([None if v is None else str(v) for v in col], type=pa.string()) for col in cols]
+        part_dir = os.path.join(out_dir, "_parts", part_name)
+        os.makedirs(part_dir, exist_ok=True)
+        feather.write_feather(pa.Table.from_arrays(arrays, names=columns),
+                              os.path.join(part_dir, f"part-{seq:05d}.arrow"), compression="uncompressed")
+    return len(rows)
+
+
+def _finish_table(out_dir: str, part: Partition) -> None:
+    """
+    Small tables: merge their chunk files into one <out>/<name>.arrow.
+    """
+    part_dir = os.path.join(out_dir, "_parts", part.name)
+    if not os.path.isdir(part_dir):
+        return
+    files = sorted(os.listdir(part_dir))
+    merged = pa.concat_tables([feather.read_table(os.path.join(part_dir, f)) for f in files])
+    name = spend_ingest.BRAND_FILE if part.name == "stg_brand_detail" else part.name
+    target = os.path.join(out_dir, f"{name}.arrow")
+    feather.write_feather(merged, target + ".tmp", compression="uncompressed")
+    os.replace(target + ".tmp", target)
+    for f in files:
+        os.remove(os.path.join(part_dir, f))
+    os.rmdir(part_dir)
+    if not os.listdir(os.path.dirname(part_dir)):
+        os.rmdir(os.path.dirname(part_dir))
+
+
+def _publish(staging: str, out_dir: str, spend: bool) -> None:
+    """
+    Move a finished snapshot from staging into out_dir. daily_spend is
+    swapped as a whole by repointing its symlink; the watermark goes last,
+    since readers reload when it changes.
+    """
+    if spend:
+        name = spend_ingest.SPEND_DIR
+        live = os.path.join(out_dir, name)
+        version = f".{name}.{time.time_ns()}"
+        fresh = os.path.join(staging, name)
+        os.makedirs(fresh, exist_ok=True)
+        os.rename(fresh, os.path.join(out_dir, version))
+        if os.path.isdir(live) and not os.path.islink(live):
+            # A directory cannot be replaced by a link in one step
+            os.rename(live, os.path.join(out_dir, f".{name}.0"))
+        link = os.path.join(out_dir, f".{name}.link")
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(version, link)
+        os.replace(link, live)
+        for entry in os.listdir(out_dir):
+            if entry.startswith(f".{name}.") and entry != version:
+                shutil.rmtree(os.path.join(out_dir, entry), ignore_errors=True)
+    names = sorted(os.listdir(staging), key=lambda name: name == spend_ingest.WATERMARK_FILE)
+    for name in names:
+        os.replace(os.path.join(staging, name), os.path.join(out_dir, name))
+    shutil.rmtree(staging)
+
+
+# ---------- Runner ----------
+
+class ExtractRunner:
+    def __init__(
+        self,
+        engine,
+        out_dir: str,
+        readers: int = 4,
+        workers: int = 2,
+        chunk_rows: int = spend_ingest.DEFAULT_CHUNK_ROWS,
+        queue_size: int = 4,
+        max_pending: Optional[int] = None,
+    ):
+        self.engine = engine
+        self.out_dir = out_dir
+        self.readers = readers
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.queue_size = queue_size
+        self.chunks: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.max_pending = max_pending or workers * 2
+        self.peak_queue = 0
+        self._stop = threading.Event()
+
+    def _put(self, item: tuple) -> bool:
+        """
+        Queue item, blocking while the queue is full; False once the run
+        is being torn down.
+        """
+        while not self._stop.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self, part: Partition) -> None:
+        """
+        Reader thread: stream one partition into the bounded queue.
+        """
+        try:
+            cols = ", ".join(spend_ingest.SPEND_SCHEMA.names) if part.table.endswith(SPEND) else "*"
+            query = f"SELECT {cols} FROM {part.table}" + (f" WHERE {part.where}" if part.where else "")
+            part.started = time.perf_counter()
+            with self.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=self.chunk_rows).execute(
+                    text(query), part.params
+                )
+                columns = list(result.keys())
+                for seq, rows in enumerate(result.partitions(self.chunk_rows)):
+                    # Blocks while the encoders are behind
+                    if not self._put((part, seq, columns, [tuple(r) for r in rows])):
+                        return
+                    self.peak_queue = max(self.peak_queue, self.chunks.qsize())
+        except Exception as e:
+            self._put((part, -1, None, e))
+            return
+        self._put((part, None, None, None))
+
+    def run(self, partitions: List[Partition], watermark: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+        staging = os.path.join(self.out_dir, ".staging")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            stats = self._extract(staging, partitions, watermark)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        _publish(staging, self.out_dir, any(p.table.endswith(SPEND) for p in partitions))
+        return stats
+
+    def _extract(self, out_dir: str, partitions: List[Partition], watermark: Optional[Tuple[str, str]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self.chunks = queue.Queue(maxsize=self.queue_size)
+        self._stop.clear()
+        in_flight = threading.BoundedSemaphore(self.max_pending)
+        lock = threading.Lock()
+        futures = []
+        errors: List[BaseException] = []
+
+        def done(part: Partition, future) -> None:
+            in_flight.release()
+            try:
+                n = future.result()
+            except Exception as e:
+                errors.append(e)
+                return
+            with lock:
+                part.rows += n
+                part.chunks += 1
+                part.finished = max(part.finished, time.perf_counter())
+
+        with ProcessPoolExecutor(self.workers) as pool, ThreadPoolExecutor(self.readers) as readers:
+            for part in partitions:
+                readers.submit(self._read, part)
+            open_parts = len(partitions)
+            try:
+                while open_parts and not errors:
+                    part, seq, columns, rows = self.chunks.get()
+                    if seq is None:
+                        open_parts -= 1
+                        part.finished = max(part.finished, time.perf_counter())
+                        continue
+                    if seq == -1:
+                        errors.append(rows)
+                        open_parts -= 1
+                        continue
+                    in_flight.acquire()
+                    # Raises BrokenProcessPool once a worker has died
+                    future = pool.submit(encode_chunk, out_dir, part.table, part.name, seq, columns, rows)
+                    future.add_done_callback(lambda f, p=part: done(p, f))
+                    futures.append(future)
+            finally:
+                # Unblock readers still waiting on a full queue before the executors join them
+                self._stop.set()
+                while True:
+                    try:
+                        self.chunks.get_nowait()
+                    except queue.Empty:
+                        break
+            for future in futures:
+                future.exception()
+
+        if errors:
+            raise errors[0]
+        for part in partitions:
+            if not part.table.endswith(SPEND):
+                _finish_table(out_dir, part)
+        total = sum(p.rows for p in partitions)
+        if watermark is not None:
+            spend_rows = sum(p.rows for p in partitions if p.table.endswith(SPEND))
+            spend_ingest.write_watermark(out_dir, watermark, spend_rows)
+        elapsed = time.perf_counter() - started
+        return {
+            "rows": total,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(total / max(elapsed, 1e-9), 1),
+            "peak_queue": self.peak_queue,
+            "partitions": [p.report() for p in partitions],
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="SQLAlchemy URL (default: AZURE_SQL_* from .env)")
+    parser.add_argument("--out", default="data/spend")
+    parser.add_argument("--tables", default=",".join(DEFAULT_TABLES))
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--chunk-rows", type=int, default=spend_ingest.DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--queue-size", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.source is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    # One pooled connection per reader thread
+    engine = spend_ingest.make_engine(
+        args.source or spend_ingest.azure_url_from_env(), pool_size=args.readers, max_overflow=0
+    )
+    runner = ExtractRunner(engine, args.out, readers=args.readers, workers=args.workers,
+                           chunk_rows=args.chunk_rows, queue_size=args.queue_size)
+    partitions, watermark = plan(engine, [t.strip() for t in args.tables.split(",") if t.strip()])
+    stats = runner.run(partitions, watermark)
+    for p in stats["partitions"]:
+        print(f"  {p['partition']:32s} {p['rows']:>10} rows  {p['rows_per_sec']:>12,.0f} rows/s")
+    print(f"[extract_runner] {stats['rows']} rows in {stats['seconds']}s "
+          f"({stats['rows_per_sec']:,.0f} rows/s, peak queue {stats['peak_queue']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# hardwaredb.py – hardware-set capacity, project checkouts and the checkout ledger
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+# Projection for hardware-set documents returned to callers
+_PUBLIC = {"_id": 0}
+
+# Attempts when a project's checkout entry appears or disappears mid-checkout
+_RETRIES = 5
+
+
+class HardwareDB:
+    """
+    One document per hardware set:
+
+        {hw_id, name, capacity, available, checkouts: [{project_id, qty}], seq}
+
+    Checkout and check-in are single find_one_and_update calls whose filter
+    is the guard (enough available / enough held by that project), so
+    concurrent clients can never oversell and no lock is taken. Every change
+    bumps `seq` and appends one entry with that seq to hardware_ledger; the
+    ledger is never updated, and audit() compares it with the counters.
+    """
+
+    def __init__(self, db=None, db_factory: Optional[Callable[[], Any]] = None):
+        """
+        Pass the Database, or a db_factory that looks it up on each use
+        (e.g. lambda: project_db.db) so nothing connects at construction.
+        """
+        self._db_factory = db_factory if db_factory is not None else (lambda: db)
+
+    @property
+    def sets(self):
+        return self._db_factory()["hardware_sets"]
+
+    @property
+    def ledger(self):
+        return self._db_factory()["hardware_ledger"]
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the hardware indexes; run once per deploy via migrate.py.
+        """
+        return [
+            self.sets.create_index([("hw_id", ASCENDING)], unique=True, name="idx_hw_id_unique"),
+            self.sets.create_index([("checkouts.project_id", ASCENDING)], name="idx_checkouts_project"),
+            self.ledger.create_index([("hw_id", ASCENDING), ("seq", ASCENDING)], unique=True, name="idx_hw_seq_unique"),
+            self.ledger.create_index([("project_id", ASCENDING), ("at", DESCENDING)], name="idx_project_at"),
+        ]
+
+    # ---------- Helpers ----------
+
+    @staticmethod
+    def _quantity(qty: Any) -> int:
+        if isinstance(qty, bool) or not isinstance(qty, int) or qty <= 0:
+            raise ValueError("qty must be a positive integer")
+        return qty
+
+    def _record(self, doc: Dict[str, Any], action: str, project_id: Optional[str], qty: int) -> None:
+        """
+        Append the ledger entry for the change that produced `doc`. The
+        counters are authoritative; a failed append shows up as a seq gap
+        in audit() rather than failing the checkout that already happened.
+        """
+        try:
+            self.ledger.insert_one(
+                {
+                    "hw_id": doc["hw_id"],
+                    "seq": doc["seq"],
+                    "action": action,
+                    "project_id": project_id,
+                    "qty": qty,
+                    "available": doc["available"],
+                    "at": datetime.now(timezone.utc),
+                }
+            )
+        except PyMongoError as e:
+            print("[HardwareDB] ledger append error:", e)
+
+    @staticmethod
+    def _held(doc: Dict[str, Any], project_id: str) -> int:
+        return next((c["qty"] for c in doc.get("checkouts", []) if c["project_id"] == project_id), 0)
+
+    def _outcome(self, status: str, hw_id: str, doc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if doc is None and status != "not_found":
+            doc = self.sets.find_one({"hw_id": hw_id}, _PUBLIC)
+            if doc is None:
+                status = "not_found"
+        return {"status": status, "hw_id": hw_id, "hardware_set": doc}
+
+    # ---------- Hardware sets ----------
+
+    def create_set(self, hw_id: str, capacity: int, name: str = "") -> Dict[str, Any]:
+        """
+        Raises DuplicateKeyError if hw_id exists.
+        """
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 0:
+            raise ValueError("capacity must be a non-negative integer")
+        doc = {
+            "hw_id": hw_id,
+            "name": name,
+            "capacity": capacity,
+            "available": capacity,
+            "checkouts": [],
+            "seq": 1,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        try:
+            self.sets.insert_one(doc)
+        except PyMongoError as e:
+            print("[HardwareDB] create_set error:", e)
+            raise
+        doc.pop("_id", None)
+        self._record(doc, "create", None, capacity)
+        return doc
+
+    def get_set(self, hw_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.sets.find_one({"hw_id": hw_id}, _PUBLIC)
+        except PyMongoError as e:
+            print("[HardwareDB] get_set error:", e)
+            raise
+
+    def list_sets(self) -> List[Dict[str, Any]]:
+        try:
+            return list(self.sets.find({}, _PUBLIC).sort("hw_id", ASCENDING))
+        except PyMongoError as e:
+            print("[HardwareDB] list_sets error:", e)
+            raise
+
+    def set_capacity(self, hw_id: str, capacity: int) -> Dict[str, Any]:
+        """
+        Change capacity, moving `available` by the same amount. Refused
+        ("insufficient") when projects hold more than the new capacity.
+        """
+        if isinstance(capacity, bool) or not isinstance(capacity, int) or capacity < 0:
+            raise ValueError("capacity must be a non-negative integer")
+        try:
+            for _ in range(_RETRIES):
+                current = self.sets.find_one({"hw_id": hw_id}, {"capacity": 1, "available": 1})
+                if current is None:
+                    return self._outcome("not_found", hw_id)
+                delta = capacity - current["capacity"]
+                if current["available"] + delta < 0:
+                    return self._outcome("insufficient", hw_id)
+                # Guarded on the capacity we read; a concurrent resize makes us re-read
+                doc = self.sets.find_one_and_update(
+                    {"hw_id": hw_id, "capacity": current["capacity"], "available": {"$gte": -delta}},
+                    {"$set": {"capacity": capacity}, "$inc": {"available": delta, "seq": 1},
+                     "$currentDate": {"updated_at": True}},
+                    projection=_PUBLIC,
+                    return_document=ReturnDocument.AFTER,
+                )
+                if doc is not None:
+                    self._record(doc, "capacity", None, delta)
+                    return self._outcome("ok", hw_id, doc)
+        except PyMongoError as e:
+            print("[HardwareDB] set_capacity error:", e)
+            raise
+        return self._outcome("conflict", hw_id)
+
+    # ---------- Checkout / check-in ----------
+
+    def checkout(self, hw_id: str, project_id: str, qty: int) -> Dict[str, Any]:
+        """
+        Take `qty` units for a project. Returns {"status", "hw_id",
+        "hardware_set"} with status ok / insufficient / not_found.
+        """
+        qty = self._quantity(qty)
+        guard = {"hw_id": hw_id, "available": {"$gte": qty}}
+        try:
+            for _ in range(_RETRIES):
+                # Project already holds some: bump its entry in place
+                doc = self.sets.find_one_and_update(
+                    {**guard, "checkouts.project_id": project_id},
+                    {"$inc": {"available": -qty, "checkouts.$.qty": qty, "seq": 1},
+                     "$currentDate": {"updated_at": True}},
+                    projection=_PUBLIC,
+                    return_document=ReturnDocument.AFTER,
+                )
+                if doc is None:
+                    # First checkout for this project: add its entry
+                    doc = self.sets.find_one_and_update(
+                        {**guard, "checkouts.project_id": {"$ne": project_id}},
+                        {"$inc": {"available": -qty, "seq": 1},
+                         "$push": {"checkouts": {"project_id": project_id, "qty": qty}},
+                         "$currentDate": {"updated_at": True}},
+                        projection=_PUBLIC,
+                        return_document=ReturnDocument.AFTER,
+                    )
+                if doc is not None:
+                    self._record(doc, "checkout", project_id, qty)
+                    return self._outcome("ok", hw_id, doc)
+
+                current = self.sets.find_one({"hw_id": hw_id}, _PUBLIC)
+                if current is None:
+                    return self._outcome("not_found", hw_id)
+                if current["available"] < qty:
+                    return self._outcome("insufficient", hw_id, current)
+                # A concurrent check-in removed (or checkout added) the entry; retry
+        except PyMongoError as e:
+            print("[HardwareDB] checkout error:", e)
+            raise
+        return self._outcome("conflict", hw_id)
+
+    def checkin(self, hw_id: str, project_id: str, qty: int) -> Dict[str, Any]:
+        """
+        Return `qty` units a project holds. Status ok / not_checked_out
+        (the project holds fewer than qty) / not_found.
+        """
+        qty = self._quantity(qty)
+        try:
+            doc = self.sets.find_one_and_update(
+                {"hw_id": hw_id, "checkouts": {"$elemMatch": {"project_id": project_id, "qty": {"$gte": qty}}}},
+                {"$inc": {"available": qty, "checkouts.$.qty": -qty, "seq": 1},
+                 "$currentDate": {"updated_at": True}},
+                projection=_PUBLIC,
+                return_document=ReturnDocument.AFTER,
+            )
+            if doc is None:
+                return self._outcome("not_checked_out", hw_id)
+            self._record(doc, "checkin", project_id, qty)
+            if self._held(doc, project_id) == 0:
+                # Drop the empty entry unless a checkout refilled it meanwhile
+                self.sets.update_one(
+                    {"hw_id": hw_id}, {"$pull": {"checkouts": {"project_id": project_id, "qty": 0}}}
+                )
+                doc["checkouts"] = [c for c in doc["checkouts"] if c["project_id"] != project_id]
+            return self._outcome("ok", hw_id, doc)
+        except PyMongoError as e:
+            print("[HardwareDB] checkin error:", e)
+            raise
+
+    def project_checkouts(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        [{"hw_id", "qty"}] for every hardware set the project holds units of.
+        """
+        try:
+            cursor = self.sets.find({"checkouts.project_id": project_id}, {"hw_id": 1, "checkouts": 1, "_id": 0})
+            out = [{"hw_id": doc["hw_id"], "qty": self._held(doc, project_id)} for doc in cursor]
+        except PyMongoError as e:
+            print("[HardwareDB] project_checkouts error:", e)
+            raise
+        return [c for c in out if c["qty"] > 0]
+
+    # ---------- Ledger ----------
+
+    def ledger_entries(
+        self,
+        hw_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        after: Optional[int] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ledger entries, oldest first. With hw_id, ?after= is the last seq seen.
+        """
+        query: Dict[str, Any] = {}
+        if hw_id is not None:
+            query["hw_id"] = hw_id
+            if after is not None:
+                query["seq"] = {"$gt": after}
+        if project_id is not None:
+            query["project_id"] = project_id
+        sort = [("seq", ASCENDING)] if hw_id is not None else [("at", ASCENDING)]
+        try:
+            return list(self.ledger.find(query, {"_id": 0}).sort(sort).limit(limit))
+        except PyMongoError as e:
+            print("[HardwareDB] ledger error:", e)
+            raise
+
+    def audit(self, hw_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cross-check one hardware set: capacity - available must equal the
+        units held by projects and the ledger's net checkouts, and the
+        ledger must hold exactly one entry per seq.
+        """
+        try:
+            doc = self.sets.find_one({"hw_id": hw_id}, _PUBLIC)
+            if doc is None:
+                return None
+            totals = {
+                row["_id"]: row
+                for row in self.ledger.aggregate([
+                    {"$match": {"hw_id": hw_id}},
+                    {"$group": {"_id": "$action", "qty": {"$sum": "$qty"}, "entries": {"$sum": 1}}},
+                ])
+            }
+        except PyMongoError as e:
+            print("[HardwareDB] audit error:", e)
+            raise
+
+        def total(action: str, key: str = "qty") -> int:
+            return totals.get(action, {}).get(key, 0)
+
+        held = sum(c["qty"] for c in doc["checkouts"])
+        ledger_held = total("checkout") - total("checkin")
+        entries = sum(row["entries"] for row in totals.values())
+        return {
+            "hw_id": hw_id,
+            "capacity": doc["capacity"],
+            "available": doc["available"],
+            "held": held,
+            "ledger_held": ledger_held,
+            "ledger_entries": entries,
+            "seq": doc["seq"],
+            "consistent": (
+                0 <= doc["available"] <= doc["capacity"]
+                and doc["capacity"] - doc["available"] == held == ledger_held
+                and entries == doc["seq"]
+            ),
+        }
@@ -0,0 +1,72 @@
+# jsonprovider.py – orjson-backed Flask JSON provider
+
+from typing import Any
+
+from bson import ObjectId
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_COMPACT = {"separators": (",", ":")}
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, ObjectId):
+        return str(o)
+    # Flask's own rules: http_date for dates, str for Decimal/UUID, asdict, __html__
+    return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Drop-in for Flask's DefaultJSONProvider that encodes with orjson:
+    sorted keys, ASCII-only escaping, Flask's date format, and ObjectId as
+    its hex string. Payloads without floats come out byte-for-byte as the
+    stdlib would write them.
+
+    Floats parse back to the same value but are not always spelled the
+    same: orjson writes 1.5e-7 and 0.00001 where the stdlib writes 1.5e-07
+    and 1e-05. NaN and +/-Infinity become null rather than the stdlib's
+    NaN / Infinity tokens, which are not valid JSON.
+
+    Anything else orjson would write differently (non-ASCII or DEL
+    characters under ensure_ascii, non-string keys, ints beyond 64 bits,
+    indented output) is handed to the stdlib encoder instead.
+    """
+
+    def _orjson_dumps(self, obj: Any) -> Any:
+        """
+        Compact orjson bytes, or None when the stdlib encoder must be used.
+        """
+        if orjson is None:
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            out = orjson.dumps(obj, default=_default, option=option)
+        except TypeError:
+            return None
+        if self.ensure_ascii and (not out.isascii() or b"\x7f" in out):
+            return None
+        return out
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs == _COMPACT:
+            out = self._orjson_dumps(obj)
+            if out is not None:
+                return out.decode()
+        kwargs.setdefault("default", _default)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        out = self._orjson_dumps(self._prepare_response_obj(args, kwargs))
+        if out is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(out + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,282 @@
+# leaderboard.py – precomputed top-K brand spend leaderboards
+
+import csv
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SPEND_CSV = "stg_daily_spend_top10.csv"
+BRAND_CSV = "stg_brand_detail.csv"
+SPEND_COLUMNS = (
+    "BRAND_ID", "BRAND_NAME", "SPEND_AMOUNT", "STATE_ABBR", "TRANS_COUNT",
+    "TRANS_DATE", "VERSION", "load_batch_id", "ingested_at_utc",
+)
+
+# Wildcard for "every state" / "every subindustry"
+ALL = "*"
+# Period of a scope: every date, a year ("2018") or a month ("2018-01")
+ALL_TIME = "all"
+
+Scope = Tuple[str, str, str]  # (state, subindustry, period)
+FactKey = Tuple[str, str, str]  # (BRAND_ID, STATE_ABBR, TRANS_DATE)
+
+
+def _periods(trans_date: str) -> Tuple[str, ...]:
+    if len(trans_date) >= 7:
+        return (ALL_TIME, trans_date[:4], trans_date[:7])
+    return (ALL_TIME,)
+
+
+class _Board:
+    """
+    Running totals for one scope plus its top-K brand ids, best first.
+    """
+
+    __slots__ = ("totals", "counts", "top", "snapshot")
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, float] = {}
+        self.top: List[str] = []
+        self.snapshot: Optional[List[Dict[str, Any]]] = None
+
+    def add(self, brand_id: str, spend: float, trans_count: float, k: int) -> None:
+        total = self.totals.get(brand_id, 0.0) + spend
+        self.totals[brand_id] = total
+        self.counts[brand_id] = self.counts.get(brand_id, 0.0) + trans_count
+
+        top, totals = self.top, self.totals
+        if spend < 0:
+            # A brand can only fall behind brands outside the list; rebuild
+            if brand_id in top or len(top) < k:
+                self.top = heapq.nlargest(k, totals, key=totals.__getitem__)
+                self.snapshot = None
+            return
+
+        if brand_id in top:
+            top.remove(brand_id)
+        elif len(top) >= k:
+            if total <= totals[top[-1]]:
+                return
+            top.pop()
+        # K is small: a linear insert beats keeping a heap in rank order
+        i = 0
+        while i < len(top) and totals[top[i]] >= total:
+            i += 1
+        top.insert(i, brand_id)
+        self.snapshot = None
+
+
+class Leaderboard:
+    """
+    Top-K brands by total SPEND_AMOUNT for every (state, subindustry, period)
+    combination, ALL standing in for "any". Each spend row updates the 12
+    scopes it belongs to in O(K), so reads are a dict lookup plus an O(K)
+    snapshot that is cached until the scope changes.
+
+    refresh() picks up rows appended to the spend CSV since the last read and
+    rebuilds from scratch only when a file was replaced or truncated.
+
+    Each (brand, state, day) counts once: a row with a higher VERSION (then
+    a later ingested_at_utc) replaces the one applied before it, the same
+    precedence spend_rollups uses; older or repeated rows are ignored.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None, k: int = 10, refresh_interval: float = 30.0):
+        self.data_dir = data_dir
+        self.k = k
+        self.refresh_interval = refresh_interval
+        self.brands: Dict[str, Dict[str, str]] = {}
+        self._brand_states: Dict[str, set] = {}
+        self._boards: Dict[Scope, _Board] = {}
+        # Winning row per fact: (VERSION, ingested_at_utc, spend, trans_count)
+        self._facts: Dict[FactKey, Tuple[str, str, float, float]] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._spend_offset = 0
+        self._file_stamps: Dict[str, Tuple[float, int]] = {}
+        self._checked_at = 0.0
+        self._spend_fields: List[str] = list(SPEND_COLUMNS)
+        self.rows = 0
+
+    # ---------- Loading ----------
+
+    def add_brands(self, rows: Iterable[Dict[str, str]]) -> None:
+        with self._lock:
+            for row in rows:
+                brand_id = (row.get("BRAND_ID") or "").strip()
+                if brand_id:
+                    self.brands[brand_id] = {
+                        "brand_name": row.get("BRAND_NAME") or "",
+                        "sector": row.get("INDUSTRY_NAME") or "",
+                        "category": row.get("SUBINDUSTRY_NAME") or "",
+                    }
+            # Names may have changed; scopes are regrouped by refresh() -> load()
+            for board in self._boards.values():
+                board.snapshot = None
+
+    def add_rows(self, rows: Iterable[Dict[str, str]]) -> int:
+        """
+        Fold daily spend rows into every scope they belong to; a restated
+        row applies only its difference from the row it supersedes.
+        Malformed and superseded rows are skipped. Returns the number of
+        rows applied.
+        """
+        applied = 0
+        k = self.k
+        with self._lock:
+            boards = self._boards
+            for row in rows:
+                brand_id = (row.get("BRAND_ID") or "").strip()
+                try:
+                    spend = float(row.get("SPEND_AMOUNT") or 0)
+                    trans_count = float(row.get("TRANS_COUNT") or 0)
+                except ValueError:
+                    continue
+                if not brand_id:
+                    continue
+
+                if brand_id not in self.brands:
+                    self.brands[brand_id] = {"brand_name": row.get("BRAND_NAME") or "", "sector": "", "category": ""}
+                state = (row.get("STATE_ABBR") or "").strip()
+                trans_date = (row.get("TRANS_DATE") or "").strip()
+                key = (brand_id, state, trans_date[:10])
+                version = ((row.get("VERSION") or "").strip(), (row.get("ingested_at_utc") or "").strip())
+                held = self._facts.get(key)
+                if held is not None and version <= held[:2]:
+                    continue
+                self._facts[key] = version + (spend, trans_count)
+                if held is not None:
+                    spend -= held[2]
+                    trans_count -= held[3]
+                self._brand_states.setdefault(brand_id, set()).add(state)
+                subindustry = self.brands[brand_id]["category"]
+
+                for period in _periods(trans_date):
+                    for st in (state, ALL):
+                        for sub in (subindustry, ALL):
+                            board = boards.get((st, sub, period))
+                            if board is None:
+                                board = boards[(st, sub, period)] = _Board()
+                            board.add(brand_id, spend, trans_count, k)
+                applied += 1
+            self.rows += applied
+        return applied
+
+    def load(self) -> None:
+        """
+        Rebuild everything from the CSV extracts in data_dir. The new state is
+        built off to the side and swapped in, so readers never see it half done.
+        """
+        fresh = Leaderboard(self.data_dir, k=self.k)
+        brand_path = os.path.join(self.data_dir, BRAND_CSV)
+        if os.path.exists(brand_path):
+            with open(brand_path, newline="", encoding="utf-8") as f:
+                fresh.add_brands(csv.DictReader(f))
+            fresh._file_stamps[brand_path] = self._stamp(brand_path)
+        fresh._read_spend_tail()
+        with self._lock:
+            for name in ("brands", "_brand_states", "_boards", "_facts", "_spend_offset", "_file_stamps",
+                         "_spend_fields", "rows"):
+                setattr(self, name, getattr(fresh, name))
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Apply rows appended since the last call; at most once per
+        refresh_interval unless forced.
+        """
+        if self.data_dir is None:
+            return
+        now = time.monotonic()
+        if not force and self._checked_at and now - self._checked_at < self.refresh_interval:
+            return
+        # One refresher at a time; other requests keep serving the current
+        # boards, except before the first load when there is nothing to serve
+        if not self._refresh_lock.acquire(blocking=force or not self._checked_at):
+            return
+        try:
+            self._checked_at = now
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self) -> None:
+        brand_path = os.path.join(self.data_dir, BRAND_CSV)
+        spend_path = os.path.join(self.data_dir, SPEND_CSV)
+        brand_changed = os.path.exists(brand_path) and self._file_stamps.get(brand_path) != self._stamp(brand_path)
+        spend_size = os.path.getsize(spend_path) if os.path.exists(spend_path) else 0
+        if not self._file_stamps or brand_changed or spend_size < self._spend_offset:
+            self.load()
+        elif spend_size > self._spend_offset:
+            self._read_spend_tail()
+
+    @staticmethod
+    def _stamp(path: str) -> Tuple[float, int]:
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+
+    def _read_spend_tail(self) -> None:
+        path = os.path.join(self.data_dir, SPEND_CSV)
+        if not os.path.exists(path):
+            return
+        consumed = 0
+
+        def complete_lines(f):
+            nonlocal consumed
+            for raw in f:
+                # A half-written last line is picked up on the next refresh
+                if not raw.endswith(b"\n"):
+                    break
+                consumed += len(raw)
+                yield raw.decode("utf-8")
+
+        with open(path, "rb") as f:
+            f.seek(self._spend_offset)
+            fieldnames = None if self._spend_offset == 0 else self._spend_fields
+            reader = csv.DictReader(complete_lines(f), fieldnames=fieldnames)
+            self.add_rows(reader)
+            if self._spend_offset == 0 and reader.fieldnames:
+                self._spend_fields = list(reader.fieldnames)
+        self._spend_offset += consumed
+        self._file_stamps[path] = self._stamp(path)
+
+    # ---------- Reads ----------
+
+    def top(
+        self,
+        state: Optional[str] = None,
+        subindustry: Optional[str] = None,
+        period: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top brands for one scope, best first. Unknown scopes return [].
+        """
+        scope = (state or ALL, subindustry or ALL, period or ALL_TIME)
+        board = self._boards.get(scope)
+        if board is None:
+            return []
+        snapshot = board.snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = board.snapshot = [self._entry(board, bid, scope[0]) for bid in board.top]
+        return snapshot if limit is None else snapshot[:limit]
+
+    def _entry(self, board: _Board, brand_id: str, state: str) -> Dict[str, Any]:
+        brand = self.brands.get(brand_id, {})
+        if state == ALL:
+            state = ",".join(sorted(s for s in self._brand_states.get(brand_id, ()) if s))
+        return {
+            "brand_id": brand_id,
+            "brand_name": brand.get("brand_name", ""),
+            "sector": brand.get("sector", ""),
+            "category": brand.get("category", ""),
+            "state": state,
+            "spend_amount": round(board.totals[brand_id], 2),
+            "trans_count": round(board.counts[brand_id], 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "brands": len(self.brands), "scopes": len(self._boards), "k": self.k}
@@ -0,0 +1,183 @@
+# metrics.py – Prometheus metrics for HTTP routes and Mongo commands
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+slow_query_log = logging.getLogger("projects.slow_query")
+
+# Commands whose first value is the target collection name
+_COLLECTION_COMMANDS = {
+    "find", "insert", "update", "delete", "findAndModify", "aggregate",
+    "count", "distinct", "createIndexes", "listIndexes",
+}
+
+# Where each command keeps its filter; only its shape is logged
+_FILTER_FIELDS = {"find": "filter", "findAndModify": "query", "count": "query", "distinct": "query"}
+_STATEMENT_FIELDS = {"update": ("updates", "q"), "delete": ("deletes", "q")}
+
+# Short buckets: most project calls are single-digit milliseconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_LATENCY = Histogram(
+    "projects_http_request_duration_seconds",
+    "Time spent handling a request, by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "projects_http_requests_total",
+    "Requests handled, by route template and status code",
+    ["method", "route", "status"],
+)
+MONGO_LATENCY = Histogram(
+    "projects_mongo_command_duration_seconds",
+    "Round-trip time of Mongo commands, by command and collection",
+    ["command", "collection"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_FAILURES = Counter(
+    "projects_mongo_command_failures_total",
+    "Mongo commands that returned an error",
+    ["command", "collection"],
+)
+MONGO_SLOW = Counter(
+    "projects_mongo_slow_commands_total",
+    "Mongo commands slower than SLOW_QUERY_MS",
+    ["command", "collection"],
+)
+POOL_CHECKED_OUT = Gauge(
+    "projects_mongo_pool_checked_out", "Connections currently checked out", multiprocess_mode="livesum"
+)
+POOL_OPEN = Gauge(
+    "projects_mongo_pool_open", "Open pool connections", multiprocess_mode="livesum"
+)
+CACHE_SIZE = Gauge(
+    "projects_cache_entries", "Entries in the project cache", multiprocess_mode="livesum"
+)
+
+
+def _redact(value: Any) -> Any:
+    """
+    Keys and operators of a filter with every value replaced by "?".
+    """
+    if isinstance(value, dict):
+        return {k: _redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(v) for v in value[:3]] + (["..."] if len(value) > 3 else [])
+    return "?"
+
+
+def filter_shape(name: str, command: Any) -> Any:
+    """
+    What a slow command was asked to match, without the values: the
+    redacted filter, or the stage names of an aggregate pipeline.
+    """
+    if not isinstance(command, dict):
+        return None
+    if name == "aggregate":
+        return [next(iter(stage), "?") for stage in command.get("pipeline", []) if isinstance(stage, dict)]
+    if name in _FILTER_FIELDS:
+        return _redact(command.get(_FILTER_FIELDS[name], {}))
+    if name in _STATEMENT_FIELDS:
+        field, key = _STATEMENT_FIELDS[name]
+        statements = command.get(field) or []
+        return _redact(statements[0].get(key, {})) if statements else None
+    return None
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Records every Mongo command in MONGO_LATENCY and logs commands slower
+    than `slow_ms` to the projects.slow_query logger. The log line has the
+    command, collection, duration and filter_shape(); never the values.
+    """
+
+    def __init__(self, slow_ms: float = 100.0):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        # (connection_id, request_id) -> (collection, command document)
+        self._inflight: Dict[Tuple[Any, int], Tuple[str, Any]] = {}
+
+    def started(self, event):
+        name = event.command_name
+        collection = event.command.get(name) if name in _COLLECTION_COMMANDS else None
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        with self._lock:
+            collection, command = self._inflight.pop((event.connection_id, event.request_id), ("-", None))
+        seconds = event.duration_micros / 1_000_000
+        name = event.command_name
+        MONGO_LATENCY.labels(name, collection).observe(seconds)
+        if failed:
+            MONGO_FAILURES.labels(name, collection).inc()
+        if seconds * 1000 >= self.slow_ms:
+            MONGO_SLOW.labels(name, collection).inc()
+            slow_query_log.warning(
+                "slow mongo %s on %s: %.1f ms%s filter=%s",
+                name, collection, seconds * 1000, " (failed)" if failed else "", filter_shape(name, command),
+            )
+
+
+def _registry() -> CollectorRegistry:
+    # Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, merge all workers
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    from prometheus_client import REGISTRY
+
+    return REGISTRY
+
+
+def init_metrics(app: Flask, pool_monitor: Optional[Any] = None, cache: Optional[Any] = None) -> None:
+    """
+    Time every request and expose /metrics in Prometheus text format.
+    """
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop("_metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+            HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, route, str(response.status_code)).inc()
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if pool_monitor is not None:
+            stats = pool_monitor.stats()
+            POOL_CHECKED_OUT.set(stats["checked_out"])
+            POOL_OPEN.set(stats["open_connections"])
+        if cache is not None:
+            CACHE_SIZE.set(cache.stats()["size"])
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,56 @@
+# migrate.py – one-time schema setup (indexes) for the projects service
+
+"""
+Creates every index the service relies on. This used to happen in the
+ProjectDB / HardwareDB constructors, i.e. on every worker start; it now
+runs once per deploy, before the new workers come up:
+
+    python migrate.py                 # Procfile release phase, compose, CI
+    flask --app app init-indexes      # same thing through the Flask CLI
+
+create_index is a no-op for indexes that already exist, so re-running is
+safe. Exits non-zero if any index could not be created.
+"""
+
+import sys
+from typing import Any, Dict, List
+
+from pymongo.errors import PyMongoError
+
+from config import Config
+from hardwaredb import HardwareDB
+from projectdb import ProjectDB
+
+
+def ensure_indexes(project_db: Any, config: Any = Config) -> Dict[str, List[str]]:
+    """
+    Create the indexes for projects, hardware sets and (with
+    ROLLUP_STORE=mongo) spend rollups; returns index names per area.
+    """
+    created = {
+        "projects": project_db.ensure_indexes(),
+        "hardware": HardwareDB(db_factory=lambda: project_db.db).ensure_indexes(),
+    }
+    if config.ROLLUP_STORE == "mongo":
+        from spend_rollups import RollupMongoStore
+
+        created["spend_rollups"] = RollupMongoStore(db_factory=lambda: project_db.db).ensure_indexes()
+    return created
+
+
+def main(argv=None) -> int:
+    project_db = ProjectDB.from_config(Config)
+    try:
+        created = ensure_indexes(project_db)
+    except PyMongoError as e:
+        print("❌ Error creating indexes:", e)
+        return 1
+    finally:
+        project_db.client.close()
+    for area, names in created.items():
+        print(f"✅ {Config.MONGO_DB} {area}: {', '.join(names)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
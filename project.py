@@ -1,10 +1,78 @@
 # project.py – Project model helper
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
 
 
-@dataclass
+class ProjectValidationError(ValueError):
+    """
+    Raised by Project.from_request / Project.clean_update.
+    `errors` maps each offending field to a short message.
+    """
+
+    def __init__(self, errors: Dict[str, str]):
+        self.errors = errors
+        missing = [f for f, msg in errors.items() if msg == "required"]
+        if missing and len(missing) == len(errors):
+            message = "Missing required fields"
+        else:
+            message = "Invalid fields: " + ", ".join(f"{f} ({msg})" for f, msg in errors.items())
+        super().__init__(message)
+
+
+def _clean_str(value: Any) -> Optional[str]:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    return None
+
+
+def _clean_list(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    if isinstance(value, (list, tuple)):
+        out = []
+        for v in value:
+            if not isinstance(v, str):
+                return None
+            v = v.strip()
+            if v:
+                out.append(v)
+        return out
+    return None
+
+
+def _clean_count(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return None
+
+
+# field -> (cleaner, error message); checked in this order in one pass
+_CLEANERS = (
+    ("project_id", _clean_str, "must be a string"),
+    ("project_name", _clean_str, "must be a string"),
+    ("project_desc", _clean_str, "must be a string"),
+    ("members_list", _clean_list, "must be a list of strings"),
+    ("hardware_set_id", _clean_list, "must be a list of strings"),
+    ("num_of_hardware_sets", _clean_count, "must be a non-negative integer"),
+)
+
+# Request key -> array field for add/remove changes (Project.clean_changes)
+ARRAY_CHANGES = (
+    ("members", "members_list"),
+    ("hardware_sets", "hardware_set_id"),
+)
+
+
+@dataclass(slots=True)
 class Project:
     project_id: str
     project_name: str
@@ -51,3 +119,98 @@ class Project:
             num_of_hardware_sets=num_of_hardware_sets,
             hardware_set_id=list(hw),
         )
+
+    # ---------- Validation (request path) ----------
+
+    @staticmethod
+    def clean_update(data: Any, require: Iterable[str] = ("project_id",)) -> Dict[str, Any]:
+        """
+        Validate and normalize only the model fields present in `data`, in a
+        single pass, collecting every error. Unknown keys are dropped.
+        num_of_hardware_sets follows hardware_set_id unless given explicitly.
+        Raises ProjectValidationError.
+        """
+        if not isinstance(data, dict):
+            raise ProjectValidationError({"project": "must be a JSON object"})
+
+        clean: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, cleaner, message in _CLEANERS:
+            if name not in data:
+                continue
+            value = cleaner(data[name])
+            if value is None:
+                errors[name] = message
+            else:
+                clean[name] = value
+
+        for name in require:
+            if not clean.get(name) and name not in errors:
+                errors[name] = "required"
+        if errors:
+            raise ProjectValidationError(errors)
+
+        if "hardware_set_id" in clean and "num_of_hardware_sets" not in clean:
+            clean["num_of_hardware_sets"] = len(clean["hardware_set_id"])
+        return clean
+
+    @classmethod
+    def from_request(cls, data: Any) -> "Project":
+        """
+        Strict constructor for POST bodies: project_id and project_name are
+        required, every other field is type-checked. Raises
+        ProjectValidationError listing all problems at once.
+        """
+        clean = cls.clean_update(data, require=("project_id", "project_name"))
+        hw = clean.get("hardware_set_id", [])
+        return cls(
+            clean["project_id"],
+            clean["project_name"],
+            clean.get("project_desc", ""),
+            clean.get("members_list", []),
+            clean.get("num_of_hardware_sets", len(hw)),
+            hw,
+        )
+
+    @staticmethod
+    def clean_changes(data: Any) -> Dict[str, Any]:
+        """
+        Validate an add/remove request such as
+        {"project_id": "p1", "members": {"add": [...], "remove": [...]},
+         "hardware_sets": {"add": [...]}}.
+        Returns {"project_id", <array field>: (add, remove), ...} for the
+        arrays that change. Raises ProjectValidationError.
+        """
+        if not isinstance(data, dict):
+            raise ProjectValidationError({"project": "must be a JSON object"})
+
+        errors: Dict[str, str] = {}
+        project_id = _clean_str(data.get("project_id"))
+        if project_id is None:
+            errors["project_id"] = "must be a string"
+        elif not project_id:
+            errors["project_id"] = "required"
+
+        clean: Dict[str, Any] = {"project_id": project_id}
+        for key, field_name in ARRAY_CHANGES:
+            change = data.get(key)
+            if change is None:
+                continue
+            if not isinstance(change, dict):
+                errors[key] = "must be an object with add / remove lists"
+                continue
+            add = _clean_list(change.get("add"))
+            remove = _clean_list(change.get("remove"))
+            if add is None or remove is None:
+                errors[key] = "add and remove must be lists of strings"
+            elif set(add) & set(remove):
+                errors[key] = "add and remove overlap"
+            elif add or remove:
+                # Duplicates in the request would otherwise be appended twice
+                clean[field_name] = (list(dict.fromkeys(add)), list(dict.fromkeys(remove)))
+
+        if not errors and len(clean) == 1:
+            errors["changes"] = "nothing to add or remove"
+        if errors:
+            raise ProjectValidationError(errors)
+        return clean
@@ -0,0 +1,188 @@
+# projectcache.py – in-process read-through cache for project lookups
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class ProjectCache:
+    """
+    Bounded LRU cache of normalized project documents keyed by project_id.
+    Entries expire after `ttl` seconds so writes made by other processes
+    are picked up even without change events (apply_change, registered as
+    a ChangeFeed listener).
+
+    Read-through callers take read_token() before querying and pass it to
+    put(since=...): the put is dropped if the key was written or
+    invalidated meanwhile, so a slow read cannot overwrite a newer doc.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # project_id -> (expires_at, doc)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Mongo _id (as str) -> project_id, so change events can be mapped back
+        self._by_oid: Dict[str, str] = {}
+        # project_id -> tick of its last write / invalidation, most recent last.
+        # Trimmed to a bound; a dropped tick raises _floor, which every
+        # untracked key is then assumed to have been touched at.
+        self._tick = 0
+        self._floor = 0
+        self._touched: "OrderedDict[str, int]" = OrderedDict()
+        self._touched_limit = max(1024, maxsize)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    # ---------- Lookups ----------
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, doc = entry
+            if expires_at <= self._clock():
+                self._drop(project_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(project_id)
+            self.hits += 1
+        return _copy(doc)
+
+    def read_token(self) -> int:
+        """
+        Stamp to pass as put(since=...) for a doc read after this call.
+        """
+        with self._lock:
+            return self._tick
+
+    def put(self, project_id: str, doc: Dict[str, Any], since: Optional[int] = None) -> None:
+        """
+        Cache doc. Writers omit `since` (they hold the doc just written); a
+        read-through put with a `since` older than the key's last write or
+        invalidation is skipped.
+        """
+        if self.maxsize <= 0 or not doc:
+            return
+        with self._lock:
+            if since is None:
+                self._touch(project_id)
+            elif self._touched.get(project_id, self._floor) > since:
+                self.stale_puts += 1
+                return
+            if project_id in self._entries:
+                # Two writers finishing out of order: keep the higher version
+                cached = self._entries[project_id][1]
+                if isinstance(cached.get("version"), int) and isinstance(doc.get("version"), int) \
+                        and cached["version"] > doc["version"]:
+                    self.stale_puts += 1
+                    return
+                self._drop(project_id)
+            self._entries[project_id] = (self._clock() + self.ttl, _copy(doc))
+            if doc.get("_id") is not None:
+                self._by_oid[str(doc["_id"])] = project_id
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    # ---------- Invalidation ----------
+
+    def invalidate(self, project_id: str) -> None:
+        with self._lock:
+            self._touch(project_id)
+            if project_id in self._entries:
+                self._drop(project_id)
+                self.invalidations += 1
+
+    def invalidate_oid(self, oid: Any) -> None:
+        with self._lock:
+            project_id = self._by_oid.get(str(oid))
+            if project_id is not None and project_id in self._entries:
+                self._touch(project_id)
+                self._drop(project_id)
+                self.invalidations += 1
+            elif project_id is None:
+                # Not cached: an in-flight read of it may be the one that changed
+                self._touch_all()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touch_all()
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_oid.clear()
+
+    def _touch(self, project_id: str) -> None:
+        # Caller holds the lock
+        self._tick += 1
+        self._touched[project_id] = self._tick
+        self._touched.move_to_end(project_id)
+        while len(self._touched) > self._touched_limit:
+            _, tick = self._touched.popitem(last=False)
+            self._floor = max(self._floor, tick)
+
+    def _touch_all(self) -> None:
+        # Caller holds the lock
+        self._tick += 1
+        self._floor = self._tick
+        self._touched.clear()
+
+    def _drop(self, project_id: str) -> None:
+        # Caller holds the lock
+        _, doc = self._entries.pop(project_id)
+        if doc.get("_id") is not None:
+            self._by_oid.pop(str(doc["_id"]), None)
+
+    # ---------- Cross-process eviction ----------
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        """
+        Evict whatever one change-stream event touched; app.py registers
+        it as a ChangeFeed listener, so the cache shares the feed's stream.
+        """
+        op = change.get("operationType")
+        if op in ("insert", "update", "replace", "delete"):
+            self.invalidate_oid(change["documentKey"]["_id"])
+        elif op in ("drop", "rename", "dropDatabase", "invalidate"):
+            self.clear()
+
+    # ---------- Stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "stale_puts": self.stale_puts,
+        }
+
+
+def _copy(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # members_list / hardware_set_id are lists; a plain dict() would share them
+    return {k: list(v) if isinstance(v, list) else v for k, v in doc.items()}
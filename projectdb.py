@@ -1,11 +1,47 @@
 # projectdb.py – Mongo wrapper for Projects
 
-from typing import Any, Dict, List, Optional
-from pymongo import MongoClient, ASCENDING
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 from pymongo.collection import Collection
-from pymongo.errors import PyMongoError
+from pymongo.errors import BulkWriteError, PyMongoError
 from bson.objectid import ObjectId
-from pymongo import ReturnDocument
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+
+from dbpool import PoolMonitor, client_options
+from project import Project, ProjectValidationError
+from projectcache import ProjectCache
+from writebehind import WriteBehindQueue
+
+# Operations per bulk_write round trip
+BULK_BATCH_SIZE = 1000
+
+DUPLICATE_KEY = 11000
+
+# Core fields every project read returns, with their defaults
+PROJECT_DEFAULTS = (
+    ("project_id", ""),
+    ("project_name", ""),
+    ("project_desc", ""),
+    ("members_list", []),
+    ("num_of_hardware_sets", 0),
+    ("hardware_set_id", []),
+)
+
+# Indexes behind search_projects. The array fields are multikey; project_id
+# is the second key so each filter can return results already in page order.
+SEARCH_INDEXES = (
+    ([("members_list", ASCENDING), ("project_id", ASCENDING)], "idx_members_list"),
+    ([("hardware_set_id", ASCENDING), ("project_id", ASCENDING)], "idx_hardware_set_id"),
+    ([("num_of_hardware_sets", ASCENDING), ("project_id", ASCENDING)], "idx_num_of_hardware_sets"),
+    ([("project_name", TEXT), ("project_desc", TEXT)], "idx_text_name_desc"),
+)
+
+# Relevance order for $text searches
+TEXT_SCORE = {"$meta": "textScore"}
 
 
 class ProjectDB:
@@ -19,20 +55,35 @@ class ProjectDB:
         username: Optional[str] = None,
         password: Optional[str] = None,
         auth_source: str = "admin",
+        client: Optional[MongoClient] = None,
+        cache: Optional[ProjectCache] = None,
+        client_factory: Optional[Callable[[], MongoClient]] = None,
+        shape_in_db: bool = True,
     ):
         """
         You can initialize either with:
           - uri + dbname (Atlas / connection string)
           - or host/port/db_name (+ optional username/password)
+          - or an existing client (shares its connection pool)
+          - or a client_factory, called once per process (fork safe)
+
+        Pass a ProjectCache to serve get_project from memory; writes made
+        through this instance keep it up to date. shape_in_db=False applies
+        read defaults in Python instead of an aggregation stage.
         """
         if dbname is None and db_name is not None:
             dbname = db_name
         if dbname is None:
             dbname = "projects_db"
 
-        if uri:
+        if client is not None:
+            # Caller owns the client (and its fork safety)
+            self._client_factory: Callable[[], MongoClient] = lambda: client
+        elif client_factory is not None:
+            self._client_factory = client_factory
+        elif uri:
             # Simple URI mode (Atlas etc.)
-            self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+            self._client_factory = lambda: MongoClient(uri, serverSelectionTimeoutMS=5000)
         else:
             # Host/port mode (Docker/local)
             conn_kwargs: Dict[str, Any] = {
@@ -48,18 +99,102 @@ class ProjectDB:
                         "authSource": auth_source,
                     }
                 )
-            self.client = MongoClient(**conn_kwargs)
+            self._client_factory = lambda: MongoClient(**conn_kwargs)
 
-        self.db = self.client[dbname]
-        self.collection: Collection = self.db["projects"]
+        self.dbname = dbname
+        self.cache = cache
+        self.shape_in_db = shape_in_db
+        self.write_behind: Optional[WriteBehindQueue] = None
+        self._pid: Optional[int] = None
+        # The client is created on first use: constructing one resolves SRV
+        # records, which would otherwise sit on every cold start
+        self._connect_lock = threading.Lock()
 
-        # Index for fast lookups and uniqueness
-        try:
-            self.collection.create_index(
-                [("project_id", ASCENDING)], unique=True, name="idx_project_id_unique"
-            )
-        except PyMongoError as e:
-            print("[ProjectDB] Warning: could not create index:", e)
+    @classmethod
+    def from_config(
+        cls,
+        config: Any,
+        cache: Optional[ProjectCache] = None,
+        monitor: Optional[PoolMonitor] = None,
+        listeners: Iterable[Any] = (),
+    ) -> "ProjectDB":
+        """
+        Build the app-wide ProjectDB from a Config class, with explicit pool
+        settings. Each process (gunicorn worker) gets its own client.
+        """
+        options = client_options(config)
+
+        def factory() -> MongoClient:
+            kwargs = dict(options)
+            event_listeners = list(listeners)
+            if monitor is not None:
+                monitor.reset()
+                event_listeners.append(monitor)
+            if event_listeners:
+                kwargs["event_listeners"] = event_listeners
+            if config.MONGO_URI:
+                return MongoClient(config.MONGO_URI, **kwargs)
+            return MongoClient(**kwargs)
+
+        return cls(dbname=config.MONGO_DB, cache=cache, client_factory=factory)
+
+    def enable_write_behind(
+        self, max_batch: int = 100, max_delay: float = 0.005, max_pending: int = 10000, timeout: float = 3.0
+    ) -> WriteBehindQueue:
+        """
+        Route create_project through a WriteBehindQueue: concurrent creates
+        share one insert_many and skip the find_one read-back.
+        """
+        self.write_behind = WriteBehindQueue(
+            lambda: self.collection, max_batch=max_batch, max_delay=max_delay, max_pending=max_pending, timeout=timeout
+        )
+        return self.write_behind
+
+    # ---------- Connection ----------
+
+    def _connect(self) -> None:
+        self._client = self._client_factory()
+        self._db = self._client[self.dbname]
+        self._collection: Collection = self._db["projects"]
+        self._pid = os.getpid()
+
+    def _check_pid(self) -> None:
+        # First use in this process; a client inherited through fork() must
+        # not be reused by the child
+        if self._pid != os.getpid():
+            with self._connect_lock:
+                if self._pid != os.getpid():
+                    self._connect()
+
+    @property
+    def client(self) -> MongoClient:
+        self._check_pid()
+        return self._client
+
+    @property
+    def db(self):
+        self._check_pid()
+        return self._db
+
+    @property
+    def collection(self) -> Collection:
+        self._check_pid()
+        return self._collection
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the projects indexes (no-op for ones that already exist).
+        Run once per deploy via migrate.py, not on every start.
+        """
+        names = [
+            # Fast lookups and uniqueness
+            self.collection.create_index([("project_id", ASCENDING)], unique=True, name="idx_project_id_unique"),
+            # Newest write first; backs the collection-level ETag
+            self.collection.create_index([("updated_at", DESCENDING)], name="idx_updated_at"),
+        ]
+        for keys, name in SEARCH_INDEXES:
+            names.append(self.collection.create_index(keys, name=name))
+        return names
 
     # ---------- Helpers ----------
 
@@ -75,15 +210,130 @@ class ProjectDB:
             out["_id"] = str(out["_id"])
 
         # Ensure these keys exist
-        out.setdefault("project_id", "")
-        out.setdefault("project_name", "")
-        out.setdefault("project_desc", "")
-        out.setdefault("members_list", [])
-        out.setdefault("num_of_hardware_sets", 0)
-        out.setdefault("hardware_set_id", [])
+        for key, default in PROJECT_DEFAULTS:
+            if key not in out:
+                out[key] = list(default) if isinstance(default, list) else default
+
+        return out
+
+    @staticmethod
+    def _shape_stage() -> Dict[str, Any]:
+        """
+        $addFields stage doing _normalize's work on the server: ObjectId _id
+        as a string and defaults for absent core fields. Fields that are
+        present (even when null) are left alone, exactly like _normalize.
+        """
+        shaped: Dict[str, Any] = {
+            "_id": {"$cond": [{"$eq": [{"$type": "$_id"}, "objectId"]}, {"$toString": "$_id"}, "$_id"]}
+        }
+        for key, default in PROJECT_DEFAULTS:
+            shaped[key] = {
+                "$cond": [{"$eq": [{"$type": f"${key}"}, "missing"]}, {"$literal": default}, f"${key}"]
+            }
+        return {"$addFields": shaped}
+
+    def _find_normalized(
+        self,
+        query: Dict[str, Any],
+        sort: Any = False,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Normalized documents matching query, optionally sorted (True means by
+        project_id, or pass a list of (key, direction) pairs).
+        Shaped by Mongo unless shape_in_db is off (for stand-ins without
+        $type support, e.g. mongomock).
+        """
+        if sort is True:
+            sort = [("project_id", ASCENDING)]
+        if not self.shape_in_db:
+            cursor = self.collection.find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            return (self._normalize(doc) for doc in cursor)
 
+        return self.collection.aggregate(self._shaped_pipeline(query, sort, limit))
+
+    @staticmethod
+    def _shaped_pipeline(query: Dict[str, Any], sort: Any, limit: Optional[int]) -> List[Dict[str, Any]]:
+        pipeline: List[Dict[str, Any]] = [{"$match": query}]
+        if sort:
+            pipeline.append({"$sort": dict(sort)})
+        if limit is not None:
+            pipeline.append({"$limit": limit})
+        pipeline.append(ProjectDB._shape_stage())
+        return pipeline
+
+    @staticmethod
+    def _as_stored(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A written document as find_one would return it: BSON keeps
+        datetimes to the millisecond and (tz_aware=False) hands them back
+        as naive UTC.
+        """
+        out = dict(doc)
+        for key, value in out.items():
+            if isinstance(value, datetime):
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc).replace(tzinfo=None)
+                out[key] = value.replace(microsecond=value.microsecond // 1000 * 1000)
         return out
 
+    @staticmethod
+    def _stamp_new(project: Dict[str, Any]) -> None:
+        """
+        Start a new document at version 1. version/updated_at drive ETags.
+        """
+        project["version"] = 1
+        project["updated_at"] = datetime.now(timezone.utc)
+
+    @staticmethod
+    def _versioned(update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add a version bump and a server-side updated_at to an update document.
+        $currentDate uses the mongod clock, so skew between app servers cannot
+        make a newer write look older than the list ETag.
+        """
+        set_fields = update.get("$set")
+        if set_fields:
+            set_fields.pop("version", None)
+            set_fields.pop("updated_at", None)
+            if not set_fields:
+                del update["$set"]
+        update.setdefault("$inc", {})["version"] = 1
+        update.setdefault("$currentDate", {})["updated_at"] = True
+        return update
+
+    @staticmethod
+    def project_etag(project: Dict[str, Any]) -> str:
+        """
+        Stable validator for one project: changes whenever its version does.
+        Documents written before versioning fall back to a content hash.
+        """
+        if project.get("version") is not None:
+            return f"{project.get('_id')}.{project['version']}"
+        digest = hashlib.sha1(repr(sorted(project.items())).encode()).hexdigest()
+        return digest[:20]
+
+    def list_etag(self) -> str:
+        """
+        Collection-level validator: document count plus the newest updated_at.
+        Inserts and updates move updated_at, deletes move the count. Two
+        cheap indexed reads instead of the full list.
+        """
+        try:
+            count = self.collection.estimated_document_count()
+            newest = self.collection.find_one(
+                {}, {"updated_at": 1, "_id": 0}, sort=[("updated_at", DESCENDING)]
+            )
+        except PyMongoError as e:
+            print("[ProjectDB] list_etag error:", e)
+            raise
+        stamp = newest.get("updated_at") if newest else None
+        return f"{count}-{stamp.timestamp() if isinstance(stamp, datetime) else 0}"
+
     # ---------- CRUD ----------
 
     def create_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
@@ -95,28 +345,94 @@ class ProjectDB:
             project.setdefault("members_list", [])
             project.setdefault("hardware_set_id", [])
             project.setdefault("num_of_hardware_sets", len(project["hardware_set_id"]))
+            self._stamp_new(project)
 
-            res = self.collection.insert_one(project)
-            inserted = self.collection.find_one({"_id": res.inserted_id})
-            return self._normalize(inserted)
+            if self.write_behind is not None:
+                # Batched with other callers' inserts; the document is its own read-back
+                project["_id"] = ObjectId()
+                inserted = self._normalize(self._as_stored(self.write_behind.insert(project)))
+            else:
+                res = self.collection.insert_one(project)
+                inserted = self._normalize(self.collection.find_one({"_id": res.inserted_id}))
+            if self.cache is not None and inserted:
+                self.cache.put(inserted["project_id"], inserted)
+            return inserted
         except PyMongoError as e:
             print("[ProjectDB] create_project error:", e)
             raise
 
-    def list_projects(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _projection(fields: Optional[Iterable[str]]) -> Optional[Dict[str, int]]:
+        """
+        Build a Mongo projection from a list of field names.
+        project_id is always kept because it is the pagination key.
+        """
+        if not fields:
+            return None
+        projection = {f: 1 for f in fields if f}
+        projection["project_id"] = 1
+        if "_id" not in projection:
+            projection["_id"] = 0
+        return projection
+
+    def iter_projects(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield projects ordered by project_id (keyset pagination on
+        idx_project_id_unique). Nothing is buffered beyond the cursor batch.
+        """
+        query: Dict[str, Any] = {}
+        if after is not None:
+            query["project_id"] = {"$gt": after}
+        projection = self._projection(fields)
         try:
-            cursor = self.collection.find({})
+            if projection is None:
+                yield from self._find_normalized(query, sort=True, limit=limit)
+                return
+            cursor = self.collection.find(query, projection).sort("project_id", ASCENDING)
             if limit is not None:
                 cursor = cursor.limit(limit)
-            return [self._normalize(doc) for doc in cursor]
+            for doc in cursor:
+                if isinstance(doc.get("_id"), ObjectId):
+                    doc["_id"] = str(doc["_id"])
+                yield doc
         except PyMongoError as e:
-            print("[ProjectDB] list_projects error:", e)
+            print("[ProjectDB] iter_projects error:", e)
             raise
 
+    def list_projects(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        if after is None and fields is None:
+            try:
+                # A page must be in project_id order: next_after keys off its last item
+                return list(self._find_normalized({}, sort=limit is not None, limit=limit))
+            except PyMongoError as e:
+                print("[ProjectDB] list_projects error:", e)
+                raise
+        return list(self.iter_projects(limit=limit, after=after, fields=fields))
+
     def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        if self.cache is not None:
+            cached = self.cache.get(project_id)
+            if cached is not None:
+                return cached
+            since = self.cache.read_token()
         try:
-            doc = self.collection.find_one({"project_id": project_id})
-            return self._normalize(doc) if doc else None
+            doc = next(self._find_normalized({"project_id": project_id}, limit=1), None)
+            if not doc:
+                return None
+            if self.cache is not None:
+                # Skipped if a write landed while we were reading
+                self.cache.put(project_id, doc, since=since)
+            return doc
         except PyMongoError as e:
             print("[ProjectDB] get_project error:", e)
             raise
@@ -131,10 +447,19 @@ class ProjectDB:
 
             updated = self.collection.find_one_and_update(
                 {"project_id": project_id},
-                {"$set": updates},
+                self._versioned({"$set": dict(updates)}),
                 return_document=ReturnDocument.AFTER,
             )
-            return self._normalize(updated) if updated else None
+            if not updated:
+                if self.cache is not None:
+                    self.cache.invalidate(project_id)
+                return None
+            updated = self._normalize(updated)
+            if self.cache is not None:
+                # project_id itself may have been renamed by the update
+                self.cache.invalidate(project_id)
+                self.cache.put(updated["project_id"], updated)
+            return updated
         except PyMongoError as e:
             print("[ProjectDB] update_project error:", e)
             raise
@@ -142,7 +467,410 @@ class ProjectDB:
     def delete_project(self, project_id: str) -> bool:
         try:
             res = self.collection.delete_one({"project_id": project_id})
+            if self.cache is not None:
+                self.cache.invalidate(project_id)
             return res.deleted_count > 0
         except PyMongoError as e:
             print("[ProjectDB] delete_project error:", e)
             raise
+
+    # ---------- Array changes ----------
+
+    @staticmethod
+    def _array_pipeline(changes: Dict[str, Tuple[List[str], List[str]]]) -> List[Dict[str, Any]]:
+        """
+        Update pipeline applying (add, remove) to each array field in one
+        atomic write. Removed values are filtered out, added ones appended
+        if absent (existing order is kept), num_of_hardware_sets is
+        recomputed with $size and the version is bumped. $addToSet/$pull
+        cannot both touch one array, nor derive a count, in a single update.
+        """
+        arrays: Dict[str, Any] = {}
+        for field, (add, remove) in changes.items():
+            value: Any = {"$ifNull": [f"${field}", []]}
+            if remove:
+                value = {"$filter": {
+                    "input": value,
+                    "cond": {"$not": {"$in": ["$$this", {"$literal": remove}]}},
+                }}
+            if add:
+                value = {"$let": {"vars": {"kept": value}, "in": {"$concatArrays": ["$$kept", {"$filter": {
+                    "input": {"$literal": add},
+                    "cond": {"$not": {"$in": ["$$this", "$$kept"]}},
+                }}]}}}
+            arrays[field] = value
+
+        stamp: Dict[str, Any] = {
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            # Server clock, like $currentDate in _versioned
+            "updated_at": "$$NOW",
+        }
+        if "hardware_set_id" in changes:
+            stamp["num_of_hardware_sets"] = {"$size": "$hardware_set_id"}
+        return [{"$set": arrays}, {"$set": stamp}]
+
+    def change_arrays(
+        self, project_id: str, changes: Dict[str, Tuple[List[str], List[str]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Add/remove members_list and hardware_set_id entries of one project
+        (changes as returned by Project.clean_changes). Returns the updated
+        project, or None if it does not exist.
+        """
+        try:
+            updated = self.collection.find_one_and_update(
+                {"project_id": project_id},
+                self._array_pipeline(changes),
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            print("[ProjectDB] change_arrays error:", e)
+            raise
+        if self.cache is not None:
+            self.cache.invalidate(project_id)
+        if not updated:
+            return None
+        updated = self._normalize(updated)
+        if self.cache is not None:
+            self.cache.put(project_id, updated)
+        return updated
+
+    def change_members(
+        self, project_id: str, add: Iterable[str] = (), remove: Iterable[str] = ()
+    ) -> Optional[Dict[str, Any]]:
+        return self.change_arrays(project_id, {"members_list": (list(add), list(remove))})
+
+    def change_hardware_sets(
+        self, project_id: str, add: Iterable[str] = (), remove: Iterable[str] = ()
+    ) -> Optional[Dict[str, Any]]:
+        return self.change_arrays(project_id, {"hardware_set_id": (list(add), list(remove))})
+
+    @classmethod
+    def _array_change_ops(
+        cls, batch: List[Dict[str, Any]], offset: int
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, List[Tuple[int, Any]]]]:
+        """
+        Validate a batch of add/remove requests. Returns (results, ops by
+        project_id); statuses are filled in once existence is known.
+        """
+        results: List[Dict[str, Any]] = []
+        ops: Dict[str, List[Tuple[int, Any]]] = {}
+        for i, item in enumerate(batch):
+            result: Dict[str, Any] = {
+                "index": offset + i,
+                "project_id": item.get("project_id") if isinstance(item, dict) else None,
+            }
+            results.append(result)
+            try:
+                clean = Project.clean_changes(item)
+            except ProjectValidationError as e:
+                result.update(status="invalid", message=str(e), errors=e.errors)
+                continue
+            project_id = result["project_id"] = clean.pop("project_id")
+            op = UpdateOne({"project_id": project_id}, cls._array_pipeline(clean))
+            ops.setdefault(project_id, []).append((i, op))
+        return results, ops
+
+    def bulk_change_arrays(
+        self, items: List[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply many add/remove requests (see Project.clean_changes) with
+        unordered bulk_write batches. Changes to the same project are applied
+        in input order. Returns one {"index", "project_id", "status"} per
+        item, with status updated / not_found / invalid / error.
+        """
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(items), batch_size):
+            batch_results, ops = self._array_change_ops(items[start:start + batch_size], start)
+            results.extend(batch_results)
+            if not ops:
+                continue
+            try:
+                existing = {
+                    doc["project_id"]
+                    for doc in self.collection.find(
+                        {"project_id": {"$in": list(ops)}}, {"project_id": 1, "_id": 0}
+                    )
+                }
+                for entries in self._array_rounds(batch_results, ops, existing):
+                    try:
+                        self.collection.bulk_write([op for _, op in entries], ordered=False)
+                    except BulkWriteError as e:
+                        self._array_round_errors(batch_results, entries, e.details.get("writeErrors", []))
+            except PyMongoError as e:
+                print("[ProjectDB] bulk_change_arrays error:", e)
+                raise
+            if self.cache is not None:
+                for project_id in existing:
+                    self.cache.invalidate(project_id)
+        return results
+
+    @staticmethod
+    def _array_rounds(
+        results: List[Dict[str, Any]],
+        ops: Dict[str, List[Tuple[int, Any]]],
+        existing: Iterable[str],
+    ) -> List[List[Tuple[int, Any]]]:
+        """
+        Mark each item updated / not_found and group the ops of existing
+        projects into bulk_write rounds: round n holds every project's n-th
+        change, so one project's changes never race each other.
+        """
+        existing = set(existing)
+        rounds: List[List[Tuple[int, Any]]] = []
+        for project_id, project_ops in ops.items():
+            found = project_id in existing
+            for n, entry in enumerate(project_ops):
+                results[entry[0]]["status"] = "updated" if found else "not_found"
+                if not found:
+                    continue
+                if n == len(rounds):
+                    rounds.append([])
+                rounds[n].append(entry)
+        return rounds
+
+    @staticmethod
+    def _array_round_errors(
+        results: List[Dict[str, Any]], entries: List[Tuple[int, Any]], write_errors: List[Dict[str, Any]]
+    ) -> None:
+        for err in write_errors:
+            results[entries[err["index"]][0]].update(status="error", message=err.get("errmsg", "write failed"))
+
+    # ---------- Search ----------
+
+    @staticmethod
+    def _search_query(
+        members: Iterable[str] = (),
+        hardware_sets: Iterable[str] = (),
+        min_hw: Optional[int] = None,
+        max_hw: Optional[int] = None,
+        q: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], List[Tuple[str, Any]]]:
+        """
+        Build (query, sort) for search_projects. Several members or hardware
+        sets must all be present. Text searches come back by relevance,
+        everything else by project_id so ?after= pages like GET /projects.
+        """
+        query: Dict[str, Any] = {}
+        for field, values in (("members_list", list(members)), ("hardware_set_id", list(hardware_sets))):
+            if len(values) == 1:
+                query[field] = values[0]
+            elif values:
+                query[field] = {"$all": values}
+        hw_range: Dict[str, int] = {}
+        if min_hw is not None:
+            hw_range["$gte"] = min_hw
+        if max_hw is not None:
+            hw_range["$lte"] = max_hw
+        if hw_range:
+            query["num_of_hardware_sets"] = hw_range
+        if q:
+            query["$text"] = {"$search": q}
+            return query, [("score", TEXT_SCORE), ("project_id", ASCENDING)]
+        if after is not None:
+            query["project_id"] = {"$gt": after}
+        return query, [("project_id", ASCENDING)]
+
+    def search_projects(self, limit: Optional[int] = None, **filters: Any) -> List[Dict[str, Any]]:
+        """
+        Projects matching every given filter (see _search_query), served
+        from SEARCH_INDEXES.
+        """
+        query, sort = self._search_query(**filters)
+        try:
+            return list(self._find_normalized(query, sort=sort, limit=limit))
+        except PyMongoError as e:
+            print("[ProjectDB] search_projects error:", e)
+            raise
+
+    def search_plan(self, limit: Optional[int] = None, **filters: Any) -> Dict[str, Any]:
+        """
+        explain() summary for a search: the winning plan's stages, the
+        indexes it reads and how many keys/documents it touched.
+        """
+        query, sort = self._search_query(**filters)
+        cursor = self.collection.find(query).sort(sort)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        try:
+            explained = cursor.explain()
+        except PyMongoError as e:
+            print("[ProjectDB] search_plan error:", e)
+            raise
+
+        winning = explained["queryPlanner"]["winningPlan"]
+        # Slot-based engine (MongoDB 7+) nests the classic tree one level down
+        winning = winning.get("queryPlan", winning)
+        stages: List[str] = []
+        indexes: List[str] = []
+        todo = [winning]
+        while todo:
+            node = todo.pop()
+            stages.append(node["stage"])
+            if node.get("indexName"):
+                indexes.append(node["indexName"])
+            if "inputStage" in node:
+                todo.append(node["inputStage"])
+            todo.extend(node.get("inputStages", []))
+
+        stats = explained.get("executionStats", {})
+        return {
+            "query": query,
+            "stages": stages,
+            "indexes": indexes,
+            "collscan": "COLLSCAN" in stages,
+            "returned": stats.get("nReturned"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined"),
+        }
+
+    # ---------- Bulk ----------
+
+    def bulk_upsert(
+        self,
+        projects: List[Dict[str, Any]],
+        insert_only: bool = False,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> List[Dict[str, Any]]:
+        """
+        Create or update many projects with unordered bulk_write batches.
+
+        insert_only=True issues plain inserts, so an existing project_id is
+        reported as a per-item "duplicate". Otherwise each item is upserted on
+        project_id. Returns one result per input item, in input order:
+        {"index", "project_id", "status", ["message"]} where status is one of
+        created / updated / duplicate / invalid / error.
+        """
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(projects), batch_size):
+            results.extend(self._bulk_upsert_batch(projects[start:start + batch_size], start, insert_only))
+        return results
+
+    def _bulk_upsert_batch(
+        self, batch: List[Dict[str, Any]], offset: int, insert_only: bool
+    ) -> List[Dict[str, Any]]:
+        results, ops, op_to_result = self._bulk_upsert_ops(batch, offset, insert_only)
+        if not ops:
+            return results
+
+        try:
+            res = self.collection.bulk_write(ops, ordered=False)
+            self._bulk_upsert_outcome(results, op_to_result, res.upserted_ids or {}, [])
+        except BulkWriteError as e:
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            self._bulk_upsert_outcome(results, op_to_result, upserted, e.details.get("writeErrors", []))
+        except PyMongoError as e:
+            print("[ProjectDB] bulk_upsert error:", e)
+            raise
+        return results
+
+    @classmethod
+    def _bulk_upsert_ops(
+        cls, batch: List[Dict[str, Any]], offset: int, insert_only: bool
+    ) -> Tuple[List[Dict[str, Any]], List[Any], List[int]]:
+        """
+        Validate a batch and build its write operations.
+        Returns (results, ops, op_to_result) where op_to_result maps each
+        bulk op index back to its position in results.
+        """
+        results: List[Dict[str, Any]] = []
+        ops: List[Any] = []
+        op_to_result: List[int] = []
+
+        for i, item in enumerate(batch):
+            project_id = item.get("project_id") if isinstance(item, dict) else None
+            result: Dict[str, Any] = {"index": offset + i, "project_id": project_id}
+            results.append(result)
+            try:
+                if insert_only:
+                    project = Project.from_request(item).to_dict()
+                else:
+                    project = Project.clean_update(item)
+            except ProjectValidationError as e:
+                result.update(status="invalid", message=str(e), errors=e.errors)
+                continue
+
+            result["project_id"] = project_id = project["project_id"]
+            if insert_only:
+                cls._stamp_new(project)
+                ops.append(InsertOne(project))
+                result["status"] = "created"
+            else:
+                ops.append(UpdateOne({"project_id": project_id}, cls._upsert_update(project), upsert=True))
+                result["status"] = "updated"
+            op_to_result.append(i)
+        return results, ops, op_to_result
+
+    def _bulk_upsert_outcome(
+        self,
+        results: List[Dict[str, Any]],
+        op_to_result: List[int],
+        upserted: Dict[int, Any],
+        write_errors: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Fold a bulk_write result (or BulkWriteError details) into per-item results.
+        """
+        for err in write_errors:
+            result = results[op_to_result[err["index"]]]
+            if err.get("code") == DUPLICATE_KEY:
+                result.update(status="duplicate", message="Project ID already exists")
+            else:
+                result.update(status="error", message=err.get("errmsg", "write failed"))
+
+        for op_index in upserted:
+            results[op_to_result[op_index]]["status"] = "created"
+
+        if self.cache is not None:
+            for result in results:
+                if result["status"] in ("created", "updated"):
+                    self.cache.invalidate(result["project_id"])
+
+    @staticmethod
+    def _upsert_update(project: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        $set the supplied fields; list defaults only apply to new documents so
+        an update never wipes arrays the caller did not send.
+        """
+        fields = {k: v for k, v in project.items() if k != "_id"}
+        if isinstance(fields.get("hardware_set_id"), list) and "num_of_hardware_sets" not in fields:
+            fields["num_of_hardware_sets"] = len(fields["hardware_set_id"])
+
+        on_insert = {}
+        for key, default in (("members_list", []), ("hardware_set_id", []), ("num_of_hardware_sets", 0)):
+            if key not in fields:
+                on_insert[key] = default
+
+        update: Dict[str, Any] = {"$set": fields}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        return ProjectDB._versioned(update)
+
+    def bulk_delete(self, project_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Delete many projects. Returns one {"index", "project_id", "status"}
+        per input id: deleted / not_found, or duplicate for a repeat of an
+        earlier id. Each status is that id's own delete_one count; a
+        bulk_write only reports a total, which cannot say which id another
+        request had already removed.
+        """
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for i, pid in enumerate(project_ids):
+            result: Dict[str, Any] = {"index": i, "project_id": pid}
+            if pid in seen:
+                result.update(status="duplicate", message="Repeated in this request")
+            else:
+                seen.add(pid)
+                try:
+                    deleted = self.collection.delete_one({"project_id": pid}).deleted_count
+                except PyMongoError as e:
+                    print("[ProjectDB] bulk_delete error:", e)
+                    raise
+                result["status"] = "deleted" if deleted else "not_found"
+                if self.cache is not None:
+                    self.cache.invalidate(pid)
+            results.append(result)
+        return results
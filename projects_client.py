@@ -1,18 +1,318 @@
+# projects_client.py – HTTP client for the projects service
+
+"""
+ProjectsClient keeps one requests.Session per instance, so calls reuse
+keep-alive connections from a bounded pool. Connection failures and
+429/502/503/504 responses are retried with exponential backoff plus jitter
+(Retry-After is honoured); POSTs are only retried when the request never
+reached the server, so a create is not sent twice.
+
+    with ProjectsClient("http://localhost:2000") as client:
+        for project in client.iter_projects(page_size=500):
+            ...
+        results = client.create_projects(many_projects)
+
+AsyncProjectsClient has the same API on httpx.AsyncClient (optional
+dependency). The module-level list_projects/create_project helpers still
+read PROJECTS_SERVICE_BASE from the Flask app config, now through one
+pooled client per process.
+"""
+
+import asyncio
+import random
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
 import requests
-from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # only AsyncProjectsClient needs it
+    httpx = None
+
+# Statuses worth another attempt: throttled or the upstream is restarting
+RETRY_STATUSES = (429, 502, 503, 504)
+# Safe to repeat after the server may have seen the request
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH"})
+
+# Server-side caps (requestargs.MAX_PAGE_SIZE / requestargs.MAX_BULK_ITEMS)
+MAX_PAGE_SIZE = 1000
+MAX_BULK_ITEMS = 10000
+
+
+def _bulk_batches(projects: List[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch_size = max(1, min(batch_size, MAX_BULK_ITEMS))
+    for start in range(0, len(projects), batch_size):
+        yield projects[start:start + batch_size]
+
+
+def _page_params(page_size: int, after: Optional[str], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"limit": max(1, min(page_size, MAX_PAGE_SIZE))}
+    if after is not None:
+        params["after"] = after
+    if fields:
+        params["fields"] = ",".join(fields)
+    return params
+
+
+class ProjectsClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        retries: int = 3,
+        backoff_factor: float = 0.2,
+        backoff_jitter: float = 0.2,
+        pool_maxsize: int = 10,
+        session: Optional[requests.Session] = None,
+    ):
+        """
+        pool_maxsize bounds the keep-alive connections kept for the service;
+        size it to the number of threads sharing this client.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            allowed_methods=IDEMPOTENT_METHODS,
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ProjectsClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+    # ---------- Reads ----------
+
+    def iter_projects(
+        self,
+        page_size: int = 500,
+        fields: Optional[Iterable[str]] = None,
+        after: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Every project in project_id order, fetched one page at a time as
+        the caller consumes them.
+        """
+        while True:
+            resp = self._request("GET", "/projects", params=_page_params(page_size, after, fields))
+            resp.raise_for_status()
+            body = resp.json()
+            yield from body.get("projects", [])
+            after = body.get("next_after")
+            if not after:
+                return
+
+    def list_projects(self, page_size: int = 500, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_projects(page_size=page_size, fields=fields))
+
+    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        resp = self._request("GET", f"/projects/{requests.utils.quote(project_id, safe='')}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return resp.json().get("project")
+
+    # ---------- Writes ----------
 
-def _base():
-    return current_app.config["PROJECTS_SERVICE_BASE"].rstrip("/")
+    def create_project(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Raises requests.HTTPError (409 for an existing project_id).
+        """
+        resp = self._request("POST", "/projects", json=payload)
+        resp.raise_for_status()
+        return resp.json().get("project")
+
+    def create_projects(
+        self,
+        projects: List[Dict[str, Any]],
+        batch_size: int = 1000,
+        mode: str = "insert",
+    ) -> List[Dict[str, Any]]:
+        """
+        Create (mode="insert") or upsert many projects through
+        POST /projects/bulk. Returns the per-item results in input order;
+        failed items carry their status instead of raising.
+        """
+        results: List[Dict[str, Any]] = []
+        for batch in _bulk_batches(projects, batch_size):
+            resp = self._request("POST", "/projects/bulk", json={"projects": batch, "mode": mode})
+            if resp.status_code not in (200, 207):
+                resp.raise_for_status()
+            offset = len(results)
+            for result in resp.json().get("results", []):
+                result["index"] += offset
+                results.append(result)
+        return results
+
+    def delete_projects(self, project_ids: List[str], batch_size: int = 1000) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for batch in _bulk_batches(project_ids, batch_size):
+            resp = self._request("POST", "/projects/bulk", json={"projects": [], "delete": batch})
+            resp.raise_for_status()
+            offset = len(results)
+            for result in resp.json().get("deleted", []):
+                result["index"] += offset
+                results.append(result)
+        return results
+
+
+class AsyncProjectsClient:
+    """
+    asyncio counterpart of ProjectsClient on one httpx.AsyncClient.
+    Retries use the same policy: connection errors and RETRY_STATUSES,
+    exponential backoff with jitter, POSTs only when nothing was sent.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        retries: int = 3,
+        backoff_factor: float = 0.2,
+        backoff_jitter: float = 0.2,
+        pool_maxsize: int = 10,
+    ):
+        if httpx is None:
+            raise RuntimeError("AsyncProjectsClient needs httpx (pip install httpx)")
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncProjectsClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_jitter)
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> "httpx.Response":
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                resp = await self.client.request(method, path, **kwargs)
+            except httpx.ConnectError:
+                if last:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except httpx.TransportError:
+                # The server may have acted on it; only repeat idempotent calls
+                if last or method not in IDEMPOTENT_METHODS:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if resp.status_code not in RETRY_STATUSES or method not in IDEMPOTENT_METHODS or last:
+                return resp
+            await asyncio.sleep(self._backoff(attempt, resp.headers.get("Retry-After")))
+        raise AssertionError("unreachable")
+
+    async def iter_projects(
+        self,
+        page_size: int = 500,
+        fields: Optional[Iterable[str]] = None,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            resp = await self._request("GET", "/projects", params=_page_params(page_size, after, fields))
+            resp.raise_for_status()
+            body = resp.json()
+            for project in body.get("projects", []):
+                yield project
+            after = body.get("next_after")
+            if not after:
+                return
+
+    async def list_projects(self, page_size: int = 500, fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        return [p async for p in self.iter_projects(page_size=page_size, fields=fields)]
+
+    async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        resp = await self._request("GET", f"/projects/{requests.utils.quote(project_id, safe='')}")
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return resp.json().get("project")
+
+    async def create_project(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        resp = await self._request("POST", "/projects", json=payload)
+        resp.raise_for_status()
+        return resp.json().get("project")
+
+    async def create_projects(
+        self,
+        projects: List[Dict[str, Any]],
+        batch_size: int = 1000,
+        mode: str = "insert",
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        for batch in _bulk_batches(projects, batch_size):
+            resp = await self._request("POST", "/projects/bulk", json={"projects": batch, "mode": mode})
+            if resp.status_code not in (200, 207):
+                resp.raise_for_status()
+            offset = len(results)
+            for result in resp.json().get("results", []):
+                result["index"] += offset
+                results.append(result)
+        return results
+
+
+# ---------- Flask helpers (PROJECTS_SERVICE_BASE / PROJECTS_SERVICE_TIMEOUT) ----------
+
+_clients: Dict[tuple, ProjectsClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _client() -> ProjectsClient:
+    from flask import current_app
+
+    key = (
+        current_app.config["PROJECTS_SERVICE_BASE"].rstrip("/"),
+        current_app.config.get("PROJECTS_SERVICE_TIMEOUT", 5),
+    )
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = ProjectsClient(key[0], timeout=key[1])
+        return client
 
-def _timeout():
-    return current_app.config.get("PROJECTS_SERVICE_TIMEOUT", 5)
 
 def list_projects():
-    resp = requests.get(f"{_base()}/projects", timeout=_timeout())
-    resp.raise_for_status()
-    return resp.json().get("projects", [])
+    return _client().list_projects()
+
 
 def create_project(payload: dict):
-    resp = requests.post(f"{_base()}/projects", json=payload, timeout=_timeout())
-    resp.raise_for_status()
-    return resp.json().get("project")
+    return _client().create_project(payload)
@@ -0,0 +1,99 @@
+# requestargs.py – query-string parsing and request limits shared by app.py and asgi_app.py
+
+import hashlib
+
+# Largest page a client may ask for with ?limit=
+MAX_PAGE_SIZE = 1000
+
+# Largest number of items accepted by one POST /projects/bulk
+MAX_BULK_ITEMS = 10000
+
+
+def list_args(args):
+    """
+    (?after=, ?limit=, ?fields=) from a query string.
+    Raises ValueError on a bad limit.
+    """
+    after = args.get("after") or None
+    limit = args.get("limit")
+    if limit is not None:
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        limit = int(limit)
+    fields = args.get("fields")
+    if fields:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    return after, limit, fields or None
+
+
+def search_filters(args):
+    """
+    ProjectDB.search_projects filters from a query string:
+    ?member= and ?hardware_set= (repeatable), ?min_hw=, ?max_hw=, ?q=, ?after=.
+    Raises ValueError on a bad range or an ?after= combined with ?q=.
+    """
+    filters = {
+        "members": [m for m in args.getlist("member") if m],
+        "hardware_sets": [h for h in args.getlist("hardware_set") if h],
+        "q": (args.get("q") or "").strip() or None,
+        "after": args.get("after") or None,
+    }
+    for key in ("min_hw", "max_hw"):
+        value = args.get(key)
+        if value is not None:
+            if not value.isdigit():
+                raise ValueError(f"{key} must be a non-negative integer")
+            value = int(value)
+        filters[key] = value
+    if filters["min_hw"] is not None and filters["max_hw"] is not None and filters["min_hw"] > filters["max_hw"]:
+        raise ValueError("min_hw must not be greater than max_hw")
+    if filters["q"] and filters["after"]:
+        # Text results are ranked by relevance, not project_id
+        raise ValueError("after cannot be combined with q")
+    return filters
+
+
+class TooManyItems(ValueError):
+    """
+    A bulk request over MAX_BULK_ITEMS (413 rather than 400).
+    """
+
+
+def bulk_request(data):
+    """
+    (projects, delete_ids, insert_only) from a POST /projects/bulk body:
+    {"projects": [...], "delete": [...], "mode": "insert" | "upsert"}.
+    Raises ValueError (TooManyItems past MAX_BULK_ITEMS).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    projects = data.get("projects", [])
+    delete_ids = data.get("delete", [])
+    mode = data.get("mode", "insert")
+    if not isinstance(projects, list) or not isinstance(delete_ids, list):
+        raise ValueError("projects and delete must be lists")
+    if mode not in ("insert", "upsert"):
+        raise ValueError("mode must be insert or upsert")
+    if len(projects) + len(delete_ids) > MAX_BULK_ITEMS:
+        raise TooManyItems(f"At most {MAX_BULK_ITEMS} items per request")
+    return projects, [str(pid) for pid in delete_ids], mode == "insert"
+
+
+def bulk_changes(data):
+    """
+    The change list of a PATCH /projects/bulk body: {"changes": [...]}.
+    Raises ValueError (TooManyItems past MAX_BULK_ITEMS).
+    """
+    changes = data.get("changes") if isinstance(data, dict) else None
+    if not isinstance(changes, list):
+        raise ValueError("Expected {\"changes\": [...]}")
+    if len(changes) > MAX_BULK_ITEMS:
+        raise TooManyItems(f"At most {MAX_BULK_ITEMS} items per request")
+    return changes
+
+
+def list_etag(collection_etag, query_string):
+    """
+    ETag of a list/search response: the collection's state plus the query.
+    """
+    return hashlib.sha1(f"{collection_etag}?{query_string.decode()}".encode()).hexdigest()
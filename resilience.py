@@ -0,0 +1,387 @@
+# resilience.py – deadlines, circuit breaker and stale reads around ProjectDB
+
+"""
+ResilientProjectDB wraps a ProjectDB so a slow or unreachable Mongo cannot
+tie up every worker:
+
+  deadlines   each call runs inside pymongo.timeout(), which bounds server
+              selection, connection checkout and the operation itself
+              (reads and writes have separate budgets)
+  breaker     a CircuitBreaker watches recent outcomes; once the failure
+              rate crosses the threshold, calls fail fast with
+              CircuitOpenError until a probe call succeeds
+  stale reads the last good result of each read (list, get, search, list
+              ETag) is kept in a small LRU. When the live call fails, that
+              copy is served (if younger than max_stale) and one background
+              refresh is started for it. A write through the wrapper drops
+              the copies it may have changed: get_project of the projects
+              it names, and every list / search / ETag copy
+
+served_stale holds the age of the stale copy served in the current context
+(None when the answer was live), so routes can label the response.
+
+HardwareDB is not wrapped: it reaches Mongo through project_db.db and runs
+under the client's own timeouts only. A checkout is two writes (the set,
+then its ledger entry), and a deadline firing between them would leave the
+ledger behind the counters.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pymongo
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+# Age in seconds of the stale answer served in this context, else None
+served_stale: contextvars.ContextVar = contextvars.ContextVar("served_stale", default=None)
+
+# Reads that may be answered from the last good copy
+STALE_READS = ("list_projects", "get_project", "search_projects", "list_etag")
+# Calls guarded by the write deadline (and the breaker) -> the argument
+# naming the project(s) they change
+GUARDED_WRITES = {
+    "create_project": "project",
+    "update_project": "project_id",
+    "delete_project": "project_id",
+    "bulk_upsert": "projects",
+    "bulk_delete": "project_ids",
+    "change_arrays": "project_id",
+    "change_members": "project_id",
+    "change_hardware_sets": "project_id",
+    "bulk_change_arrays": "items",
+}
+
+
+class CircuitOpenError(PyMongoError):
+    """
+    Raised instead of calling Mongo while the breaker is open.
+    """
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Mongo circuit open; retry in {retry_after:.1f}s")
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Errors that say Mongo is unreachable or too slow, as opposed to a bad
+    request (duplicate key, validation) that a healthy server rejected.
+    """
+    return isinstance(error, (ConnectionFailure, CircuitOpenError)) or bool(getattr(error, "timeout", False))
+
+
+def ping(client: Any, timeout: float) -> float:
+    """
+    Round trip of a ping command in milliseconds, bounded by `timeout`
+    seconds. Raises PyMongoError when Mongo does not answer in time.
+    """
+    started = time.perf_counter()
+    with pymongo.timeout(timeout):
+        client.admin.command("ping")
+    return (time.perf_counter() - started) * 1000
+
+
+class CircuitBreaker:
+    """
+    closed -> open when at least min_calls finished in the last `window`
+    seconds and failure_rate of them failed; open -> half_open after
+    reset_timeout; half_open lets one probe through, closing on success and
+    re-opening on failure.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        window: float = 10.0,
+        reset_timeout: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: "deque[Tuple[float, bool]]" = deque()
+        self._failures = 0
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and self._clock() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return self._state
+
+    def allow(self, probe: bool = True) -> None:
+        """
+        Raise CircuitOpenError unless a call may go through now. With
+        probe=False the caller never becomes the half-open probe (it would
+        not record() an outcome); it is only refused during the cool-down.
+        """
+        with self._lock:
+            if self._state == "closed":
+                return
+            wait = self.reset_timeout - (self._clock() - self._opened_at)
+            if wait <= 0 and not probe:
+                return
+            if wait <= 0 and not self._probing:
+                # First caller after the cool-down becomes the probe
+                self._state = "half_open"
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(max(wait, 0.0))
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            now = self._clock()
+            if self._state == "open":
+                # Calls that started before the trip
+                return
+            if self._state == "half_open":
+                self._probing = False
+                if ok:
+                    self._state = "closed"
+                    self._outcomes.clear()
+                    self._failures = 0
+                else:
+                    self._trip(now)
+                return
+
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                _, old_ok = self._outcomes.popleft()
+                self._failures -= not old_ok
+            calls = len(self._outcomes)
+            if self._state == "closed" and calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+                self._trip(now)
+
+    def release(self) -> None:
+        """
+        Give up the probe slot without an outcome (the call failed before
+        it could tell anything about Mongo); the next caller probes.
+        """
+        with self._lock:
+            if self._state == "half_open":
+                self._probing = False
+
+    def _trip(self, now: float) -> None:
+        self._state = "open"
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = self._failures
+        return {
+            "state": self.state,
+            "recent_calls": calls,
+            "recent_failures": failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _written_ids(name: str, args: tuple, kwargs: dict) -> set:
+    """
+    project_ids a guarded write may change: ids, project dicts or change
+    items, plus the new id of an update_project rename.
+    """
+    target = kwargs.get(GUARDED_WRITES[name], args[0] if args else None)
+    ids = set()
+    for item in target if isinstance(target, (list, tuple)) else [target]:
+        if isinstance(item, dict):
+            item = item.get("project_id")
+        if isinstance(item, str):
+            ids.add(item)
+    if name == "update_project":
+        updates = kwargs.get("updates", args[1] if len(args) > 1 else None)
+        if isinstance(updates, dict) and isinstance(updates.get("project_id"), str):
+            ids.add(updates["project_id"])
+    return ids
+
+
+class ResilientProjectDB:
+    """
+    Drop-in wrapper: guarded calls get deadlines, the breaker and (reads)
+    stale fallback; every other attribute is the wrapped ProjectDB's.
+    """
+
+    def __init__(
+        self,
+        project_db: Any,
+        breaker: Optional[CircuitBreaker] = None,
+        read_timeout: float = 1.0,
+        write_timeout: float = 3.0,
+        max_stale: float = 300.0,
+        stale_entries: int = 256,
+    ):
+        self.inner = project_db
+        self.breaker = breaker or CircuitBreaker()
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.max_stale = max_stale
+        self.stale_entries = stale_entries
+        self._lock = threading.Lock()
+        # call key -> (stored_at, result)
+        self._last_good: "OrderedDict[Tuple[Any, ...], Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        # Bumped by every write, so a read that overlapped one is not remembered
+        self._writes = 0
+
+        self.stale_served = 0
+        self.failed_fast = 0
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.inner, name)
+        if name in STALE_READS:
+            return lambda *args, **kwargs: self._read(name, attr, args, kwargs)
+        if name in GUARDED_WRITES:
+            return lambda *args, **kwargs: self._write(name, attr, args, kwargs)
+        if name == "iter_projects":
+            # Streams past any sensible deadline and records no outcome: only
+            # refuse to start during the cool-down, never take the probe slot
+            self.breaker.allow(probe=False)
+        return attr
+
+    # ---------- Guarded calls ----------
+
+    def _call(self, fn: Callable[..., Any], timeout: float, args: tuple, kwargs: dict) -> Any:
+        try:
+            self.breaker.allow()
+        except CircuitOpenError:
+            self.failed_fast += 1
+            raise
+        try:
+            with pymongo.timeout(timeout):
+                result = fn(*args, **kwargs)
+        except PyMongoError as e:
+            self.breaker.record(not is_outage(e))
+            raise
+        except BaseException:
+            # Not a Mongo outcome (bad input, bug): don't leave the probe pending
+            self.breaker.release()
+            raise
+        self.breaker.record(True)
+        return result
+
+    def _write(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        try:
+            return self._call(fn, self.write_timeout, args, kwargs)
+        finally:
+            # Also after a failure: a timed-out write may still have been applied
+            self._forget(_written_ids(name, args, kwargs))
+
+    def _read(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        served_stale.set(None)
+        key = (name, _freeze(args), _freeze(kwargs))
+        writes = self._writes
+        try:
+            result = self._call(fn, self.read_timeout, args, kwargs)
+        except PyMongoError as e:
+            if not is_outage(e):
+                raise
+            stale = self._stale(key)
+            if stale is None:
+                raise
+            age, result = stale
+            self.stale_served += 1
+            served_stale.set(age)
+            self._refresh_later(key, fn, args, kwargs)
+            return result
+        self._remember(key, result, writes)
+        return result
+
+    # ---------- Stale copies ----------
+
+    def _remember(self, key: Tuple[Any, ...], result: Any, writes: int) -> None:
+        """
+        Keep result as the last good copy, unless it is None (a missing
+        project is not worth serving during an outage) or a write happened
+        since the read started.
+        """
+        if result is None:
+            return
+        with self._lock:
+            if self._writes != writes:
+                return
+            self._last_good[key] = (time.monotonic(), result)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.stale_entries:
+                self._last_good.popitem(last=False)
+
+    def _forget(self, project_ids: set) -> None:
+        with self._lock:
+            self._writes += 1
+            for key in list(self._last_good):
+                name, args, kwargs = key
+                if name == "get_project":
+                    project_id = args[0] if args else dict(kwargs).get("project_id")
+                    if project_id not in project_ids:
+                        continue
+                del self._last_good[key]
+
+    def _stale(self, key: Tuple[Any, ...]) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._last_good.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        return (age, entry[1]) if age <= self.max_stale else None
+
+    def _refresh_later(self, key: Tuple[Any, ...], fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        """
+        One background refresh per key at a time; skipped while the breaker
+        would reject it anyway.
+        """
+        if self.breaker.state == "open":
+            return
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        writes = self._writes
+
+        def refresh() -> None:
+            try:
+                self._remember(key, self._call(fn, self.read_timeout, args, kwargs), writes)
+            except PyMongoError:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="stale-refresh", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._last_good)
+        return {
+            "breaker": self.breaker.stats(),
+            "stale_entries": entries,
+            "stale_served": self.stale_served,
+            "failed_fast": self.failed_fast,
+        }
@@ -0,0 +1,311 @@
+# spend_analytics.py – vectorized spend / TRANS_COUNT aggregates over the staged Arrow files
+
+import os
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from spend_ingest import BRAND_FILE, SPEND_DIR, WATERMARK_FILE
+
+# Query-string group names -> column in the working table
+GROUP_COLUMNS = {
+    "brand": "BRAND_ID",
+    "state": "STATE_ABBR",
+    "industry": "INDUSTRY_NAME",
+    "period": "PERIOD",
+}
+BUCKETS = ("day", "week", "month", "year")
+# One winning row per key: highest VERSION, then latest ingested_at_utc (as in spend_rollups)
+FACT_KEY = ("BRAND_ID", "STATE_ABBR", "TRANS_DATE")
+
+
+class SpendQueryError(ValueError):
+    pass
+
+
+def _is_iso_date(value: str) -> bool:
+    # Filters compare TRANS_DATE as text, so only the exact YYYY-MM-DD form works
+    try:
+        return date.fromisoformat(value).isoformat() == value
+    except ValueError:
+        return False
+
+
+def latest_versions(table: pa.Table) -> pa.Table:
+    """
+    Drop rows a restatement superseded, so a restated day counts once.
+    One sort plus a neighbour comparison per key column; when rows are
+    dropped the result is a heap copy and row order is not kept.
+    """
+    n = table.num_rows
+    if n < 2:
+        return table
+    keys = pa.table({
+        "BRAND_ID": pc.fill_null(table["BRAND_ID"], -1),
+        # Dictionary columns cannot be sorted; nulls compare as one value
+        "STATE_ABBR": pc.fill_null(pc.cast(table["STATE_ABBR"], pa.string()), ""),
+        "TRANS_DATE": pc.fill_null(table["TRANS_DATE"], ""),
+        "VERSION": table["VERSION"],
+        "ingested_at_utc": table["ingested_at_utc"],
+    })
+    order = pc.sort_indices(
+        keys,
+        sort_keys=[(k, "ascending") for k in FACT_KEY] + [("VERSION", "descending"), ("ingested_at_utc", "descending")],
+    )
+    keys = keys.take(order)
+    first = None
+    for name in FACT_KEY:
+        col = keys[name].combine_chunks()
+        changed = pc.not_equal(col.slice(1), col.slice(0, n - 1))
+        first = changed if first is None else pc.or_(first, changed)
+    if not pc.any(pc.invert(first)).as_py():
+        # Nothing superseded: keep the (memory-mapped) columns rather than copy them
+        return table
+    first = pa.concat_arrays([pa.array([True]), first])
+    return table.take(pc.filter(order, first))
+
+
+class _Snapshot:
+    """
+    One loaded generation of the store: the spend table, brand lookups and
+    lazily built period columns. `heap_bytes` is what the load allocated in
+    this worker, as opposed to the file pages shared through the mmap.
+    """
+
+    def __init__(self, table: pa.Table, brand_ids: pa.Array, brand_names: pa.Array, industries: pa.Array, stamp,
+                 heap_bytes: int = 0):
+        self.table = table
+        self.brand_ids = brand_ids
+        self.brand_names = brand_names
+        self.industries = industries
+        self.stamp = stamp
+        self.heap_bytes = heap_bytes
+        self.periods: Dict[str, pa.ChunkedArray] = {}
+
+
+class SpendAnalytics:
+    """
+    Group-by queries over the files spend_ingest writes. The dataset is
+    opened with mmap, dictionaries are unified once per load, and every
+    filter / bucket / aggregate is an Arrow compute kernel, so there are no
+    per-row Python loops. A new extract is picked up on the next query once
+    its watermark file changes.
+
+    Memory per worker: the fixed-width columns of the .arrow files stay
+    mapped (page cache, shared by workers) as long as no row was restated.
+    The partition TRANS_DATE column, the unified dictionary indices and
+    INDUSTRY_NAME are built on the heap of every worker, and a store with
+    restatements is copied whole by latest_versions' take. stats() reports
+    the heap side; Parquet parts are always decoded onto the heap.
+    """
+
+    def __init__(self, store_dir: str, max_rows: int = 1000):
+        self.store_dir = store_dir
+        self.max_rows = max_rows
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    # ---------- Loading ----------
+
+    def _stamp(self):
+        stamps = []
+        for name in (WATERMARK_FILE, f"{BRAND_FILE}.arrow", f"{BRAND_FILE}.parquet"):
+            path = os.path.join(self.store_dir, name)
+            stamps.append(os.stat(path).st_mtime_ns if os.path.exists(path) else None)
+        return tuple(stamps)
+
+    def snapshot(self) -> _Snapshot:
+        stamp = self._stamp()
+        snap = self._snapshot
+        if snap is not None and snap.stamp == stamp:
+            return snap
+        with self._lock:
+            if self._snapshot is None or self._snapshot.stamp != stamp:
+                try:
+                    self._snapshot = self._load(stamp)
+                except FileNotFoundError:
+                    # extract_runner swapped daily_spend while we listed it
+                    self._snapshot = self._load(self._stamp())
+            return self._snapshot
+
+    def _load(self, stamp) -> _Snapshot:
+        spend_dir = os.path.join(self.store_dir, SPEND_DIR)
+        if not os.path.isdir(spend_dir):
+            raise SpendQueryError(f"no spend extract under {self.store_dir}; run spend_ingest.py first")
+
+        files: Dict[str, List[str]] = {"arrow": [], "parquet": []}
+        for root, _, names in os.walk(spend_dir):
+            for name in names:
+                ext = name.rsplit(".", 1)[-1]
+                if ext in files:
+                    files[ext].append(os.path.join(root, name))
+        local = fs.LocalFileSystem(use_mmap=True)
+        partitioning = ds.partitioning(pa.schema([("TRANS_DATE", pa.string())]), flavor="hive")
+        parts = [
+            ds.dataset(paths, format="ipc" if ext == "arrow" else ext, partitioning=partitioning,
+                       partition_base_dir=spend_dir, filesystem=local)
+            for ext, paths in files.items() if paths
+        ]
+        if not parts:
+            raise SpendQueryError(f"no spend extract under {self.store_dir}; run spend_ingest.py first")
+        allocated = pa.total_allocated_bytes()
+        table = (ds.dataset(parts) if len(parts) > 1 else parts[0]).to_table()
+        # Each file carries its own BRAND_NAME / STATE_ABBR dictionary
+        table = latest_versions(table.unify_dictionaries())
+
+        brand_ids, brand_names, industries = self._load_brands(table)
+        industry_idx = pc.index_in(table["BRAND_ID"], value_set=brand_ids)
+        table = table.append_column("INDUSTRY_NAME", pc.take(industries, industry_idx))
+        return _Snapshot(table, brand_ids, brand_names, industries, stamp,
+                         heap_bytes=pa.total_allocated_bytes() - allocated)
+
+    def _load_brands(self, table: pa.Table):
+        """
+        (brand ids, names, industries) aligned arrays. Names come from the
+        brand detail file when present, else from the spend rows.
+        """
+        # Distinct (id, name) pairs; index_in picks the first name of a renamed brand
+        pairs = table.group_by(["BRAND_ID", "BRAND_NAME"], use_threads=False).aggregate([])
+        ids = pairs["BRAND_ID"].combine_chunks()
+        names = pc.cast(pairs["BRAND_NAME"], pa.string()).combine_chunks()
+        industries = pa.nulls(len(ids), pa.string())
+
+        detail = None
+        for ext, reader in (("arrow", "ipc"), ("parquet", "parquet")):
+            path = os.path.join(self.store_dir, f"{BRAND_FILE}.{ext}")
+            if os.path.exists(path):
+                detail = ds.dataset(path, format=reader).to_table(
+                    columns=["BRAND_ID", "BRAND_NAME", "INDUSTRY_NAME"]
+                )
+                break
+        if detail is not None:
+            detail_ids = pc.cast(detail["BRAND_ID"], pa.int64()).combine_chunks()
+            at = pc.index_in(ids, value_set=detail_ids)
+            names = pc.coalesce(pc.take(detail["BRAND_NAME"], at), names)
+            industries = pc.take(detail["INDUSTRY_NAME"], at)
+            if isinstance(names, pa.ChunkedArray):
+                names = names.combine_chunks()
+            if isinstance(industries, pa.ChunkedArray):
+                industries = industries.combine_chunks()
+        return ids, names, industries.dictionary_encode()
+
+    @staticmethod
+    def _period(snap: _Snapshot, bucket: str) -> pa.ChunkedArray:
+        col = snap.periods.get(bucket)
+        if col is None:
+            dates = snap.table["TRANS_DATE"]
+            if bucket == "day":
+                col = dates
+            elif bucket == "month":
+                col = pc.utf8_slice_codeunits(dates, 0, 7)
+            elif bucket == "year":
+                col = pc.utf8_slice_codeunits(dates, 0, 4)
+            else:
+                monday = pc.floor_temporal(pc.cast(dates, pa.date32()), unit="week", week_starts_monday=True)
+                col = pc.cast(monday, pa.string())
+            snap.periods[bucket] = col = col.dictionary_encode()
+        return col
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Size of the loaded snapshot (None before the first query).
+        """
+        snap = self._snapshot
+        if snap is None:
+            return None
+        return {
+            "rows": snap.table.num_rows,
+            "table_bytes": snap.table.nbytes,
+            "heap_bytes": snap.heap_bytes,
+            "period_bytes": sum(col.nbytes for col in snap.periods.values()),
+        }
+
+    # ---------- Queries ----------
+
+    def query(
+        self,
+        group_by: Sequence[str] = ("brand",),
+        bucket: str = "day",
+        brand_ids: Optional[Sequence[int]] = None,
+        states: Optional[Sequence[str]] = None,
+        industries: Optional[Sequence[str]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        SPEND_AMOUNT and TRANS_COUNT totals per group, largest spend first.
+        """
+        unknown = [g for g in group_by if g not in GROUP_COLUMNS]
+        if unknown:
+            raise SpendQueryError(f"unknown group_by: {', '.join(unknown)} (use {', '.join(GROUP_COLUMNS)})")
+        if bucket not in BUCKETS:
+            raise SpendQueryError(f"bucket must be one of {', '.join(BUCKETS)}")
+        for name, value in (("from", date_from), ("to", date_to)):
+            if value is not None and not _is_iso_date(value):
+                raise SpendQueryError(f"{name} must be a date as YYYY-MM-DD")
+        if limit is None:
+            limit = self.max_rows
+        elif not 1 <= limit <= self.max_rows:
+            raise SpendQueryError(f"limit must be between 1 and {self.max_rows}")
+
+        snap = self.snapshot()
+        table = snap.table
+        if "period" in group_by:
+            table = table.append_column("PERIOD", self._period(snap, bucket))
+
+        mask = self._mask(table, brand_ids, states, industries, date_from, date_to)
+        if mask is not None:
+            table = table.filter(mask)
+
+        keys = [GROUP_COLUMNS[g] for g in group_by]
+        grouped = table.group_by(keys).aggregate(
+            [("SPEND_AMOUNT", "sum"), ("TRANS_COUNT", "sum"), ("SPEND_AMOUNT", "count")]
+        )
+        total_groups = grouped.num_rows
+        grouped = grouped.sort_by([("SPEND_AMOUNT_sum", "descending")]).slice(0, limit)
+
+        out: Dict[str, pa.Array] = {}
+        for g in group_by:
+            col = grouped[GROUP_COLUMNS[g]]
+            if g == "brand":
+                out["brand_id"] = col
+                out["brand_name"] = pc.take(snap.brand_names, pc.index_in(col, value_set=snap.brand_ids))
+            else:
+                out[g] = pc.cast(col, pa.string())
+        out["spend_amount"] = pc.round(grouped["SPEND_AMOUNT_sum"], 2)
+        out["trans_count"] = pc.round(grouped["TRANS_COUNT_sum"], 2)
+        out["rows"] = grouped["SPEND_AMOUNT_count"]
+        return {
+            "groups": total_groups,
+            "matched_rows": table.num_rows,
+            "data": pa.table(out).to_pylist(),
+        }
+
+    @staticmethod
+    def _mask(table: pa.Table, brand_ids, states, industries, date_from, date_to):
+        """
+        Boolean mask for the filters, built with compute kernels on the
+        columns directly (cheaper than a dataset expression per batch).
+        """
+        conds = []
+        if brand_ids:
+            conds.append(pc.is_in(table["BRAND_ID"], value_set=pa.array(brand_ids, pa.int64())))
+        if states:
+            conds.append(pc.is_in(table["STATE_ABBR"], value_set=pa.array(states, pa.string())))
+        if industries:
+            conds.append(pc.is_in(table["INDUSTRY_NAME"], value_set=pa.array(industries, pa.string())))
+        # TRANS_DATE is ISO text, so string order is date order
+        if date_from:
+            conds.append(pc.greater_equal(table["TRANS_DATE"], date_from))
+        if date_to:
+            conds.append(pc.less_equal(table["TRANS_DATE"], date_to))
+        mask = None
+        for cond in conds:
+            mask = cond if mask is None else pc.and_(mask, cond)
+        return mask
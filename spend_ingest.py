@@ -0,0 +1,306 @@
+# spend_ingest.py – streaming extract of ingest.stg_daily_spend into partitioned Arrow/Parquet
+
+"""
+Reads the staged spend table in server-side chunks and writes one columnar
+file per (chunk, TRANS_DATE) under a hive-style layout:
+
+    <out>/daily_spend/TRANS_DATE=2018-01-30/part-<chunk>-0.arrow
+
+BRAND_NAME and STATE_ABBR are dictionary encoded. Progress is recorded in
+<out>/_watermark.json as the last (ingested_at_utc, load_batch_id) written,
+so a re-run only pulls newer rows. File names derive from the chunk's
+starting watermark, so a run interrupted between writing files and saving
+the watermark rewrites the same files instead of duplicating rows.
+
+    python spend_ingest.py --source mssql+pymssql://user:pw@host:1433/db --out data/spend
+    python spend_ingest.py --seed-sqlite /tmp/standin.db data/stg_daily_spend_top10.csv
+    python spend_ingest.py --source sqlite:////tmp/standin.db --out /tmp/spend
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+if TYPE_CHECKING:
+    # Extract side only (requirements-etl.txt), imported where used: the API
+    # imports the constants below and must not pay for SQLAlchemy at boot
+    from sqlalchemy.engine import Engine
+
+SPEND_TABLE = "ingest.stg_daily_spend"
+BRAND_TABLE = "ingest.stg_brand_detail"
+DEFAULT_CHUNK_ROWS = 50000
+WATERMARK_FILE = "_watermark.json"
+SPEND_DIR = "daily_spend"
+BRAND_FILE = "brand_detail"
+
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
+# Column order of the SELECT and the type each column is stored as
+SPEND_SCHEMA = pa.schema(
+    [
+        ("BRAND_ID", pa.int64()),
+        ("BRAND_NAME", _DICT),
+        ("SPEND_AMOUNT", pa.float64()),
+        ("STATE_ABBR", _DICT),
+        ("TRANS_COUNT", pa.float64()),
+        ("TRANS_DATE", pa.string()),
+        ("VERSION", pa.date32()),
+        ("load_batch_id", pa.string()),
+        ("ingested_at_utc", pa.timestamp("us")),
+    ]
+)
+
+Watermark = Tuple[str, str]  # (ingested_at_utc, load_batch_id)
+
+
+# ---------- Source ----------
+
+def make_engine(url: str, **kwargs: Any) -> "Engine":
+    """
+    SQLAlchemy engine for the source (kwargs go to create_engine). SQLite has
+    no schemas, so the database file is also attached as `ingest` to make
+    ingest.<table> resolve.
+    """
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        path = engine.url.database or ":memory:"
+
+        @event.listens_for(engine, "connect")
+        def attach_ingest(dbapi_conn, _):
+            dbapi_conn.execute(f"ATTACH DATABASE '{path}' AS ingest")
+
+    return engine
+
+
+def azure_url_from_env() -> str:
+    """
+    mssql URL from the AZURE_SQL_* variables in .env.
+    """
+    from urllib.parse import quote_plus
+
+    return "mssql+pymssql://{user}:{pw}@{server}:1433/{db}".format(
+        user=quote_plus(os.environ["AZURE_SQL_USERNAME"]),
+        pw=quote_plus(os.environ["AZURE_SQL_PASSWORD"]),
+        server=os.environ["AZURE_SQL_SERVER"],
+        db=os.environ["AZURE_SQL_DATABASE"],
+    )
+
+
+def seed_sqlite(db_path: str, csv_path: str, table: str = "stg_daily_spend") -> int:
+    """
+    Load a CSV extract into a SQLite file to stand in for Azure SQL.
+    """
+    import sqlite3
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        conn = sqlite3.connect(db_path)
+        try:
+            cols = ", ".join(f'"{c}"' for c in header)
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})')
+            marks = ", ".join("?" for _ in header)
+            cur = conn.executemany(f'INSERT INTO "{table}" ({cols}) VALUES ({marks})', reader)
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+
+# ---------- Watermark ----------
+
+def read_watermark(out_dir: str) -> Optional[Watermark]:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return data["ingested_at_utc"], data["load_batch_id"]
+
+
+def write_watermark(out_dir: str, mark: Watermark, rows: int) -> None:
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"ingested_at_utc": mark[0], "load_batch_id": mark[1], "rows": rows}, f)
+    os.replace(tmp, path)
+
+
+def row_watermark(row: Sequence[Any]) -> Watermark:
+    stamp = row[8]
+    if isinstance(stamp, datetime):
+        stamp = stamp.isoformat(sep=" ")
+    return str(stamp), str(row[7])
+
+
+# ---------- Extract ----------
+
+def stream_chunks(
+    engine: "Engine",
+    since: Optional[Watermark] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    table: str = SPEND_TABLE,
+) -> Iterator[List[Sequence[Any]]]:
+    """
+    Yield lists of source rows in watermark order, never splitting rows that
+    share one (ingested_at_utc, load_batch_id) across two chunks, so the
+    watermark saved after a chunk is always a clean resume point.
+    """
+    cols = ", ".join(SPEND_SCHEMA.names)
+    query = f"SELECT {cols} FROM {table}"
+    params: Dict[str, Any] = {}
+    if since is not None:
+        query += (
+            " WHERE ingested_at_utc > :ts"
+            " OR (ingested_at_utc = :ts AND load_batch_id > :batch)"
+        )
+        params = {"ts": since[0], "batch": since[1]}
+    query += " ORDER BY ingested_at_utc, load_batch_id"
+
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(text(query), params)
+        carry: List[Sequence[Any]] = []
+        for partition in result.partitions(chunk_rows):
+            rows = carry + list(partition)
+            last = row_watermark(rows[-1])
+            cut = len(rows)
+            while cut and row_watermark(rows[cut - 1]) == last:
+                cut -= 1
+            if cut == 0:
+                # One key group bigger than a chunk: keep accumulating
+                carry = rows
+                continue
+            carry = rows[cut:]
+            yield rows[:cut]
+        if carry:
+            yield carry
+
+
+def to_table(rows: List[Sequence[Any]]) -> pa.Table:
+    """
+    Column-wise conversion of one chunk; no per-row Python objects survive.
+    """
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(SPEND_SCHEMA, columns):
+        if field.name == "TRANS_DATE":
+            values = [v.isoformat() if isinstance(v, date) else str(v)[:10] for v in values]
+        if pa.types.is_dictionary(field.type):
+            arr = pa.array(values, type=pa.string()).dictionary_encode()
+        elif pa.types.is_string(field.type):
+            arr = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        else:
+            arr = pa.array(values).cast(field.type)
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, schema=SPEND_SCHEMA)
+
+
+def write_chunk(table: pa.Table, out_dir: str, chunk_id: str, fmt: str = "arrow") -> None:
+    ds.write_dataset(
+        table,
+        os.path.join(out_dir, SPEND_DIR),
+        format="ipc" if fmt == "arrow" else "parquet",
+        partitioning=ds.partitioning(pa.schema([("TRANS_DATE", pa.string())]), flavor="hive"),
+        basename_template=f"part-{chunk_id}-{{i}}.{fmt}",
+        existing_data_behavior="overwrite_or_ignore",
+        # One record batch per (chunk, day) file instead of many small ones
+        min_rows_per_group=max(1, table.num_rows),
+        max_rows_per_group=max(1, table.num_rows),
+    )
+
+
+def extract_spend(
+    engine: "Engine",
+    out_dir: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    fmt: str = "arrow",
+    table: str = SPEND_TABLE,
+) -> Dict[str, Any]:
+    """
+    Incrementally extract the spend table into out_dir. Returns run stats.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    mark = read_watermark(out_dir)
+    rows_total = 0
+    chunks = 0
+    started = time.perf_counter()
+    for rows in stream_chunks(engine, since=mark, chunk_rows=chunk_rows, table=table):
+        chunk_id = hashlib.sha1(repr(mark).encode()).hexdigest()[:12]
+        write_chunk(to_table(rows), out_dir, chunk_id, fmt)
+        mark = row_watermark(rows[-1])
+        rows_total += len(rows)
+        chunks += 1
+        write_watermark(out_dir, mark, rows_total)
+        print(f"[spend_ingest] chunk {chunks}: {len(rows)} rows, watermark {mark[0]} / {mark[1]}")
+    elapsed = time.perf_counter() - started
+    return {"rows": rows_total, "chunks": chunks, "seconds": elapsed, "watermark": mark}
+
+
+def extract_brands(engine: "Engine", out_dir: str, fmt: str = "arrow", table: str = BRAND_TABLE) -> int:
+    """
+    The brand table is small; it is rewritten whole on every run.
+    """
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        result = conn.execute(text(f"SELECT * FROM {table}"))
+        names = list(result.keys())
+        columns = list(zip(*result.fetchall())) or [()] * len(names)
+    arrays = [pa.array([None if v is None else str(v) for v in col], type=pa.string()) for col in columns]
+    brand_table = pa.Table.from_arrays(arrays, names=names)
+
+    path = os.path.join(out_dir, f"{BRAND_FILE}.{fmt}")
+    tmp = path + ".tmp"
+    if fmt == "arrow":
+        feather.write_feather(brand_table, tmp, compression="uncompressed")
+    else:
+        pq.write_table(brand_table, tmp)
+    os.replace(tmp, path)
+    return brand_table.num_rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="SQLAlchemy URL (default: AZURE_SQL_* from .env)")
+    parser.add_argument("--out", default="data/spend")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--format", choices=("arrow", "parquet"), default="arrow")
+    parser.add_argument("--skip-brands", action="store_true")
+    parser.add_argument("--seed-sqlite", nargs=2, metavar=("DB", "CSV"), help="load a CSV into a SQLite stand-in and exit")
+    args = parser.parse_args(argv)
+
+    if args.seed_sqlite:
+        db_path, csv_path = args.seed_sqlite
+        table = "stg_brand_detail" if "brand" in os.path.basename(csv_path) else "stg_daily_spend"
+        print(f"[spend_ingest] seeded {seed_sqlite(db_path, csv_path, table)} rows into {db_path}:{table}")
+        return 0
+
+    if args.source is None:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    engine = make_engine(args.source or azure_url_from_env())
+    stats = extract_spend(engine, args.out, chunk_rows=args.chunk_rows, fmt=args.format)
+    if not args.skip_brands:
+        stats["brands"] = extract_brands(engine, args.out, fmt=args.format)
+    print(f"[spend_ingest] done: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+# spend_rollups.py – incrementally maintained daily/weekly/monthly spend rollups
+
+"""
+Daily, weekly and monthly SPEND_AMOUNT / TRANS_COUNT totals per
+(BRAND_ID, STATE_ABBR), kept up to date by applying each new batch as a delta.
+
+Every (BRAND_ID, STATE_ABBR, TRANS_DATE) has one winning row: the highest
+VERSION, ties broken by the later ingested_at_utc. A restated row subtracts
+the row it supersedes from all three grains and adds itself; an older or
+repeated row is ignored, so re-applying a batch is a no-op.
+
+State lives in a store: RollupFileStore (facts and rollups in one JSON
+file, written atomically) or RollupMongoStore (spend_facts / spend_rollups
+collections, $inc deltas). The file store also publishes the rollups alone,
+pre-sorted, for RollupFileReader; web workers load that and never the facts.
+
+    python spend_rollups.py data/stg_daily_spend_top10.csv --dir data/rollups
+    python spend_rollups.py data/spend --mongo
+"""
+
+import argparse
+import bisect
+import csv
+import heapq
+import json
+import os
+import sys
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+GRAINS = ("day", "week", "month")
+DEFAULT_BATCH = 5000
+
+# RollupFileStore state (facts + rollups) and the rollups-only file it publishes
+STATE_FILE = "state.json"
+SERVING_FILE = "rollups.json"
+
+FactKey = Tuple[int, str, str]  # (BRAND_ID, STATE_ABBR, TRANS_DATE)
+RollupKey = Tuple[str, int, str, str]  # (grain, BRAND_ID, STATE_ABBR, period)
+
+
+def period_of(grain: str, trans_date: str) -> str:
+    if grain == "day":
+        return trans_date
+    if grain == "month":
+        return trans_date[:7]
+    d = date.fromisoformat(trans_date)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def _fact_id(key: FactKey) -> str:
+    return f"{key[0]}|{key[1]}|{key[2]}"
+
+
+def _rollup_id(key: RollupKey) -> str:
+    return "|".join(str(k) for k in key)
+
+
+# ---------- Stores ----------
+
+class RollupFileStore:
+    """
+    Whole state in memory, persisted to <dir>/state.json on flush(). Each
+    flush also publishes <dir>/rollups.json for RollupFileReader: per grain,
+    rows with anything in them as [period, brand_id, state, spend, count,
+    rows] in (period, brand_id, state) order.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, STATE_FILE)
+        self.serving_path = os.path.join(directory, SERVING_FILE)
+        self.facts: Dict[str, List[Any]] = {}
+        self.rollups: Dict[str, List[Any]] = {}
+        self.watermark = ""
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        path = self.path
+        if not os.path.exists(path):
+            # Older stores kept the whole state in rollups.json
+            path = self.serving_path
+            if not os.path.exists(path):
+                return
+        with open(path) as f:
+            data = json.load(f)
+        if "facts" not in data:
+            return
+        with self._lock:
+            self.facts = data["facts"]
+            self.rollups = data.get("rollups", {})
+            self.watermark = data.get("watermark", "")
+
+    def get_facts(self, keys: Iterable[FactKey]) -> Dict[FactKey, List[Any]]:
+        found = {}
+        for key in keys:
+            fact = self.facts.get(_fact_id(key))
+            if fact is not None:
+                found[key] = fact
+        return found
+
+    def commit(self, facts: Dict[FactKey, List[Any]], deltas: Dict[RollupKey, List[float]], watermark: str) -> None:
+        with self._lock:
+            for key, fact in facts.items():
+                self.facts[_fact_id(key)] = fact
+            for key, (spend, count, rows) in deltas.items():
+                rid = _rollup_id(key)
+                total = self.rollups.get(rid)
+                if total is None:
+                    total = self.rollups[rid] = [0.0, 0.0, 0]
+                total[0] += spend
+                total[1] += count
+                total[2] += rows
+            self.watermark = max(self.watermark, watermark)
+
+    def flush(self) -> None:
+        with self._lock:
+            _write_json(self.path, {"watermark": self.watermark, "facts": self.facts, "rollups": self.rollups})
+            grains: Dict[str, List[List[Any]]] = {grain: [] for grain in GRAINS}
+            for rid, (spend, count, rows) in self.rollups.items():
+                if rows:
+                    grain, brand_id, state, period = rid.split("|", 3)
+                    grains[grain].append([period, int(brand_id), state, spend, count, rows])
+            for serving in grains.values():
+                serving.sort(key=lambda r: (r[0], r[1], r[2]))
+            # After the state: a crash in between only leaves the published copy behind
+            _write_json(self.serving_path, {"watermark": self.watermark, "grains": grains})
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class RollupFileReader:
+    """
+    Read side of RollupFileStore: loads only <dir>/rollups.json (again when
+    it changes) and answers queries by bisecting on period, per brand when
+    brand_ids are given, so a request reads only the rows it returns.
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, SERVING_FILE)
+        self.watermark = ""
+        # grain -> (periods, rows) and (grain, brand_id) -> (periods, rows), rows sorted
+        self._all: Dict[str, Tuple[List[str], List[List[Any]]]] = {}
+        self._by_brand: Dict[Tuple[str, int], Tuple[List[str], List[List[Any]]]] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.Lock()
+
+    def reload(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        # flush() replaces the file, so a new inode even if mtime and size match
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            with open(self.path) as f:
+                data = json.load(f)
+            if "grains" not in data:
+                # Not yet republished since the facts moved to state.json
+                return
+            by_grain, by_brand = {}, {}
+            for grain, rows in data["grains"].items():
+                by_grain[grain] = ([r[0] for r in rows], rows)
+                for r in rows:
+                    periods, brand_rows = by_brand.setdefault((grain, r[1]), ([], []))
+                    periods.append(r[0])
+                    brand_rows.append(r)
+            self._all, self._by_brand = by_grain, by_brand
+            self.watermark = data.get("watermark", "")
+            self._stamp = stamp
+
+    def query(
+        self, grain: str, brand_ids=None, states=None, date_from=None, date_to=None, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        self.reload()
+        if brand_ids:
+            indexes = [self._by_brand.get((grain, b)) for b in sorted(set(brand_ids))]
+        else:
+            indexes = [self._all.get(grain)]
+        lo_period = period_of(grain, date_from) if date_from else None
+        ranges = []
+        for periods, rows in filter(None, indexes):
+            lo = bisect.bisect_left(periods, lo_period) if lo_period else 0
+            hi = bisect.bisect_right(periods, date_to) if date_to else len(rows)
+            ranges.append(map(rows.__getitem__, range(lo, hi)))
+        if not ranges:
+            return []
+        rows = ranges[0] if len(ranges) == 1 else heapq.merge(*ranges, key=lambda r: (r[0], r[1], r[2]))
+        wanted_states = set(states) if states else None
+        out: List[Dict[str, Any]] = []
+        for period, brand_id, state, spend, count, n in rows:
+            if wanted_states is not None and state not in wanted_states:
+                continue
+            out.append({"brand_id": brand_id, "state": state, "period": period,
+                        "spend_amount": spend, "trans_count": count, "rows": n})
+            if len(out) >= limit:
+                break
+        return out
+
+
+class RollupMongoStore:
+    """
+    Facts and rollups in Mongo; each batch is one bulk upsert of facts plus
+    one bulk $inc of rollup deltas, so nothing is held in memory.
+    """
+
+    def __init__(self, db=None, db_factory=None):
+        # db_factory (e.g. lambda: project_db.db) defers the lookup to first use
+        self._db_factory = db_factory if db_factory is not None else (lambda: db)
+
+    @property
+    def facts(self):
+        return self._db_factory()["spend_facts"]
+
+    @property
+    def rollups(self):
+        return self._db_factory()["spend_rollups"]
+
+    @property
+    def meta(self):
+        return self._db_factory()["spend_rollup_meta"]
+
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the rollup indexes; run once per deploy via migrate.py.
+        """
+        from pymongo import ASCENDING
+
+        return [
+            # Serves query()'s sort as well as its period range
+            self.rollups.create_index(
+                [("grain", ASCENDING), ("period", ASCENDING), ("brand_id", ASCENDING), ("state", ASCENDING)],
+                name="idx_grain_period_brand_state",
+            ),
+            self.rollups.create_index(
+                [("grain", ASCENDING), ("brand_id", ASCENDING), ("period", ASCENDING)], name="idx_grain_brand_period"
+            ),
+        ]
+
+    @property
+    def watermark(self) -> str:
+        doc = self.meta.find_one({"_id": "watermark"})
+        return doc["value"] if doc else ""
+
+    def get_facts(self, keys: Iterable[FactKey]) -> Dict[FactKey, List[Any]]:
+        ids = {_fact_id(k): k for k in keys}
+        return {ids[doc["_id"]]: doc["fact"] for doc in self.facts.find({"_id": {"$in": list(ids)}})}
+
+    def commit(self, facts: Dict[FactKey, List[Any]], deltas: Dict[RollupKey, List[float]], watermark: str) -> None:
+        """
+        Rollup deltas and the facts they came from must land together, or a
+        re-run would double count (or drop) the batch. That needs a replica
+        set; a standalone server falls back to unguarded writes.
+        """
+        from pymongo.errors import OperationFailure
+
+        client = self.facts.database.client
+        try:
+            with client.start_session() as session:
+                session.with_transaction(lambda s: self._write(facts, deltas, watermark, s))
+                return
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation: transactions need a replica set
+                raise
+        except NotImplementedError:
+            pass
+        self._write(facts, deltas, watermark, None)
+
+    def _write(self, facts, deltas, watermark, session) -> None:
+        from pymongo import ReplaceOne, UpdateOne
+
+        if deltas:
+            self.rollups.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": _rollup_id(key)},
+                        {
+                            "$inc": {"spend_amount": spend, "trans_count": count, "rows": rows},
+                            "$setOnInsert": {"grain": key[0], "brand_id": key[1], "state": key[2], "period": key[3]},
+                        },
+                        upsert=True,
+                    )
+                    for key, (spend, count, rows) in deltas.items()
+                ],
+                ordered=False,
+                session=session,
+            )
+        if facts:
+            self.facts.bulk_write(
+                [ReplaceOne({"_id": _fact_id(k)}, {"_id": _fact_id(k), "fact": f}, upsert=True) for k, f in facts.items()],
+                ordered=False,
+                session=session,
+            )
+        self.meta.update_one({"_id": "watermark"}, {"$max": {"value": watermark}}, upsert=True, session=session)
+
+    def flush(self) -> None:
+        pass
+
+    def query(
+        self, grain: str, brand_ids=None, states=None, date_from=None, date_to=None, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        match: Dict[str, Any] = {"grain": grain, "rows": {"$gt": 0}}
+        if brand_ids:
+            match["brand_id"] = {"$in": list(brand_ids)}
+        if states:
+            match["state"] = {"$in": list(states)}
+        if date_from or date_to:
+            match["period"] = {}
+            if date_from:
+                match["period"]["$gte"] = period_of(grain, date_from)
+            if date_to:
+                match["period"]["$lte"] = date_to
+        sort = [("period", 1), ("brand_id", 1), ("state", 1)]
+        return list(self.rollups.find(match, {"_id": 0, "grain": 0}).sort(sort).limit(limit))
+
+
+# ---------- Engine ----------
+
+class SpendRollups:
+    """
+    Applies spend rows to a store as deltas. apply() returns counts of rows
+    that were new, restated (superseded an older version) or ignored.
+    """
+
+    def __init__(self, store, batch_size: int = DEFAULT_BATCH):
+        self.store = store
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _parse(row: Dict[str, Any]) -> Optional[Tuple[FactKey, List[Any]]]:
+        try:
+            brand_id = int(row["BRAND_ID"])
+            spend = float(row.get("SPEND_AMOUNT") or 0)
+            count = float(row.get("TRANS_COUNT") or 0)
+        except (KeyError, TypeError, ValueError):
+            return None
+        trans_date = str(row.get("TRANS_DATE") or "")[:10]
+        if len(trans_date) != 10:
+            return None
+        key = (brand_id, (row.get("STATE_ABBR") or "").strip(), trans_date)
+        # [VERSION, ingested_at_utc, spend, trans_count]; list order is the precedence
+        return key, [str(row.get("VERSION") or ""), str(row.get("ingested_at_utc") or ""), spend, count]
+
+    def apply(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        stats = {"new": 0, "restated": 0, "ignored": 0, "invalid": 0}
+        batch: Dict[FactKey, List[Any]] = {}
+        for row in rows:
+            parsed = self._parse(row)
+            if parsed is None:
+                stats["invalid"] += 1
+                continue
+            key, fact = parsed
+            held = batch.get(key)
+            if held is not None:
+                # Same key twice in one batch: only the winner reaches the store
+                stats["ignored"] += 1
+                if fact[:2] <= held[:2]:
+                    continue
+            batch[key] = fact
+            if len(batch) >= self.batch_size:
+                self._apply_batch(batch, stats)
+                batch = {}
+        if batch:
+            self._apply_batch(batch, stats)
+        self.store.flush()
+        return stats
+
+    def _apply_batch(self, batch: Dict[FactKey, List[Any]], stats: Dict[str, int]) -> None:
+        current = self.store.get_facts(batch.keys())
+        winners: Dict[FactKey, List[Any]] = {}
+        deltas: Dict[RollupKey, List[float]] = {}
+        watermark = ""
+
+        for key, fact in batch.items():
+            watermark = max(watermark, fact[1])
+            old = current.get(key)
+            if old is not None and fact[:2] <= old[:2]:
+                stats["ignored"] += 1
+                continue
+            if old is None:
+                d_spend, d_count, d_rows = fact[2], fact[3], 1
+                stats["new"] += 1
+            else:
+                d_spend, d_count, d_rows = fact[2] - old[2], fact[3] - old[3], 0
+                stats["restated"] += 1
+            winners[key] = fact
+
+            brand_id, state, trans_date = key
+            for grain in GRAINS:
+                rkey = (grain, brand_id, state, period_of(grain, trans_date))
+                acc = deltas.get(rkey)
+                if acc is None:
+                    acc = deltas[rkey] = [0.0, 0.0, 0]
+                acc[0] += d_spend
+                acc[1] += d_count
+                acc[2] += d_rows
+
+        self.store.commit(winners, deltas, watermark)
+
+    def query(
+        self,
+        grain: str = "day",
+        brand_ids=None,
+        states=None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Precomputed totals for one grain, in (period, brand_id, state)
+        order. Periods are named by their first day, so `from` matches the
+        period that holds it.
+        """
+        if grain not in GRAINS:
+            raise ValueError(f"grain must be one of {', '.join(GRAINS)}")
+        docs = self.store.query(grain, brand_ids, states, date_from, date_to, limit=limit)
+        for doc in docs:
+            doc["spend_amount"] = round(doc["spend_amount"], 2)
+            doc["trans_count"] = round(doc["trans_count"], 2)
+        return docs
+
+
+# ---------- Sources ----------
+
+def iter_source(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Rows from a spend CSV extract or a spend_ingest store directory.
+    """
+    if os.path.isdir(path):
+        import pyarrow.dataset as ds
+
+        from spend_ingest import SPEND_DIR
+
+        dataset = ds.dataset(os.path.join(path, SPEND_DIR), format="ipc", partitioning="hive")
+        for batch in dataset.to_batches():
+            yield from batch.to_pylist()
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="spend CSV or spend_ingest store directory")
+    parser.add_argument("--dir", default="data/rollups", help="file store directory")
+    parser.add_argument("--mongo", action="store_true", help="use the service's Mongo database instead")
+    args = parser.parse_args(argv)
+
+    if args.mongo:
+        from config import Config
+        from projectdb import ProjectDB
+
+        store = RollupMongoStore(ProjectDB.from_config(Config).db)
+        store.ensure_indexes()
+    else:
+        store = RollupFileStore(args.dir)
+    stats = SpendRollups(store).apply(iter_source(args.source))
+    print(f"[spend_rollups] {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
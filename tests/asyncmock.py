@@ -0,0 +1,70 @@
+# tests/asyncmock.py – awaitable facade over mongomock for AsyncProjectDB / asgi_app
+
+import mongomock
+
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self.cursor = self.cursor.limit(n)
+        return self
+
+    def __aiter__(self):
+        self._it = iter(self.cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self.sync = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.sync.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self.sync = db
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.sync[name])
+
+    async def command(self, *args, **kwargs):
+        if args and args[0] == "ping":
+            return {"ok": 1.0}
+        return self.sync.command(*args, **kwargs)
+
+
+class AsyncClient:
+    def __init__(self, sync=None):
+        self.sync = sync or mongomock.MongoClient()
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self.sync[name])
+
+    @property
+    def admin(self):
+        return self["admin"]
+
+    async def close(self):
+        pass
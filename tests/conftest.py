@@ -0,0 +1,117 @@
+# tests/conftest.py – shared fixtures: mongomock in place of Mongo, one app per test
+
+import functools
+import os
+import sys
+
+import mongomock
+import mongomock.collection
+import pytest
+from pymongo.errors import BulkWriteError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from projectdb import ProjectDB  # noqa: E402
+
+# pymongo 4.13 passes sort= to bulk updates; mongomock 4.3 predates it
+for _name in ("add_update", "add_replace"):
+    _original = getattr(mongomock.collection.BulkOperationBuilder, _name)
+
+    def _without_sort(self, *args, _original=_original, sort=None, **kwargs):
+        return _original(self, *args, **kwargs)
+
+    setattr(mongomock.collection.BulkOperationBuilder, _name, _without_sort)
+
+
+# mongomock re-runs the filter to fetch the updated document unless it saw the
+# _id; with {"_id": 0} a filter the update no longer matches returns None
+_find_and_modify = mongomock.collection.Collection._find_and_modify
+
+
+def _find_and_modify_by_id(self, query, projection=None, *args, **kwargs):
+    if not isinstance(projection, dict) or projection.get("_id", 1):
+        return _find_and_modify(self, query, projection, *args, **kwargs)
+    projection = {k: v for k, v in projection.items() if k != "_id"} or None
+    doc = _find_and_modify(self, query, projection, *args, **kwargs)
+    if doc is not None:
+        doc.pop("_id", None)
+    return doc
+
+
+mongomock.collection.Collection._find_and_modify = _find_and_modify_by_id
+
+
+# mongomock numbers bulk "upserted" entries 0, 1, 2...; MongoDB reports the op index
+_execute = mongomock.collection.BulkOperationBuilder.execute
+
+
+def _execute_with_op_indexes(self, write_concern=None):
+    upserted_at = []
+
+    def track(index, fn):
+        @functools.wraps(fn)
+        def run():
+            out = fn()
+            if "upserted" in out:
+                upserted_at.append(index)
+            return out
+        return run
+
+    def fix(result):
+        for entry, index in zip(result.get("upserted", []), upserted_at):
+            entry["index"] = index
+        return result
+
+    self.executors = [track(i, fn) for i, fn in enumerate(self.executors)]
+    try:
+        return fix(_execute(self, write_concern))
+    except BulkWriteError as e:
+        fix(e.details)
+        raise
+
+
+mongomock.collection.BulkOperationBuilder.execute = _execute_with_op_indexes
+
+
+class StandInConfig(Config):
+    MONGO_DB = "projects_test"
+    PROJECT_CACHE_WATCH = False
+    WRITE_BEHIND = False
+    ROLLUP_STORE = "file"
+
+
+@pytest.fixture
+def mongo():
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def project_db(mongo):
+    # mongomock has no $type aggregation operator, so shape reads in Python
+    db = ProjectDB(client=mongo, dbname=StandInConfig.MONGO_DB, shape_in_db=False)
+    db.ensure_indexes()
+    return db
+
+
+@pytest.fixture
+def config(tmp_path):
+    class Scratch(StandInConfig):
+        SPEND_DATA_DIR = str(tmp_path)
+        SPEND_STORE_DIR = str(tmp_path / "spend")
+        BRAND_INDEX_PATH = str(tmp_path / "brand_index.bin")
+        BRAND_SOURCE_CSV = str(tmp_path / "stg_brand_detail.csv")
+        ROLLUP_DIR = str(tmp_path / "rollups")
+
+    return Scratch
+
+
+@pytest.fixture
+def app(config, project_db):
+    return create_app(config, project_db=project_db)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from asgi_app import create_asgi_app
+from pymongo.errors import OperationFailure
+
+from async_projectdb import AsyncProjectDB
+from projectdb import ProjectDB
+from tests.asyncmock import AsyncClient, AsyncCollection, AsyncCursor
+
+
+@pytest.fixture
+def asgi(config):
+    stand_in = AsyncClient()
+    # mongomock has no $type aggregation operator, so shape reads in Python
+    db = AsyncProjectDB(lambda: stand_in, dbname=config.MONGO_DB, shape_in_db=False)
+    asyncio.run(db.ensure_indexes())
+    return create_asgi_app(config, project_db=db)
+
+
+def run(asgi, scenario):
+    async def main():
+        return await scenario(asgi.test_client())
+
+    return asyncio.run(main())
+
+
+def test_crud_paging_and_etags(asgi):
+    async def scenario(client):
+        for pid in ("p3", "p1", "p2"):
+            resp = await client.post("/projects", json={"project_id": pid, "project_name": pid})
+            assert resp.status_code == 201
+        dup = await client.post("/projects", json={"project_id": "p1", "project_name": "again"})
+        assert dup.status_code == 409
+
+        page = await client.get("/projects?limit=2")
+        body = await page.get_json()
+        assert [p["project_id"] for p in body["projects"]] == ["p1", "p2"]
+        assert body["next_after"] == "p2"
+        etag = page.headers["ETag"]
+        assert (await client.get("/projects?limit=2", headers={"If-None-Match": etag})).status_code == 304
+
+        one = await client.get("/projects/p1")
+        assert (await client.get("/projects/p1", headers={"If-None-Match": one.headers["ETag"]})).status_code == 304
+        assert (await client.get("/projects/nope")).status_code == 404
+        assert (await client.get("/projects?limit=0")).status_code == 400
+
+    run(asgi, scenario)
+
+
+def test_bulk_validation_matches_flask(asgi, client):
+    async def scenario(asgi_client):
+        out = []
+        for body in (None, {"projects": "x"}, {"mode": "merge"}, {"projects": [{}] * 10001}):
+            out.append((await asgi_client.post("/projects/bulk", json=body)).status_code)
+        return out
+
+    flask = [client.post("/projects/bulk", json=body).status_code
+             for body in (None, {"projects": "x"}, {"mode": "merge"}, {"projects": [{}] * 10001})]
+    assert run(asgi, scenario) == flask == [400, 400, 400, 413]
+
+
+def test_health_pings_mongo(asgi):
+    async def scenario(client):
+        resp = await client.get("/health")
+        return resp.status_code, await resp.get_json()
+
+    status, body = run(asgi, scenario)
+    assert status == 200
+    assert body["status"] in ("ok", "degraded")
+    assert "mongo_latency_ms" in body
+
+
+def test_asgi_process_does_not_import_flask_app():
+    import os
+    import subprocess
+    import sys
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", "import sys, asgi_app; print('app' in sys.modules)"],
+                         cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+class ShapingCollection(AsyncCollection):
+    """
+    Records aggregate pipelines and runs them without the shape stage,
+    which mongomock cannot evaluate.
+    """
+
+    pipelines = []
+
+    async def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        assert pipeline[-1] == ProjectDB._shape_stage()
+        return AsyncCursor(self.sync.aggregate(pipeline[:-1]))
+
+
+def test_async_reads_are_shaped_in_mongo(monkeypatch):
+    stand_in = AsyncClient()
+    stand_in.sync["projects_test"]["projects"].insert_many([
+        {"project_id": "p2", "project_name": "two"}, {"project_id": "p1", "project_name": "one"},
+    ])
+    db = AsyncProjectDB(lambda: stand_in, dbname="projects_test")
+    monkeypatch.setattr(AsyncProjectDB, "collection",
+                        property(lambda self: ShapingCollection(stand_in.sync["projects_test"]["projects"])))
+    ShapingCollection.pipelines = []
+
+    async def reads():
+        page = await db.list_projects(limit=5)
+        one = await db.get_project("p1")
+        found = await db.search_projects(limit=5, after="p1")
+        return page, one, found
+
+    page, one, found = asyncio.run(reads())
+    assert [p["project_id"] for p in page] == ["p1", "p2"]
+    assert one["project_name"] == "one"
+    assert [p["project_id"] for p in found] == ["p2"]
+    assert [p[0] for p in ShapingCollection.pipelines] == [
+        {"$match": {}}, {"$match": {"project_id": "p1"}}, {"$match": {"project_id": {"$gt": "p1"}}},
+    ]
+
+
+def test_async_ensure_indexes_raises(monkeypatch):
+    stand_in = AsyncClient()
+    db = AsyncProjectDB(lambda: stand_in, dbname="projects_test", shape_in_db=False)
+    assert "idx_project_id_unique" in asyncio.run(db.ensure_indexes())
+
+    def refuse(*args, **kwargs):
+        raise OperationFailure("not authorized", 13)
+
+    monkeypatch.setattr(stand_in.sync["projects_test"]["projects"], "create_index", refuse)
+    with pytest.raises(OperationFailure):
+        asyncio.run(db.ensure_indexes())
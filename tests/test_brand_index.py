@@ -0,0 +1,94 @@
+import fcntl
+import os
+import shutil
+import threading
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import brand_index
+from brand_index import BrandIndex
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "stg_brand_detail.csv")
+
+
+def brand(brand_id, name, batch="b1"):
+    return {"BRAND_ID": str(brand_id), "BRAND_NAME": name, "SUBINDUSTRY_ID": "1", "SUBINDUSTRY_NAME": "Pizza",
+            "INDUSTRY_NAME": "Restaurants", "BRAND_URL_ADDR": "", "BRAND_TYPE": "", "load_batch_id": batch}
+
+
+def write_csv(path, rows):
+    header = list(rows[0])
+    with open(path, "w", newline="") as f:
+        f.write(",".join(header) + "\n")
+        for row in rows:
+            f.write(",".join(row[k] for k in header) + "\n")
+
+
+def test_lookup_and_prefix_search(tmp_path):
+    source = tmp_path / "stg_brand_detail.csv"
+    shutil.copy(SAMPLE, source)
+    index = BrandIndex(str(tmp_path / "brands.bin"), source=str(source))
+    assert index.get(16254)["BRAND_NAME"] == "&PIZZA"
+    assert index.get(99999999) is None
+    names = [b["BRAND_NAME"] for b in index.search("1 stop")]
+    assert names == ["1 STOP (EX FUEL)", "1 STOP (FUEL)", "1 STOP BEDROOMS", "1 STOP LIGHTING"]
+    assert [b["BRAND_ID"] for b in index.search("1 STOP", limit=2)] == [23354, 29463]
+    assert index.search("zzz") == []
+
+
+def test_new_batch_rebuilds(tmp_path):
+    source = tmp_path / "stg_brand_detail.csv"
+    write_csv(source, [brand(1, "ALPHA")])
+    index = BrandIndex(str(tmp_path / "brands.bin"), source=str(source))
+    assert index.get(2) is None
+    write_csv(source, [brand(1, "ALPHA"), brand(2, "BETA", batch="b2")])
+    index.refresh(force=True)
+    assert index.get(2)["BRAND_NAME"] == "BETA"
+    assert index.stats()["brands"] == 2
+
+
+def test_newest_staged_extract_wins(tmp_path):
+    csv_path = tmp_path / "stg_brand_detail.csv"
+    write_csv(csv_path, [brand(1, "FROM CSV")])
+    store = tmp_path / "spend"
+    store.mkdir()
+    index = BrandIndex(str(tmp_path / "brands.bin"),
+                       source=brand_index.staged_sources(str(store)) + [str(csv_path)])
+    assert index.get(1)["BRAND_NAME"] == "FROM CSV"
+    # spend_ingest stages every column as a string
+    rows = [brand(1, "FROM EXTRACT", batch="b2")]
+    feather.write_feather(pa.Table.from_pylist(rows), str(store / "brand_detail.arrow"), compression="uncompressed")
+    index.refresh(force=True)
+    assert index.get(1)["BRAND_NAME"] == "FROM EXTRACT"
+
+
+def test_first_build_waits_for_the_builder(tmp_path):
+    source = tmp_path / "stg_brand_detail.csv"
+    write_csv(source, [brand(1, "ALPHA")])
+    path = str(tmp_path / "brands.bin")
+    index = BrandIndex(path, source=str(source))
+    found = []
+    with open(path + ".lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        reader = threading.Thread(target=lambda: found.append(index.get(1)))
+        reader.start()
+        reader.join(0.2)
+        # Blocked on the other worker's build instead of failing with no file
+        assert reader.is_alive()
+        brand_index.build_index(brand_index.read_source(str(source)), path)
+    reader.join(5)
+    assert found[0]["BRAND_NAME"] == "ALPHA"
+
+
+def test_rebuild_in_progress_keeps_serving_the_old_file(tmp_path, monkeypatch):
+    source = tmp_path / "stg_brand_detail.csv"
+    write_csv(source, [brand(1, "ALPHA")])
+    path = str(tmp_path / "brands.bin")
+    index = BrandIndex(path, source=str(source))
+    assert index.get(1)["BRAND_NAME"] == "ALPHA"
+    write_csv(source, [brand(1, "ALPHA 2", batch="b2")])
+    with open(path + ".lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        index.refresh(force=True)
+    assert index.get(1)["BRAND_NAME"] == "ALPHA"
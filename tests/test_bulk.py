@@ -0,0 +1,113 @@
+import asyncio
+
+from async_projectdb import AsyncProjectDB
+from tests.asyncmock import AsyncClient
+
+
+def project(pid, **fields):
+    return {"project_id": pid, "project_name": pid, **fields}
+
+
+def statuses(results):
+    return [(r["project_id"], r["status"]) for r in results]
+
+
+def test_all_created_is_a_200(client):
+    resp = client.post("/projects/bulk", json={"projects": [project("p1"), project("p2")]})
+    assert resp.status_code == 200
+    assert statuses(resp.get_json()["results"]) == [("p1", "created"), ("p2", "created")]
+
+
+def test_partial_failure_is_a_207_with_per_item_status(client):
+    client.post("/projects", json=project("p1"))
+    resp = client.post("/projects/bulk", json={
+        "projects": [project("p0"), project("p1"), {"project_name": "no id"}, project("p2")],
+        "delete": ["p1", "nope"],
+    })
+    assert resp.status_code == 207
+    body = resp.get_json()
+    assert body["success"] is False
+    assert [r["index"] for r in body["results"]] == [0, 1, 2, 3]
+    assert statuses(body["results"]) == [("p0", "created"), ("p1", "duplicate"), (None, "invalid"), ("p2", "created")]
+    assert statuses(body["deleted"]) == [("p1", "deleted"), ("nope", "not_found")]
+    # Unordered: the items after the duplicate were still written
+    assert client.get("/projects/p2").status_code == 200
+
+
+def test_upsert_mode_updates_without_wiping_arrays(client):
+    client.post("/projects", json=project("p1", members_list=["ann"]))
+    resp = client.post("/projects/bulk", json={"mode": "upsert", "projects": [
+        {"project_id": "p1", "project_desc": "new"}, project("p2"),
+    ]})
+    assert resp.status_code == 200
+    assert statuses(resp.get_json()["results"]) == [("p1", "updated"), ("p2", "created")]
+    p1 = client.get("/projects/p1").get_json()["project"]
+    assert (p1["project_desc"], p1["members_list"]) == ("new", ["ann"])
+
+
+def test_results_stay_in_order_across_batches(project_db):
+    project_db.create_project(project("p3"))
+    items = [project(f"p{i}") for i in range(7)]
+    results = project_db.bulk_upsert(items, insert_only=True, batch_size=3)
+    assert [r["index"] for r in results] == list(range(7))
+    assert [r["status"] for r in results] == ["created"] * 3 + ["duplicate"] + ["created"] * 3
+
+
+def test_bulk_array_changes(client):
+    client.post("/projects", json=project("p1", members_list=["ann"]))
+    resp = client.patch("/projects/bulk", json={"changes": [
+        {"project_id": "p1", "members": {"add": ["bob"], "remove": ["ann"]}},
+        {"project_id": "ghost", "members": {"add": ["bob"]}},
+    ]})
+    assert resp.status_code == 207
+    assert statuses(resp.get_json()["results"]) == [("p1", "updated"), ("ghost", "not_found")]
+    assert client.get("/projects/p1").get_json()["project"]["members_list"] == ["bob"]
+
+
+class RacingCollection:
+    """
+    Another request deletes `victim` right after our first read or delete.
+    """
+
+    def __init__(self, inner, victim):
+        self.inner = inner
+        self.victim = victim
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+
+        def call(*args, **kwargs):
+            out = method(*args, **kwargs)
+            if name == "find":
+                out = list(out)
+            if name in ("find", "delete_one") and self.victim:
+                self.inner.delete_one({"project_id": self.victim})
+                self.victim = None
+            return out
+
+        return call
+
+
+def test_bulk_delete_reports_each_id_once(project_db):
+    project_db.create_project(project("p1"))
+    results = project_db.bulk_delete(["p1", "p1", "nope"])
+    assert [r["status"] for r in results] == ["deleted", "duplicate", "not_found"]
+    assert [r["index"] for r in results] == [0, 1, 2]
+
+
+def test_concurrent_delete_is_not_claimed(project_db, monkeypatch):
+    for pid in ("p1", "p2"):
+        project_db.create_project(project(pid))
+    racing = RacingCollection(project_db._collection, "p2")
+    monkeypatch.setattr(project_db, "_collection", racing)
+    results = project_db.bulk_delete(["p1", "p2"])
+    assert statuses(results) == [("p1", "deleted"), ("p2", "not_found")]
+
+
+def test_async_bulk_delete():
+    stand_in = AsyncClient()
+    stand_in.sync["projects_test"]["projects"].insert_many([project("p1"), project("p2")])
+    db = AsyncProjectDB(lambda: stand_in, dbname="projects_test", shape_in_db=False)
+    results = asyncio.run(db.bulk_delete(["p1", "p2", "p1", "nope"], concurrency=2))
+    assert [r["status"] for r in results] == ["deleted", "deleted", "duplicate", "not_found"]
+    assert stand_in.sync["projects_test"]["projects"].count_documents({}) == 0
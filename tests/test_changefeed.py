@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from changefeed import ChangeFeed, stream_events
+
+NOT_SUPPORTED = OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class FakeCollection:
+    """
+    watch() yields the queued changes, then blocks until fail() and raises
+    the standalone-server error, which ends the watcher thread.
+    """
+
+    def __init__(self, changes=(), error=None):
+        self.changes = list(changes)
+        self.error = error
+        self.failed = threading.Event()
+
+    def fail(self):
+        self.failed.set()
+
+    def watch(self, **kwargs):
+        if self.error is not None:
+            # Server round trip before the aggregate is refused
+            time.sleep(0.05)
+            raise self.error
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        yield from self.changes
+        self.changes = []
+        self.failed.wait()
+        raise NOT_SUPPORTED
+
+
+def change(n, project_id=None, op="insert"):
+    project_id = project_id or f"p{n}"
+    return {
+        "_id": {"_data": f"t{n}"},
+        "operationType": op,
+        "documentKey": {"_id": f"oid-{project_id}"},
+        "fullDocument": {"_id": f"oid-{project_id}", "project_id": project_id, "project_name": project_id},
+    }
+
+
+def running_feed(changes, buffer_size=100):
+    coll = FakeCollection(changes)
+    feed = ChangeFeed(lambda: coll, dumps=json.dumps, buffer_size=buffer_size)
+    feed.start()
+    assert feed.wait_started(5) is None
+    assert feed.wait(len(changes) - 1, 5)
+    return feed, coll
+
+
+def frame_ids(frames):
+    return [line[4:] for frame in frames for line in frame.splitlines() if line.startswith("id: ")]
+
+
+def test_resume_from_buffered_token():
+    feed, coll = running_feed([change(n) for n in range(1, 6)])
+    cursor, resync = feed.cursor("t2")
+    assert not resync
+    latest, frames, behind = feed.read(cursor)
+    assert (latest, behind) == (5, False)
+    assert frame_ids(frames) == ["t3", "t4", "t5"]
+    # Unknown token: start from now and resync
+    assert feed.cursor("gone") == (5, True)
+    coll.fail()
+
+
+def test_project_filter_and_falling_behind():
+    feed, coll = running_feed([change(n, project_id="a" if n % 2 else "b") for n in range(1, 7)], buffer_size=4)
+    _, frames, behind = feed.read(2, project_ids=["a"])
+    assert not behind
+    assert frame_ids(frames) == ["t3", "t5"]
+    # Seq 1 was overwritten by seq 5
+    assert feed.read(0)[2]
+    assert feed.cursor("t1") == (6, True)
+    coll.fail()
+
+
+def test_open_stream_ends_with_error_event():
+    feed, coll = running_feed([change(1)])
+    events = stream_events(feed, heartbeat=5, max_seconds=30)
+    assert next(events).startswith("retry:")
+    coll.fail()
+    frame = next(events)
+    assert frame.startswith("event: error\n")
+    assert "replica sets" in frame
+    with pytest.raises(StopIteration):
+        next(events)
+
+
+@pytest.fixture
+def events_client(app, client, config, monkeypatch):
+    monkeypatch.setattr(config, "EVENTS_STREAM_SECONDS", 0.2)
+    monkeypatch.setattr(config, "EVENTS_HEARTBEAT_SECONDS", 0.1)
+    return client
+
+
+def test_standalone_server_is_a_503(app, events_client):
+    app.extensions["change_feed"].collection_factory = lambda: FakeCollection(error=NOT_SUPPORTED)
+    resp = events_client.get("/projects/events")
+    assert resp.status_code == 503
+
+
+def test_reconnect_with_last_event_id(app, events_client):
+    coll = FakeCollection([change(n) for n in range(1, 4)])
+    feed = app.extensions["change_feed"]
+    feed.collection_factory = lambda: coll
+    feed.start()
+    assert feed.wait(2, 5)
+    resp = events_client.get("/projects/events", headers={"Last-Event-ID": "t1"})
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    body = resp.get_data(as_text=True)
+    assert body.startswith("retry:")
+    assert frame_ids([body]) == ["t2", "t3"]
+    coll.fail()
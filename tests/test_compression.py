@@ -0,0 +1,45 @@
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+import compression
+from compression import init_compression
+
+PAYLOAD = {"items": ["x" * 40] * 100}
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_compression(app, min_size=1024)
+
+    @app.route("/big")
+    def big():
+        return jsonify(PAYLOAD)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    return app.test_client()
+
+
+def test_brotli_preferred_when_installed(client):
+    brotli = pytest.importorskip("brotli")
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(resp.get_data()) == client.get("/big").get_data()
+
+
+def test_gzip_without_brotli(client, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.get_data()) == client.get("/big").get_data()
+    assert "Accept-Encoding" in resp.headers["Vary"]
+
+
+def test_small_or_unaccepted_left_alone(client):
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/big").headers
@@ -0,0 +1,92 @@
+import os
+import threading
+
+import pytest
+
+import extract_runner
+import spend_ingest
+from spend_analytics import SpendAnalytics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, "data", "stg_daily_spend_top10.csv")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    db_path = str(tmp_path / "standin.db")
+    spend_ingest.seed_sqlite(db_path, CSV)
+    return spend_ingest.make_engine(f"sqlite:///{db_path}")
+
+
+def matched_rows(out_dir):
+    return SpendAnalytics(out_dir).query(group_by=[])["matched_rows"]
+
+
+def full_snapshot(engine, out_dir):
+    runner = extract_runner.ExtractRunner(engine, out_dir, readers=1, workers=1, chunk_rows=3)
+    return runner.run(*extract_runner.plan(engine, [extract_runner.SPEND]))
+
+
+def test_incremental_extract_is_resumable(engine, tmp_path):
+    out = str(tmp_path / "spend")
+    first = spend_ingest.extract_spend(engine, out, chunk_rows=3)
+    assert first["rows"] == 10
+    assert spend_ingest.read_watermark(out) == first["watermark"]
+    assert spend_ingest.extract_spend(engine, out, chunk_rows=3)["rows"] == 0
+    assert matched_rows(out) == 10
+
+
+def test_full_snapshot_replaces_an_incremental_store(engine, tmp_path):
+    out = str(tmp_path / "spend")
+    spend_ingest.extract_spend(engine, out)
+    stats = full_snapshot(engine, out)
+    assert stats["rows"] == 10
+    assert matched_rows(out) == 10
+    # Twice in a row: still one copy of every row, no staging left behind
+    full_snapshot(engine, out)
+    assert matched_rows(out) == 10
+    live = os.path.join(out, spend_ingest.SPEND_DIR)
+    # daily_spend points at the one versioned copy; the replaced ones are gone
+    assert os.path.islink(live)
+    assert sorted(os.listdir(out)) == sorted([spend_ingest.WATERMARK_FILE, spend_ingest.SPEND_DIR, os.readlink(live)])
+    # The snapshot's bound is a valid resume point for spend_ingest
+    assert spend_ingest.extract_spend(engine, out)["rows"] == 0
+
+
+def test_failed_snapshot_leaves_the_store_alone(engine, tmp_path, monkeypatch):
+    out = str(tmp_path / "spend")
+    spend_ingest.extract_spend(engine, out)
+    mark = spend_ingest.read_watermark(out)
+    partitions, watermark = extract_runner.plan(engine, [extract_runner.SPEND])
+    partitions[0].table = "ingest.missing_table"
+    with pytest.raises(Exception):
+        extract_runner.ExtractRunner(engine, out, readers=1, workers=1).run(partitions, watermark)
+    assert matched_rows(out) == 10
+    assert spend_ingest.read_watermark(out) == mark
+    assert not os.path.exists(os.path.join(out, ".staging"))
+
+
+def die(*args):
+    os._exit(1)
+
+
+def test_dead_worker_fails_the_run_instead_of_hanging(engine, tmp_path, monkeypatch):
+    out = str(tmp_path / "spend")
+    monkeypatch.setattr(extract_runner, "encode_chunk", die)
+    # One-row chunks and a one-slot queue: the reader is blocked on put() when the pool breaks
+    runner = extract_runner.ExtractRunner(engine, out, readers=1, workers=1, chunk_rows=1, queue_size=1)
+    partitions, watermark = extract_runner.plan(engine, [extract_runner.SPEND])
+    raised = []
+
+    def run():
+        try:
+            runner.run(partitions, watermark)
+        except Exception as e:
+            raised.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(30)
+    assert not thread.is_alive()
+    assert type(raised[0]).__name__ == "BrokenProcessPool"
+    assert not os.path.exists(os.path.join(out, ".staging"))
@@ -0,0 +1,65 @@
+import pytest
+from pymongo.errors import AutoReconnect
+
+
+@pytest.fixture
+def hw(app, client):
+    for pid in ("p1", "p2"):
+        assert client.post("/projects", json={"project_id": pid, "project_name": pid}).status_code == 201
+    assert client.post("/hardware", json={"hw_id": "hw1", "capacity": 10}).status_code == 201
+    return app.extensions["hardware_db"]
+
+
+def move(client, action, project_id, qty, hw_id="hw1"):
+    return client.post(f"/hardware/{hw_id}/{action}", json={"project_id": project_id, "qty": qty})
+
+
+def test_checkout_never_oversells(client, hw):
+    assert move(client, "checkout", "p1", 6).status_code == 200
+    resp = move(client, "checkout", "p2", 5)
+    assert resp.status_code == 409
+    assert resp.get_json()["status"] == "insufficient"
+    assert move(client, "checkout", "p2", 4).status_code == 200
+    assert move(client, "checkout", "p1", 1).status_code == 409
+    assert hw.get_set("hw1")["available"] == 0
+    assert hw.audit("hw1")["consistent"]
+
+
+def test_checkin_only_what_is_held(client, hw):
+    move(client, "checkout", "p1", 3)
+    resp = move(client, "checkin", "p1", 4)
+    assert resp.status_code == 409
+    assert resp.get_json()["status"] == "not_checked_out"
+    assert move(client, "checkin", "p2", 1).status_code == 409
+    assert move(client, "checkin", "p1", 3).status_code == 200
+    doc = hw.get_set("hw1")
+    assert doc["available"] == 10 and doc["checkouts"] == []
+    audit = hw.audit("hw1")
+    assert (audit["held"], audit["ledger_held"], audit["seq"]) == (0, 0, 3)
+    assert audit["consistent"]
+
+
+def test_resize_refused_below_held(client, hw):
+    move(client, "checkout", "p1", 7)
+    assert client.patch("/hardware/hw1", json={"capacity": 6}).status_code == 409
+    assert client.patch("/hardware/hw1", json={"capacity": 7}).status_code == 200
+    assert hw.get_set("hw1")["available"] == 0
+    assert hw.audit("hw1")["consistent"]
+
+
+def test_bad_requests(client, hw):
+    assert move(client, "checkout", "p1", 0).status_code == 400
+    assert move(client, "checkout", "p1", True).status_code == 400
+    assert move(client, "checkout", "nope", 1).status_code == 404
+    assert move(client, "checkout", "p1", 1, hw_id="nope").status_code == 404
+    assert client.post("/hardware/hw1/checkout", json={"qty": 1}).status_code == 400
+
+
+def test_outage_is_a_503_not_a_500(client, hw, monkeypatch):
+    def down(*args):
+        raise AutoReconnect("down")
+
+    monkeypatch.setattr(hw, "checkout", down)
+    resp = move(client, "checkout", "p1", 1)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
@@ -0,0 +1,56 @@
+import json
+import math
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from jsonprovider import OrjsonProvider, _default
+
+
+@pytest.fixture
+def flask_app():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    return app
+
+
+@pytest.fixture
+def providers(flask_app):
+    return flask_app.json, DefaultJSONProvider(flask_app)
+
+
+def stdlib(default, obj):
+    return default.dumps(obj, separators=(",", ":"), default=_default)
+
+
+@pytest.mark.parametrize("obj", [
+    {"b": 1, "a": [True, None, "x"], "c": {"z": "q\"uote\\", "y": "tab\t"}},
+    {"name": "Café ☕", "ctrl": "\x7f\x00"},
+    {"id": ObjectId("0123456789abcdef01234567"), "at": datetime(2018, 1, 2, 3, 4, 5, tzinfo=timezone.utc)},
+    {"big": 2 ** 70, "neg": -(2 ** 63)},
+    {1: "int key"},
+])
+def test_same_bytes_as_stdlib_without_floats(providers, obj):
+    fast, default = providers
+    assert fast.dumps(obj, separators=(",", ":")) == stdlib(default, obj)
+
+
+@pytest.mark.parametrize("value", [0.1, 1.5e-7, 1e-05, 6.5e-05, 1e16, 1e22, -0.0, 5e-324, 1.7976931348623157e308])
+def test_floats_round_trip_to_the_same_value(providers, value):
+    fast, _ = providers
+    assert json.loads(fast.dumps({"v": value}, separators=(",", ":")))["v"] == value
+
+
+def test_non_finite_floats_become_null(providers):
+    fast, _ = providers
+    out = fast.dumps([math.nan, math.inf, -math.inf], separators=(",", ":"))
+    assert out == "[null,null,null]"
+
+
+def test_response_matches_dumps(flask_app):
+    with flask_app.app_context():
+        resp = flask_app.json.response({"b": 2, "a": "é"})
+    assert resp.get_data() == b'{"a":"\\u00e9","b":2}\n'
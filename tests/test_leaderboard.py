@@ -0,0 +1,64 @@
+import os
+
+from leaderboard import BRAND_CSV, SPEND_COLUMNS, SPEND_CSV, Leaderboard
+
+
+def spend_row(brand_id, state, day, spend, version="2025-10-06", ingested="2025-11-12 00:00:00"):
+    return {"BRAND_ID": brand_id, "BRAND_NAME": f"Brand {brand_id}", "SPEND_AMOUNT": str(spend),
+            "STATE_ABBR": state, "TRANS_COUNT": "1", "TRANS_DATE": day, "VERSION": version,
+            "load_batch_id": "b", "ingested_at_utc": ingested}
+
+
+def totals(board, **scope):
+    return [(e["brand_id"], e["spend_amount"]) for e in board.top(**scope)]
+
+
+def test_ranks_brands_per_scope():
+    board = Leaderboard(k=2)
+    board.add_rows([spend_row("1", "CA", "2018-01-01", 10), spend_row("2", "CA", "2018-01-01", 20),
+                    spend_row("3", "NY", "2018-02-01", 30), spend_row("1", "NY", "2018-02-02", 15)])
+    assert totals(board) == [("3", 30.0), ("1", 25.0)]
+    assert totals(board, state="CA") == [("2", 20.0), ("1", 10.0)]
+    assert totals(board, period="2018-02") == [("3", 30.0), ("1", 15.0)]
+    assert board.top(state="TX") == []
+
+
+def test_restatement_replaces_the_earlier_row():
+    board = Leaderboard(k=3)
+    board.add_rows([spend_row("1", "CA", "2018-01-01", 100), spend_row("2", "CA", "2018-01-01", 60)])
+    # Brand 1's day restated down: it must fall behind brand 2, not add up to 150
+    applied = board.add_rows([spend_row("1", "CA", "2018-01-01", 50, version="2025-10-20")])
+    assert applied == 1
+    assert totals(board) == [("2", 60.0), ("1", 50.0)]
+    assert board.top()[1]["trans_count"] == 1.0
+
+
+def test_older_or_repeated_rows_are_ignored():
+    board = Leaderboard(k=3)
+    board.add_rows([spend_row("1", "CA", "2018-01-01", 40, version="2025-10-20")])
+    assert board.add_rows([spend_row("1", "CA", "2018-01-01", 99, version="2025-10-06"),
+                           spend_row("1", "CA", "2018-01-01", 40, version="2025-10-20")]) == 0
+    # Same VERSION, later ingest wins
+    board.add_rows([spend_row("1", "CA", "2018-01-01", 45, version="2025-10-20", ingested="2025-11-13 00:00:00")])
+    assert totals(board) == [("1", 45.0)]
+
+
+def test_refresh_reads_appended_rows_and_restatements(tmp_path):
+    path = tmp_path / SPEND_CSV
+
+    def write(rows, mode):
+        with open(path, mode, newline="") as f:
+            if mode == "w":
+                f.write(",".join(SPEND_COLUMNS) + "\n")
+            for r in rows:
+                f.write(",".join(r[c] for c in SPEND_COLUMNS) + "\n")
+
+    (tmp_path / BRAND_CSV).write_text("BRAND_ID,BRAND_NAME,INDUSTRY_NAME,SUBINDUSTRY_NAME\n1,One,Retail,Shoes\n")
+    write([spend_row("1", "CA", "2018-01-01", 10)], "w")
+    board = Leaderboard(str(tmp_path), k=5, refresh_interval=0)
+    board.refresh(force=True)
+    assert totals(board, subindustry="Shoes") == [("1", 10.0)]
+    write([spend_row("1", "CA", "2018-01-01", 12, version="2025-10-20")], "a")
+    board.refresh(force=True)
+    assert totals(board) == [("1", 12.0)]
+    assert os.path.getsize(path) == board._spend_offset
@@ -0,0 +1,69 @@
+import logging
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+
+from metrics import CommandTimer, filter_shape
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def event(name, command, micros, request_id=1):
+    return SimpleNamespace(command_name=name, command=command, connection_id=("localhost", 27017),
+                           request_id=request_id, duration_micros=micros)
+
+
+def test_metrics_endpoint_counts_routes_by_template(client):
+    labels = {"method": "GET", "route": "/projects/<project_id>"}
+    before = sample("projects_http_requests_total", status="404", **labels)
+    observed = sample("projects_http_request_duration_seconds_count", **labels)
+    assert client.get("/projects/nope").status_code == 404
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    assert "projects_http_request_duration_seconds_bucket" in resp.get_data(as_text=True)
+    assert sample("projects_http_requests_total", status="404", **labels) == before + 1
+    assert sample("projects_http_request_duration_seconds_count", **labels) == observed + 1
+
+
+def test_command_latency_lands_in_its_bucket():
+    timer = CommandTimer(slow_ms=1000)
+    labels = {"command": "find", "collection": "metrics_test"}
+    fast = sample("projects_mongo_command_duration_seconds_bucket", le="0.005", **labels)
+    total = sample("projects_mongo_command_duration_seconds_count", **labels)
+    timer.started(event("find", {"find": "metrics_test", "filter": {}}, 0))
+    timer.succeeded(event("find", None, 3000))
+    timer.started(event("find", {"find": "metrics_test", "filter": {}}, 0, request_id=2))
+    timer.failed(event("find", None, 40000, request_id=2))
+    assert sample("projects_mongo_command_duration_seconds_bucket", le="0.005", **labels) == fast + 1
+    assert sample("projects_mongo_command_duration_seconds_count", **labels) == total + 2
+    assert sample("projects_mongo_command_failures_total", **labels) >= 1
+    assert timer._inflight == {}
+
+
+def test_slow_query_log_has_no_values(caplog):
+    timer = CommandTimer(slow_ms=50)
+    command = {"find": "projects", "filter": {"project_id": "secret-id", "members_list": {"$in": ["a", "b", "c", "d"]}},
+               "$db": "projects_test"}
+    with caplog.at_level(logging.WARNING, logger="projects.slow_query"):
+        timer.started(event("find", command, 0))
+        timer.succeeded(event("find", None, 120000))
+        timer.started(event("find", command, 0, request_id=2))
+        timer.succeeded(event("find", None, 1000, request_id=2))
+    assert len(caplog.records) == 1
+    line = caplog.records[0].getMessage()
+    assert line.startswith("slow mongo find on projects: 120.0 ms")
+    assert "secret-id" not in line
+    assert "'project_id': '?'" in line and "'$in': ['?', '?', '?', '...']" in line
+
+
+def test_filter_shapes():
+    assert filter_shape("aggregate", {"aggregate": "projects", "pipeline": [{"$match": {"a": 1}}, {"$limit": 5}]}) \
+        == ["$match", "$limit"]
+    assert filter_shape("update", {"update": "projects", "updates": [{"q": {"project_id": "p1"}, "u": {}}]}) \
+        == {"project_id": "?"}
+    assert filter_shape("findAndModify", {"query": {"hw_id": "hw1", "available": {"$gte": 2}}}) \
+        == {"hw_id": "?", "available": {"$gte": "?"}}
+    assert filter_shape("insert", {"insert": "projects", "documents": [{"secret": 1}]}) is None
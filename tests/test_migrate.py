@@ -0,0 +1,27 @@
+from app import create_app
+from migrate import ensure_indexes
+from projectdb import ProjectDB
+
+
+def test_app_start_builds_no_indexes(config, mongo):
+    create_app(config, project_db=ProjectDB(client=mongo, dbname=config.MONGO_DB, shape_in_db=False))
+    assert config.MONGO_DB not in mongo.list_database_names()
+
+
+def test_init_indexes_enforces_unique_project_ids(config, mongo):
+    db = ProjectDB(client=mongo, dbname=config.MONGO_DB, shape_in_db=False)
+    app = create_app(config, project_db=db)
+    result = app.test_cli_runner().invoke(args=["init-indexes"])
+    assert result.exit_code == 0
+    assert "idx_project_id_unique" in result.output
+    client = app.test_client()
+    assert client.post("/projects", json={"project_id": "p1", "project_name": "One"}).status_code == 201
+    assert client.post("/projects", json={"project_id": "p1", "project_name": "Again"}).status_code == 409
+
+
+def test_ensure_indexes_is_idempotent(config, mongo):
+    db = ProjectDB(client=mongo, dbname=config.MONGO_DB, shape_in_db=False)
+    first = ensure_indexes(db, config)
+    assert ensure_indexes(db, config) == first
+    assert set(first) == {"projects", "hardware"}
+    assert "idx_hw_id_unique" in mongo[config.MONGO_DB]["hardware_sets"].index_information()
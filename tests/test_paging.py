@@ -0,0 +1,59 @@
+import asyncio
+
+from async_projectdb import AsyncProjectDB
+from tests.asyncmock import AsyncClient
+
+# Inserted out of project_id order, as natural order would return them
+IDS = ["p5", "p1", "p2", "p3", "p4"]
+
+
+def seed(collection):
+    for pid in IDS:
+        collection.insert_one({"project_id": pid, "project_name": pid})
+
+
+def walk(client, limit, extra=""):
+    seen, after = [], None
+    while True:
+        url = f"/projects?limit={limit}{extra}" + (f"&after={after}" if after else "")
+        body = client.get(url).get_json()
+        seen += [p["project_id"] for p in body["projects"]]
+        after = body["next_after"]
+        if after is None:
+            return seen
+
+
+def test_limit_only_pages_cover_every_project_once(client, project_db):
+    seed(project_db.collection)
+    assert walk(client, 2) == sorted(IDS)
+
+
+def test_pages_with_fields_and_after(client, project_db):
+    seed(project_db.collection)
+    assert walk(client, 3, "&fields=project_id") == sorted(IDS)
+    body = client.get("/projects?limit=2&after=p2").get_json()
+    assert [p["project_id"] for p in body["projects"]] == ["p3", "p4"]
+
+
+def test_bad_limit_is_rejected(client):
+    assert client.get("/projects?limit=0").status_code == 400
+    assert client.get("/projects?limit=abc").status_code == 400
+
+
+def test_stream_returns_projects_in_order(client, project_db):
+    seed(project_db.collection)
+    lines = client.get("/projects?stream=ndjson").get_data(as_text=True).splitlines()
+    assert [line.split('"project_id":"')[1][:2] for line in lines] == sorted(IDS)
+
+
+def test_async_first_page_is_sorted():
+    stand_in = AsyncClient()
+    seed(stand_in.sync["projects_test"]["projects"])
+    db = AsyncProjectDB(lambda: stand_in, dbname="projects_test", shape_in_db=False)
+
+    async def pages():
+        first = await db.list_projects(limit=2)
+        rest = await db.list_projects(limit=3, after=first[-1]["project_id"])
+        return [p["project_id"] for p in first + rest]
+
+    assert asyncio.run(pages()) == sorted(IDS)
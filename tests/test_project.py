@@ -0,0 +1,68 @@
+import pytest
+
+from project import Project, ProjectValidationError
+
+
+def errors_of(fn, data):
+    with pytest.raises(ProjectValidationError) as err:
+        fn(data)
+    return err.value.errors, str(err.value)
+
+
+def test_from_request_normalizes():
+    project = Project.from_request({
+        "project_id": " p1 ", "project_name": "One", "members_list": "ann, bob,,",
+        "hardware_set_id": [" hw1 ", "hw2", ""], "extra": "dropped",
+    })
+    assert project.to_dict() == {
+        "project_id": "p1", "project_name": "One", "project_desc": "", "members_list": ["ann", "bob"],
+        "num_of_hardware_sets": 2, "hardware_set_id": ["hw1", "hw2"],
+    }
+    # An explicit count wins over the list length
+    assert Project.from_request({"project_id": "p1", "project_name": "One", "num_of_hardware_sets": "5"}
+                                ).num_of_hardware_sets == 5
+
+
+def test_from_request_reports_every_field():
+    errors, message = errors_of(Project.from_request, {})
+    assert errors == {"project_id": "required", "project_name": "required"}
+    assert message == "Missing required fields"
+    errors, message = errors_of(Project.from_request, {
+        "project_id": 7, "project_name": "", "members_list": ["ann", 3], "num_of_hardware_sets": -1,
+    })
+    assert errors == {
+        "project_id": "must be a string", "members_list": "must be a list of strings",
+        "num_of_hardware_sets": "must be a non-negative integer", "project_name": "required",
+    }
+    assert message.startswith("Invalid fields: project_id (must be a string)")
+    assert errors_of(Project.from_request, ["not", "an", "object"])[0] == {"project": "must be a JSON object"}
+
+
+def test_clean_update_checks_only_present_fields():
+    assert Project.clean_update({"project_id": "p1", "hardware_set_id": "hw1,hw2"}) == {
+        "project_id": "p1", "hardware_set_id": ["hw1", "hw2"], "num_of_hardware_sets": 2,
+    }
+    assert Project.clean_update({"project_desc": None}, require=()) == {"project_desc": ""}
+    assert errors_of(Project.clean_update, {"num_of_hardware_sets": True, "project_id": "p1"})[0] == {
+        "num_of_hardware_sets": "must be a non-negative integer",
+    }
+
+
+def test_clean_changes():
+    assert Project.clean_changes({
+        "project_id": "p1", "members": {"add": ["bob", "bob"], "remove": ["ann"]}, "hardware_sets": {"add": "hw1"},
+    }) == {"project_id": "p1", "members_list": (["bob"], ["ann"]), "hardware_set_id": (["hw1"], [])}
+
+
+@pytest.mark.parametrize("data, errors", [
+    ({"members": {"add": ["bob"]}}, {"project_id": "required"}),
+    ({"project_id": 1, "members": {"add": ["bob"]}}, {"project_id": "must be a string"}),
+    ({"project_id": "p1"}, {"changes": "nothing to add or remove"}),
+    ({"project_id": "p1", "members": {"add": [], "remove": []}}, {"changes": "nothing to add or remove"}),
+    ({"project_id": "p1", "members": ["bob"]}, {"members": "must be an object with add / remove lists"}),
+    ({"project_id": "p1", "hardware_sets": {"add": [1]}}, {"hardware_sets": "add and remove must be lists of strings"}),
+    ({"project_id": "p1", "members": {"add": ["bob"], "remove": ["bob"]}}, {"members": "add and remove overlap"}),
+    ("p1", {"project": "must be a JSON object"}),
+])
+def test_clean_changes_errors(data, errors):
+    assert errors_of(Project.clean_changes, data)[0] == errors
@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def p1(client):
+    client.post("/projects", json={"project_id": "p1", "project_name": "One", "members_list": ["ann"],
+                                   "hardware_set_id": ["hw1"]})
+    return client
+
+
+def patch(client, path, body):
+    resp = client.patch(path, json=body)
+    return resp.status_code, resp.get_json()
+
+
+def test_members_add_and_remove(p1):
+    status, body = patch(p1, "/projects/p1/members", {"add": ["bob", "cy"], "remove": ["ann"]})
+    assert status == 200
+    assert body["project"]["members_list"] == ["bob", "cy"]
+    assert p1.get("/projects/p1").get_json()["project"]["members_list"] == ["bob", "cy"]
+
+
+def test_hardware_sets_keep_the_count_in_step(p1):
+    status, body = patch(p1, "/projects/p1/hardware_sets", {"add": ["hw2", "hw3"]})
+    assert status == 200
+    assert (body["project"]["hardware_set_id"], body["project"]["num_of_hardware_sets"]) == (["hw1", "hw2", "hw3"], 3)
+    status, body = patch(p1, "/projects/p1/hardware_sets", {"remove": ["hw1"]})
+    assert (body["project"]["hardware_set_id"], body["project"]["num_of_hardware_sets"]) == (["hw2", "hw3"], 2)
+
+
+def test_existing_member_and_missing_removal_are_no_ops(p1):
+    status, body = patch(p1, "/projects/p1/members", {"add": ["ann"]})
+    assert (status, body["project"]["members_list"]) == (200, ["ann"])
+    status, body = patch(p1, "/projects/p1/members", {"remove": ["nobody"]})
+    assert (status, body["project"]["members_list"]) == (200, ["ann"])
+    status, body = patch(p1, "/projects/p1/hardware_sets", {"add": ["hw1"], "remove": ["hw9"]})
+    assert (status, body["project"]["hardware_set_id"], body["project"]["num_of_hardware_sets"]) == (200, ["hw1"], 1)
+
+
+@pytest.mark.parametrize("path", ["/projects/ghost/members", "/projects/ghost/hardware_sets"])
+def test_unknown_project_is_a_404(client, path):
+    status, body = patch(client, path, {"add": ["x"]})
+    assert (status, body["success"]) == (404, False)
+
+
+@pytest.mark.parametrize("body, field", [
+    (None, "changes"),
+    ({}, "changes"),
+    ({"add": "ann", "remove": "ann"}, "members"),
+    ({"add": [1]}, "members"),
+    (["ann"], "members"),
+])
+def test_bad_bodies_are_400s(p1, body, field):
+    if body is None:
+        resp = p1.patch("/projects/p1/members", data="not json", content_type="application/json")
+    else:
+        resp = p1.patch("/projects/p1/members", json=body)
+    assert resp.status_code == 400
+    assert field in resp.get_json()["errors"]
+    # Nothing was written
+    assert p1.get("/projects/p1").get_json()["project"]["members_list"] == ["ann"]
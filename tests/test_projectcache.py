@@ -0,0 +1,96 @@
+from projectcache import ProjectCache
+from projectdb import ProjectDB
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_and_ttl():
+    clock = Clock()
+    cache = ProjectCache(maxsize=2, ttl=10, clock=clock)
+    cache.put("a", {"_id": "1", "project_id": "a"})
+    cache.put("b", {"_id": "2", "project_id": "b"})
+    assert cache.get("a")["project_id"] == "a"
+    cache.put("c", {"_id": "3", "project_id": "c"})
+    # b was least recently used
+    assert cache.get("b") is None
+    clock.now = 10
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["size"]) == (1, 1, 1)
+
+
+def test_change_events_evict():
+    cache = ProjectCache()
+    cache.put("a", {"_id": "1", "project_id": "a"})
+    cache.put("b", {"_id": "2", "project_id": "b"})
+    cache.apply_change({"operationType": "update", "documentKey": {"_id": "1"}})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.apply_change({"operationType": "drop"})
+    assert cache.get("b") is None
+
+
+def test_cached_lists_are_not_shared():
+    cache = ProjectCache()
+    doc = {"_id": "1", "project_id": "a", "members_list": ["ann"]}
+    cache.put("a", doc)
+    doc["members_list"].append("bob")
+    got = cache.get("a")
+    got["members_list"].append("cy")
+    assert cache.get("a")["members_list"] == ["ann"]
+
+
+def test_read_started_before_a_write_is_not_cached():
+    cache = ProjectCache()
+    since = cache.read_token()
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 2})
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 1}, since=since)
+    assert cache.get("a")["version"] == 2
+    cache.invalidate("a")
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 1}, since=since)
+    assert cache.get("a") is None
+    # A read that starts after the write is cached
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 2}, since=cache.read_token())
+    assert cache.get("a")["version"] == 2
+    assert cache.stats()["stale_puts"] == 2
+
+
+def test_writers_finishing_out_of_order_keep_the_newer_version():
+    cache = ProjectCache()
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 3})
+    cache.put("a", {"_id": "1", "project_id": "a", "version": 2})
+    assert cache.get("a")["version"] == 3
+
+
+def test_trimmed_write_history_stays_conservative():
+    cache = ProjectCache(maxsize=1)
+    since = cache.read_token()
+    for i in range(cache._touched_limit + 1):
+        cache.invalidate(f"p{i}")
+    # p0's tick was trimmed; the put is still treated as racing a write
+    cache.put("p0", {"_id": "1", "project_id": "p0"}, since=since)
+    assert cache.get("p0") is None
+
+
+def test_get_project_does_not_cache_over_a_concurrent_update(mongo, monkeypatch):
+    db = ProjectDB(client=mongo, dbname="projects_test", shape_in_db=False, cache=ProjectCache())
+    db.create_project({"project_id": "p1", "project_name": "old"})
+    db.cache.clear()
+    read = db._find_normalized
+
+    def slow_read(*args, **kwargs):
+        docs = list(read(*args, **kwargs))
+        # Another request updates p1 after our read returned the old doc
+        db.update_project("p1", {"project_name": "new"})
+        return iter(docs)
+
+    monkeypatch.setattr(db, "_find_normalized", slow_read)
+    assert db.get_project("p1")["project_name"] == "old"
+    monkeypatch.undo()
+    assert db.get_project("p1")["project_name"] == "new"
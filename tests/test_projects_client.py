@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+import requests
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from projects_client import ProjectsClient
+
+
+def serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def service(app):
+    server = serve(app)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def flaky():
+    """
+    Answers 503 to the first `failures` calls of each path, then 200.
+    """
+    app = Flask(__name__)
+    app.config.update(failures=2, calls={})
+
+    @app.route("/projects", methods=["GET", "POST"])
+    def projects():
+        calls = app.config["calls"]
+        key = request.method
+        calls[key] = calls.get(key, 0) + 1
+        if calls[key] <= app.config["failures"]:
+            return jsonify({"success": False}), 503, {"Retry-After": "0"}
+        return jsonify({"projects": [], "next_after": None, "project": {"project_id": "p1"}})
+
+    server = serve(app)
+    yield app, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_pages_through_every_project(service):
+    with ProjectsClient(service) as client:
+        results = client.create_projects([{"project_id": f"p{i:02d}", "project_name": "x"} for i in range(25)],
+                                         batch_size=10)
+        assert [r["index"] for r in results] == list(range(25))
+        assert {r["status"] for r in results} == {"created"}
+        projects = list(client.iter_projects(page_size=7, fields=["project_id"]))
+        assert [p["project_id"] for p in projects] == [f"p{i:02d}" for i in range(25)]
+
+
+def test_per_item_failures_do_not_raise(service):
+    with ProjectsClient(service) as client:
+        client.create_project({"project_id": "p1", "project_name": "x"})
+        results = client.create_projects([{"project_id": "p1", "project_name": "x"}, {"project_name": "no id"},
+                                          {"project_id": "p2", "project_name": "x"}], batch_size=2)
+        assert [(r["index"], r["status"]) for r in results] == [(0, "duplicate"), (1, "invalid"), (2, "created")]
+        with pytest.raises(requests.HTTPError) as err:
+            client.create_project({"project_id": "p1", "project_name": "x"})
+        assert err.value.response.status_code == 409
+        assert client.get_project("nope") is None
+        assert [r["status"] for r in client.delete_projects(["p1", "nope"])] == ["deleted", "not_found"]
+
+
+def test_reads_retry_through_503s(flaky):
+    app, url = flaky
+    with ProjectsClient(url, backoff_factor=0, backoff_jitter=0) as client:
+        assert client.list_projects() == []
+    assert app.config["calls"]["GET"] == 3
+
+
+def test_creates_are_not_repeated(flaky):
+    app, url = flaky
+    with ProjectsClient(url, backoff_factor=0, backoff_jitter=0) as client:
+        with pytest.raises(requests.HTTPError):
+            client.create_project({"project_id": "p1"})
+    assert app.config["calls"]["POST"] == 1
@@ -0,0 +1,199 @@
+import pytest
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+
+from resilience import CircuitBreaker, CircuitOpenError, ResilientProjectDB, served_stale
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_rate=0.5, min_calls=4, window=10.0, reset_timeout=5.0, clock=clock)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.allow()
+        breaker.record(False)
+    assert breaker.state == "open"
+
+
+def test_opens_on_failure_rate_and_fails_fast(breaker):
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as err:
+        breaker.allow()
+    assert err.value.retry_after == pytest.approx(5.0)
+    assert breaker.rejected == 1
+
+
+def test_old_outcomes_leave_the_window(breaker, clock):
+    breaker.record(False)
+    breaker.record(False)
+    clock.now = 11
+    breaker.record(True)
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_half_open_admits_one_probe(breaker, clock):
+    trip(breaker)
+    clock.now = 5
+    assert breaker.state == "half_open"
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.allow()
+
+
+def test_failed_probe_reopens(breaker, clock):
+    trip(breaker)
+    clock.now = 5
+    breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    clock.now = 10
+    breaker.allow()
+
+
+class FakeProjectDB:
+    def __init__(self):
+        self.error = None
+        self.calls = 0
+
+    def get_project(self, project_id):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return None if project_id == "missing" else {"project_id": project_id}
+
+    def list_projects(self, limit=None):
+        if self.error is not None:
+            raise self.error
+        return [{"project_id": "p1"}]
+
+    def create_project(self, data):
+        if self.error is not None:
+            raise self.error
+        return data
+
+    def update_project(self, project_id, updates):
+        if self.error is not None:
+            raise self.error
+        return {"project_id": updates.get("project_id", project_id)}
+
+    def iter_projects(self, **kwargs):
+        yield {"project_id": "p1"}
+
+
+def test_streaming_never_holds_the_probe(breaker, clock):
+    db = ResilientProjectDB(FakeProjectDB(), breaker=breaker)
+    trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        db.iter_projects
+    clock.now = 5
+    # A stream starting after the cool-down must not leave the breaker stuck half-open
+    assert list(db.iter_projects()) == [{"project_id": "p1"}]
+    for t in (10, 100, 1000):
+        clock.now = t
+        assert db.get_project("p1") == {"project_id": "p1"}
+    assert breaker.state == "closed"
+
+
+def test_non_mongo_error_releases_the_probe(breaker, clock):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    trip(breaker)
+    clock.now = 5
+    inner.error = ValueError("bad input")
+    with pytest.raises(ValueError):
+        db.create_project({})
+    inner.error = None
+    assert db.create_project({"project_id": "p2"}) == {"project_id": "p2"}
+    assert breaker.state == "closed"
+
+
+def test_rejected_request_is_not_an_outage(breaker):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    inner.error = DuplicateKeyError("dup", 11000)
+    for _ in range(breaker.min_calls):
+        with pytest.raises(DuplicateKeyError):
+            db.create_project({})
+    assert breaker.state == "closed"
+
+
+def test_stale_read_served_during_outage(breaker):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    assert db.get_project("p1") == {"project_id": "p1"}
+    assert served_stale.get() is None
+    inner.error = AutoReconnect("down")
+    assert db.get_project("p1") == {"project_id": "p1"}
+    assert served_stale.get() is not None
+    assert db.stats()["stale_served"] == 1
+    with pytest.raises(AutoReconnect):
+        db.get_project("never-read")
+
+
+def test_writes_drop_the_copies_they_change(breaker):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    for pid in ("p1", "p2", "p3"):
+        db.get_project(pid)
+    db.list_projects(limit=10)
+    db.update_project("p1", {"project_id": "p3"})
+    inner.error = AutoReconnect("down")
+    for pid in ("p1", "p3"):
+        with pytest.raises(AutoReconnect):
+            db.get_project(pid)
+    with pytest.raises(AutoReconnect):
+        db.list_projects(limit=10)
+    assert db.get_project("p2") == {"project_id": "p2"}
+
+
+def test_failed_write_still_drops_the_copy(breaker):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    db.get_project("p1")
+    inner.error = AutoReconnect("down")
+    with pytest.raises(AutoReconnect):
+        db.create_project({"project_id": "p1"})
+    with pytest.raises(AutoReconnect):
+        db.get_project("p1")
+
+
+def test_misses_and_reads_overlapping_a_write_are_not_kept(breaker):
+    inner = FakeProjectDB()
+    db = ResilientProjectDB(inner, breaker=breaker)
+    assert db.get_project("missing") is None
+    assert db.stats()["stale_entries"] == 0
+    read = inner.get_project
+
+    def racing_read(project_id):
+        doc = read(project_id)
+        db.update_project(project_id, {})
+        return doc
+
+    inner.get_project = racing_read
+    db.get_project("p1")
+    assert db.stats()["stale_entries"] == 0
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pytest
+
+from spend_rollups import RollupFileReader, RollupFileStore, RollupMongoStore, SpendRollups
+
+
+def spend_row(brand_id, state, day, spend, version="2025-10-06", ingested="2025-11-12 00:00:00"):
+    return {"BRAND_ID": str(brand_id), "STATE_ABBR": state, "TRANS_DATE": day, "SPEND_AMOUNT": str(spend),
+            "TRANS_COUNT": "1", "VERSION": version, "ingested_at_utc": ingested}
+
+
+ROWS = [
+    spend_row(1, "CA", "2018-01-01", 10),
+    spend_row(1, "CA", "2018-01-03", 5),
+    spend_row(2, "NY", "2018-01-02", 20),
+    spend_row(1, "NY", "2018-01-09", 7),
+    spend_row(3, "TX", "2018-02-05", 30),
+    spend_row(2, "CA", "2018-02-06", 8),
+]
+
+
+def keys(docs):
+    return [(d["period"], d["brand_id"], d["state"], d["spend_amount"]) for d in docs]
+
+
+@pytest.fixture
+def reader(tmp_path):
+    SpendRollups(RollupFileStore(str(tmp_path))).apply(ROWS)
+    return SpendRollups(RollupFileReader(str(tmp_path)))
+
+
+def test_published_file_holds_rollups_only(tmp_path, reader):
+    with open(tmp_path / "rollups.json") as f:
+        published = json.load(f)
+    assert "facts" not in published
+    assert published["grains"]["month"] == [
+        ["2018-01", 1, "CA", 15.0, 2.0, 2], ["2018-01", 1, "NY", 7.0, 1.0, 1], ["2018-01", 2, "NY", 20.0, 1.0, 1],
+        ["2018-02", 2, "CA", 8.0, 1.0, 1], ["2018-02", 3, "TX", 30.0, 1.0, 1],
+    ]
+    # The writer's state keeps the facts and reloads from them
+    store = RollupFileStore(str(tmp_path))
+    assert len(store.facts) == len(ROWS)
+
+
+def test_queries_in_period_order(reader):
+    assert keys(reader.query("week")) == [
+        ("2018-01-01", 1, "CA", 15.0), ("2018-01-01", 2, "NY", 20.0), ("2018-01-08", 1, "NY", 7.0),
+        ("2018-02-05", 2, "CA", 8.0), ("2018-02-05", 3, "TX", 30.0),
+    ]
+    # `from` mid-week still includes that week
+    assert keys(reader.query("week", date_from="2018-01-10", date_to="2018-02-04")) == [("2018-01-08", 1, "NY", 7.0)]
+    assert keys(reader.query("day", brand_ids=[2, 1], states=["CA"])) == [
+        ("2018-01-01", 1, "CA", 10.0), ("2018-01-03", 1, "CA", 5.0), ("2018-02-06", 2, "CA", 8.0),
+    ]
+    assert keys(reader.query("month", limit=2)) == [("2018-01", 1, "CA", 15.0), ("2018-01", 1, "NY", 7.0)]
+    assert reader.query("month", brand_ids=[99]) == []
+    with pytest.raises(ValueError):
+        reader.query("year")
+
+
+def test_reader_picks_up_restatements(tmp_path, reader):
+    assert keys(reader.query("month", brand_ids=[3])) == [("2018-02", 3, "TX", 30.0)]
+    stats = SpendRollups(RollupFileStore(str(tmp_path))).apply([spend_row(3, "TX", "2018-02-05", 12, version="2025-10-20")])
+    assert stats["restated"] == 1
+    assert keys(reader.query("month", brand_ids=[3])) == [("2018-02", 3, "TX", 12.0)]
+
+
+def test_old_single_file_store_is_migrated(tmp_path):
+    SpendRollups(RollupFileStore(str(tmp_path))).apply(ROWS[:2])
+    with open(tmp_path / "state.json") as f:
+        state = json.load(f)
+    os.remove(tmp_path / "state.json")
+    with open(tmp_path / "rollups.json", "w") as f:
+        json.dump(state, f)
+    # Not servable until the writer republishes, and nothing is double counted after
+    assert SpendRollups(RollupFileReader(str(tmp_path))).query("month") == []
+    assert SpendRollups(RollupFileStore(str(tmp_path))).apply(ROWS)["new"] == len(ROWS) - 2
+    assert keys(SpendRollups(RollupFileReader(str(tmp_path))).query("month", brand_ids=[1])) == [
+        ("2018-01", 1, "CA", 15.0), ("2018-01", 1, "NY", 7.0),
+    ]
+
+
+def test_mongo_store_sorts_and_limits(mongo):
+    store = RollupMongoStore(mongo["rollups_test"])
+    store.ensure_indexes()
+    rollups = SpendRollups(store)
+    rollups.apply(ROWS)
+    assert keys(rollups.query("month", limit=3)) == [
+        ("2018-01", 1, "CA", 15.0), ("2018-01", 1, "NY", 7.0), ("2018-01", 2, "NY", 20.0),
+    ]
+    assert keys(rollups.query("week", date_from="2018-01-10", date_to="2018-02-04")) == [("2018-01-08", 1, "NY", 7.0)]
+
+
+def test_api_serves_the_published_rollups(config, client):
+    SpendRollups(RollupFileStore(config.ROLLUP_DIR)).apply(ROWS)
+    resp = client.get("/api/rollups?grain=month&state=NY")
+    assert resp.status_code == 200
+    assert keys(resp.get_json()["data"]) == [("2018-01", 1, "NY", 7.0), ("2018-01", 2, "NY", 20.0)]
+    assert client.get("/api/rollups?grain=year").status_code == 400
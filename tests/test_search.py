@@ -0,0 +1,139 @@
+import os
+
+import pytest
+from pymongo import MongoClient
+
+from projectdb import SEARCH_INDEXES, TEXT_SCORE, ProjectDB
+
+PROJECTS = [
+    {"project_id": "p1", "project_name": "Solar farm", "members_list": ["ann", "bob"], "hardware_set_id": ["hw1"]},
+    {"project_id": "p2", "project_name": "Wind farm", "members_list": ["bob"], "hardware_set_id": ["hw1", "hw2"]},
+    {"project_id": "p3", "project_name": "Tidal", "members_list": ["cy"], "hardware_set_id": []},
+    {"project_id": "p4", "project_name": "Geo", "members_list": ["bob"], "hardware_set_id": ["hw2", "hw3", "hw4"]},
+]
+
+
+@pytest.fixture
+def seeded(client):
+    for p in PROJECTS:
+        assert client.post("/projects", json=p).status_code == 201
+    return client
+
+
+def ids(client, query):
+    resp = client.get(f"/projects/search?{query}")
+    assert resp.status_code == 200, resp.get_json()
+    return [p["project_id"] for p in resp.get_json()["projects"]]
+
+
+def test_member_and_hardware_filters(seeded):
+    assert ids(seeded, "member=bob") == ["p1", "p2", "p4"]
+    # Repeated values must all be present
+    assert ids(seeded, "member=ann&member=bob") == ["p1"]
+    assert ids(seeded, "hardware_set=hw2") == ["p2", "p4"]
+    assert ids(seeded, "member=bob&hardware_set=hw1") == ["p1", "p2"]
+    assert ids(seeded, "member=nobody") == []
+
+
+def test_hardware_count_range(seeded):
+    assert ids(seeded, "min_hw=2") == ["p2", "p4"]
+    assert ids(seeded, "max_hw=1") == ["p1", "p3"]
+    assert ids(seeded, "min_hw=1&max_hw=2") == ["p1", "p2"]
+
+
+def test_keyset_pages(seeded):
+    first = seeded.get("/projects/search?member=bob&limit=2").get_json()
+    assert [p["project_id"] for p in first["projects"]] == ["p1", "p2"]
+    assert first["next_after"] == "p2"
+    rest = seeded.get(f"/projects/search?member=bob&limit=2&after={first['next_after']}").get_json()
+    assert [p["project_id"] for p in rest["projects"]] == ["p4"]
+    assert rest["next_after"] is None
+
+
+def test_text_search_is_ranked_and_unpaged(client, project_db, monkeypatch):
+    # mongomock has no $text; check what reaches Mongo and the response shape
+    seen = []
+
+    def find(query, sort=False, limit=None):
+        seen.append((query, sort, limit))
+        return iter([{"project_id": "p2"}, {"project_id": "p1"}])
+
+    monkeypatch.setattr(project_db, "_find_normalized", find)
+    body = client.get("/projects/search?q=farm&member=bob&limit=2").get_json()
+    assert [p["project_id"] for p in body["projects"]] == ["p2", "p1"]
+    assert "next_after" not in body
+    assert seen == [({"members_list": "bob", "$text": {"$search": "farm"}},
+                     [("score", TEXT_SCORE), ("project_id", 1)], 2)]
+
+
+@pytest.mark.parametrize("query", ["min_hw=-1", "max_hw=x", "min_hw=3&max_hw=1", "q=farm&after=p1", "limit=0"])
+def test_bad_filters_are_rejected(client, query):
+    resp = client.get(f"/projects/search?{query}")
+    assert resp.status_code == 400
+    assert resp.get_json()["success"] is False
+
+
+# Each single-filter search and the index it should be served from
+PLANS = [
+    ({"members": ["bob"]}, "idx_members_list"),
+    ({"hardware_sets": ["hw1"], "after": "p1"}, "idx_hardware_set_id"),
+    ({"min_hw": 1, "max_hw": 2}, "idx_num_of_hardware_sets"),
+    ({"q": "farm"}, "idx_text_name_desc"),
+]
+
+
+@pytest.mark.parametrize("filters, index", PLANS)
+def test_queries_lead_with_their_index_key(filters, index):
+    keys = dict((name, keys) for keys, name in SEARCH_INDEXES)[index]
+    query, sort = ProjectDB._search_query(**filters)
+    if "q" in filters:
+        assert "$text" in query
+        return
+    # Equality/range on the leading key, sort on the second: no in-memory sort
+    assert keys[0][0] in query
+    assert sort == [keys[1]]
+
+
+class ExplainedCursor:
+    def __init__(self, explained):
+        self.explained = explained
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def explain(self):
+        return self.explained
+
+
+def test_search_plan_reads_the_slot_based_winning_plan(project_db, monkeypatch):
+    explained = {
+        "queryPlanner": {"winningPlan": {"queryPlan": {
+            "stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {
+                "stage": "IXSCAN", "indexName": "idx_members_list"}}}}},
+        "executionStats": {"nReturned": 2, "totalKeysExamined": 2, "totalDocsExamined": 2},
+    }
+    monkeypatch.setattr(project_db.collection, "find", lambda query: ExplainedCursor(explained))
+    plan = project_db.search_plan(limit=2, members=["bob"])
+    assert plan["indexes"] == ["idx_members_list"]
+    assert (plan["collscan"], plan["stages"]) == (False, ["LIMIT", "FETCH", "IXSCAN"])
+    assert (plan["returned"], plan["keys_examined"], plan["docs_examined"]) == (2, 2, 2)
+
+
+@pytest.mark.skipif(not os.getenv("MONGO_TEST_URI"), reason="set MONGO_TEST_URI to check plans on a real server")
+@pytest.mark.parametrize("filters, index", PLANS)
+def test_real_planner_picks_the_index(filters, index):
+    client = MongoClient(os.environ["MONGO_TEST_URI"])
+    db = ProjectDB(client=client, dbname="projects_search_plan_test")
+    try:
+        db.ensure_indexes()
+        for p in PROJECTS:
+            db.create_project(dict(p))
+        plan = db.search_plan(limit=10, **filters)
+        assert index in plan["indexes"]
+        assert not plan["collscan"]
+    finally:
+        client.drop_database("projects_search_plan_test")
+        client.close()
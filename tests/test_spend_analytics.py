@@ -0,0 +1,103 @@
+from datetime import date, datetime
+
+import pytest
+
+import spend_ingest
+from spend_analytics import SpendAnalytics, SpendQueryError, latest_versions
+
+V1, V2 = date(2025, 10, 6), date(2025, 10, 20)
+
+
+def row(brand_id, state, day, spend, version=V1, ingested="2025-11-12 00:00:00", count=1.0):
+    return (brand_id, f"BRAND {brand_id}", spend, state, count, day, version, "batch",
+            datetime.fromisoformat(ingested))
+
+
+def store(tmp_path, *chunks):
+    out = str(tmp_path / "spend")
+    for i, rows in enumerate(chunks):
+        spend_ingest.write_chunk(spend_ingest.to_table(rows), out, f"c{i}")
+    spend_ingest.write_watermark(out, ("2025-11-12", "batch"), sum(map(len, chunks)))
+    return SpendAnalytics(out)
+
+
+def test_totals_per_group(tmp_path):
+    spend = store(tmp_path, [row(1, "CA", "2018-01-01", 10.0), row(1, "NY", "2018-01-01", 5.0),
+                             row(2, "CA", "2018-01-02", 7.0)])
+    result = spend.query(group_by=["brand"])
+    assert [(g["brand_id"], g["spend_amount"]) for g in result["data"]] == [(1, 15.0), (2, 7.0)]
+    result = spend.query(group_by=["state"], date_from="2018-01-02")
+    assert result["data"] == [{"state": "CA", "spend_amount": 7.0, "trans_count": 1.0, "rows": 1}]
+
+
+def test_restated_day_counts_once(tmp_path):
+    spend = store(
+        tmp_path,
+        [row(1, "CA", "2018-01-01", 10.0), row(1, "CA", "2018-01-02", 3.0)],
+        # Later extract restates the 1st with a newer VERSION, in another file
+        [row(1, "CA", "2018-01-01", 12.0, version=V2)],
+    )
+    result = spend.query(group_by=["brand"])
+    assert result["matched_rows"] == 2
+    assert result["data"][0]["spend_amount"] == 15.0
+
+
+def test_same_version_latest_ingest_wins(tmp_path):
+    spend = store(tmp_path, [
+        row(1, "CA", "2018-01-01", 10.0, ingested="2025-11-12 00:00:00"),
+        row(1, "CA", "2018-01-01", 11.0, ingested="2025-11-13 00:00:00"),
+        row(1, "CA", "2018-01-01", 9.0, ingested="2025-11-11 00:00:00"),
+        row(1, "NY", "2018-01-01", 1.0),
+    ])
+    assert spend.query(group_by=["state"])["data"] == [
+        {"state": "CA", "spend_amount": 11.0, "trans_count": 1.0, "rows": 1},
+        {"state": "NY", "spend_amount": 1.0, "trans_count": 1.0, "rows": 1},
+    ]
+
+
+def test_latest_versions_keeps_distinct_keys():
+    table = spend_ingest.to_table([row(1, None, "2018-01-01", 1.0), row(1, None, "2018-01-01", 2.0, version=V2),
+                                   row(2, "CA", "2018-01-01", 3.0)])
+    kept = latest_versions(table)
+    assert sorted(kept["SPEND_AMOUNT"].to_pylist()) == [2.0, 3.0]
+
+
+def test_nothing_restated_keeps_the_mapped_columns(tmp_path):
+    table = spend_ingest.to_table([row(1, "CA", "2018-01-01", 1.0), row(2, "CA", "2018-01-01", 2.0)])
+    assert latest_versions(table) is table
+    rows = [row(i, "CA", f"2018-01-{1 + i % 28:02d}", 1.0) for i in range(2000)]
+    spend = store(tmp_path, rows[:1000], rows[1000:])
+    spend.query(group_by=[])
+    stats = spend.stats()
+    assert stats["rows"] == 2000
+    # BRAND_ID, SPEND_AMOUNT, TRANS_COUNT, VERSION and ingested_at_utc are read from the mmap
+    assert stats["heap_bytes"] < stats["table_bytes"] - 2000 * (8 * 4 + 4)
+
+
+def test_bad_query_arguments(tmp_path):
+    spend = store(tmp_path, [row(1, "CA", "2018-01-01", 10.0)])
+    with pytest.raises(SpendQueryError):
+        spend.query(group_by=["colour"])
+    with pytest.raises(SpendQueryError):
+        spend.query(bucket="decade")
+    for date_from in ("2018-13-45", "2018-1-5", "20180105", "yesterday"):
+        with pytest.raises(SpendQueryError):
+            spend.query(date_from=date_from)
+    with pytest.raises(SpendQueryError):
+        spend.query(date_to="2018-02-30")
+    for limit in (-1, 0, spend.max_rows + 1):
+        with pytest.raises(SpendQueryError):
+            spend.query(limit=limit)
+    assert spend.query(limit=spend.max_rows, date_from="2018-01-01")["matched_rows"] == 1
+
+
+def test_api_rejects_bad_arguments(tmp_path, config, client):
+    store(tmp_path, [row(1, "CA", "2018-01-01", 10.0)])
+    assert client.get("/stats/spend").get_json()["spend"] is None
+    assert client.get("/api/spend?group_by=state&from=2018-01-01&limit=5").status_code == 200
+    assert client.get("/stats/spend").get_json()["spend"]["rows"] == 1
+    for qs in ("from=2018-13-45", "to=2018-02-30", "limit=-1", "limit=0",
+               f"limit={config.SPEND_MAX_ROWS + 1}", "limit=ten", "brand_id=x"):
+        resp = client.get(f"/api/spend?{qs}")
+        assert resp.status_code == 400, qs
+        assert resp.get_json()["success"] is False
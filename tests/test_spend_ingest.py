@@ -0,0 +1,79 @@
+import csv
+
+import pytest
+
+import spend_ingest
+from spend_analytics import SpendAnalytics
+
+HEADER = ["BRAND_ID", "BRAND_NAME", "SPEND_AMOUNT", "STATE_ABBR", "TRANS_COUNT", "TRANS_DATE", "VERSION",
+          "load_batch_id", "ingested_at_utc"]
+
+
+def spend_rows(n, batch, ingested, start=0):
+    return [[i, f"BRAND {i}", 1.0, "CA", 1.0, f"2018-01-{1 + i % 28:02d}", "2025-10-06", batch, ingested]
+            for i in range(start, start + n)]
+
+
+def seed(tmp_path, rows, name="rows.csv"):
+    path = tmp_path / name
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    spend_ingest.seed_sqlite(str(tmp_path / "standin.db"), str(path))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return spend_ingest.make_engine(f"sqlite:///{tmp_path / 'standin.db'}")
+
+
+def matched_rows(out_dir):
+    return SpendAnalytics(out_dir).query(group_by=[])["matched_rows"]
+
+
+def test_chunks_never_split_a_watermark_group(tmp_path, engine):
+    seed(tmp_path, spend_rows(3, "a", "2025-11-01 00:00:00") + spend_rows(4, "b", "2025-11-01 00:00:00", start=3)
+         + spend_rows(1, "a", "2025-11-02 00:00:00", start=7))
+    chunks = list(spend_ingest.stream_chunks(engine, chunk_rows=2))
+    assert [len(c) for c in chunks] == [3, 4, 1]
+    for chunk in chunks:
+        assert len({spend_ingest.row_watermark(r) for r in chunk}) == 1
+
+
+def test_resume_only_pulls_newer_rows(tmp_path, engine):
+    out = str(tmp_path / "spend")
+    seed(tmp_path, spend_rows(5, "a", "2025-11-01 00:00:00"))
+    assert spend_ingest.extract_spend(engine, out, chunk_rows=2)["rows"] == 5
+    assert spend_ingest.read_watermark(out) == ("2025-11-01 00:00:00", "a")
+    # Same timestamp, later batch id, and a later timestamp
+    seed(tmp_path, spend_rows(2, "b", "2025-11-01 00:00:00", start=5) + spend_rows(1, "a", "2025-11-03 00:00:00", start=7),
+         name="more.csv")
+    stats = spend_ingest.extract_spend(engine, out, chunk_rows=2)
+    assert (stats["rows"], stats["watermark"]) == (3, ("2025-11-03 00:00:00", "a"))
+    assert matched_rows(out) == 8
+
+
+def test_interrupted_run_rewrites_the_same_files(tmp_path, engine, monkeypatch):
+    out = str(tmp_path / "spend")
+    seed(tmp_path, spend_rows(4, "a", "2025-11-01 00:00:00") + spend_rows(4, "b", "2025-11-02 00:00:00", start=4))
+    save = spend_ingest.write_watermark
+
+    def crash(out_dir, mark, rows):
+        raise KeyboardInterrupt
+
+    def crash_after_saving(out_dir, mark, rows):
+        save(out_dir, mark, rows)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(spend_ingest, "write_watermark", crash)
+    with pytest.raises(KeyboardInterrupt):
+        spend_ingest.extract_spend(engine, out, chunk_rows=4)
+    # Files for the first chunk are on disk, the watermark is not
+    assert spend_ingest.read_watermark(out) is None
+    monkeypatch.setattr(spend_ingest, "write_watermark", crash_after_saving)
+    with pytest.raises(KeyboardInterrupt):
+        spend_ingest.extract_spend(engine, out, chunk_rows=4)
+    monkeypatch.setattr(spend_ingest, "write_watermark", save)
+    assert spend_ingest.extract_spend(engine, out, chunk_rows=4)["rows"] == 4
+    assert matched_rows(out) == 8
@@ -0,0 +1,91 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, DuplicateKeyError, WriteConcernError
+
+from writebehind import WriteBehindQueue
+
+
+def doc(pid):
+    return {"_id": ObjectId(), "project_id": pid}
+
+
+class FlakyCollection:
+    """
+    insert_many raises the queued errors first, then writes to `inner`.
+    """
+
+    def __init__(self, inner, *errors):
+        self.inner = inner
+        self.errors = list(errors)
+        self.calls = []
+
+    def insert_many(self, docs, ordered=True):
+        self.calls.append(len(docs))
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.inner.insert_many(docs, ordered=ordered)
+
+
+@pytest.fixture
+def collection(project_db):
+    return project_db.collection
+
+
+def test_waiting_inserts_go_out_as_one_batch(collection):
+    queue = WriteBehindQueue(lambda: collection, max_batch=5, max_delay=5.0)
+    futures = [queue.submit(doc(f"p{i}")) for i in range(5)]
+    # A full batch does not wait out max_delay
+    assert [f.result(timeout=2)["project_id"] for f in futures] == [f"p{i}" for i in range(5)]
+    assert collection.count_documents({}) == 5
+    stats = queue.stats()
+    assert (stats["batches"], stats["documents"], stats["largest_batch"]) == (1, 5, 5)
+
+
+def test_max_delay_flushes_a_partial_batch(collection):
+    queue = WriteBehindQueue(lambda: collection, max_batch=100, max_delay=0.01)
+    assert queue.insert(doc("p1"))["project_id"] == "p1"
+    assert queue.stats()["largest_batch"] == 1
+
+
+def test_duplicate_fails_only_its_caller(collection):
+    collection.insert_one(doc("taken"))
+    queue = WriteBehindQueue(lambda: collection, max_batch=3, max_delay=5.0)
+    futures = [queue.submit(doc(pid)) for pid in ("a", "taken", "b")]
+    assert futures[0].result(timeout=2)["project_id"] == "a"
+    with pytest.raises(DuplicateKeyError):
+        futures[1].result(timeout=2)
+    assert futures[2].result(timeout=2)["project_id"] == "b"
+
+
+def test_batch_failure_reaches_every_caller_and_the_flusher_survives(collection):
+    flaky = FlakyCollection(collection, AutoReconnect("down"))
+    queue = WriteBehindQueue(lambda: flaky, max_batch=2, max_delay=5.0)
+    futures = [queue.submit(doc(pid)) for pid in ("a", "b")]
+    for f in futures:
+        with pytest.raises(AutoReconnect):
+            f.result(timeout=2)
+    futures = [queue.submit(doc(pid)) for pid in ("c", "d")]
+    assert [f.result(timeout=2)["project_id"] for f in futures] == ["c", "d"]
+    assert queue.stats()["failed_batches"] == 1
+    assert flaky.calls == [2, 2]
+
+
+def test_unacknowledged_write_concern_fails_everyone(collection):
+    error = BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication"}],
+                            "nInserted": 2})
+    queue = WriteBehindQueue(lambda: FlakyCollection(collection, error), max_batch=2, max_delay=5.0)
+    futures = [queue.submit(doc(pid)) for pid in ("a", "b")]
+    for f in futures:
+        with pytest.raises(WriteConcernError):
+            f.result(timeout=2)
+
+
+def test_create_through_the_app(config, project_db, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setattr(config, "WRITE_BEHIND", True)
+    client = create_app(config, project_db=project_db).test_client()
+    assert client.post("/projects", json={"project_id": "p1", "project_name": "One"}).status_code == 201
+    assert client.post("/projects", json={"project_id": "p1", "project_name": "Again"}).status_code == 409
+    assert client.get("/projects/p1").get_json()["project"]["project_name"] == "One"
+    assert client.get("/stats/writes").get_json()["write_behind"]["documents"] == 2
@@ -0,0 +1,159 @@
+# writebehind.py – coalesce single-project inserts into insert_many batches
+
+"""
+WriteBehindQueue buffers inserts from many request threads and writes them
+with one unordered insert_many: a batch goes out when max_batch documents
+are waiting or max_delay seconds after its first document arrived,
+whichever comes first. One flusher thread per process does the writes.
+
+Every caller still gets its own outcome: insert() returns once its batch
+is acknowledged, or raises for that document only (DuplicateKeyError for
+an existing project_id, WriteError otherwise). A failure of the whole
+batch (network, timeout) is raised to every caller in it. Documents must
+carry their _id already, so nothing has to be read back.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymongo
+from pymongo.errors import (
+    BulkWriteError, DuplicateKeyError, NetworkTimeout, PyMongoError, WriteConcernError, WriteError,
+)
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        collection_factory: Callable[[], Any],
+        max_batch: int = 100,
+        max_delay: float = 0.005,
+        max_pending: int = 10000,
+        timeout: float = 3.0,
+    ):
+        """
+        timeout bounds each insert_many and the wait for room when
+        max_pending documents are already queued; insert() waits for at
+        most two flushes (the one in progress, then its own).
+        """
+        self.collection_factory = collection_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        # (document, future, queued_at)
+        self._pending: List[Tuple[Dict[str, Any], Future, float]] = []
+        self._pid: Optional[int] = None
+
+        self.batches = 0
+        self.documents = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+    # ---------- Callers ----------
+
+    def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue one document and wait for its batch; returns the document.
+        """
+        future = self.submit(doc)
+        try:
+            # Worst case: the flush in progress, then our own batch
+            return future.result(timeout=2 * self.timeout + self.max_delay)
+        except FutureTimeout:
+            # The batch may still land; same uncertainty as a network timeout
+            raise NetworkTimeout("write-behind batch not acknowledged in time") from None
+
+    def submit(self, doc: Dict[str, Any]) -> Future:
+        self._start()
+        future: Future = Future()
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending, self.timeout):
+                raise NetworkTimeout("write-behind queue full")
+            self._pending.append((doc, future, time.monotonic()))
+            self._cond.notify_all()
+        return future
+
+    # ---------- Flusher ----------
+
+    def _start(self) -> None:
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # A forked worker starts with its own thread and an empty buffer
+            self._pid = os.getpid()
+            self._pending = []
+        threading.Thread(target=self._run, name="write-behind", daemon=True).start()
+
+    def _next_batch(self) -> List[Tuple[Dict[str, Any], Future, float]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending)
+            deadline = self._pending[0][2] + self.max_delay
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            # Room for callers blocked on max_pending
+            self._cond.notify_all()
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._flush(self._next_batch())
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Future, float]]) -> None:
+        errors: Dict[int, Any] = {}
+        try:
+            with pymongo.timeout(self.timeout):
+                self.collection_factory().insert_many([doc for doc, _, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+            if e.details.get("writeConcernErrors"):
+                # Written but not acknowledged as asked: nobody gets a success
+                wc = e.details["writeConcernErrors"][0]
+                concern_error = WriteConcernError(wc.get("errmsg", "write concern error"), wc.get("code"), wc)
+                errors = {i: errors.get(i, concern_error) for i in range(len(batch))}
+        except Exception as e:
+            # Whole batch failed (also non-Mongo errors: the flusher must survive)
+            print("[WriteBehindQueue] insert_many error:", e)
+            self.failed_batches += 1
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.documents += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for i, (doc, future, _) in enumerate(batch):
+            err = errors.get(i)
+            if err is None:
+                future.set_result(doc)
+            elif isinstance(err, PyMongoError):
+                future.set_exception(err)
+            elif err.get("code") == 11000:
+                future.set_exception(DuplicateKeyError(err.get("errmsg", "duplicate key"), 11000, err))
+            else:
+                future.set_exception(WriteError(err.get("errmsg", "write error"), err.get("code"), err))
+
+    # ---------- Stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "batches": self.batches,
+            "documents": self.documents,
+            "avg_batch": round(self.documents / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+        }